@@ -0,0 +1,186 @@
+import io
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy.io.wavfile import write as write_wav
+from flask import Blueprint, abort, send_file
+
+try:
+    import av
+except ImportError: # WAV only
+    av = None
+
+SAMPLE_RATE = 24000 # ChatTTS output rate (Opus supports it natively, no resampling)
+# 24 kb/s mono Opus is transparent for speech and ~16x smaller than 24 kHz int16 WAV
+OPUS_BITRATE = 24000
+DEFAULT_ARTIFACT_DIR = "audio_artifacts"
+# Answers are fetched once, right after /ask; keep them a while for replays and slow tablets
+DEFAULT_TTL_SECONDS = 15 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+FORMATS = {
+    "opus": ("ogg", "audio/ogg"),
+    "wav": ("wav", "audio/wav"),
+}
+
+
+def encode_opus(wav, sample_rate=SAMPLE_RATE, bitrate=OPUS_BITRATE) -> bytes:
+    """Encodes a float32 waveform as mono Ogg/Opus in memory."""
+    samples = np.clip(np.asarray(wav, dtype=np.float32).ravel(), -1.0, 1.0)
+    buffer = io.BytesIO()
+    with av.open(buffer, mode="w", format="ogg") as container:
+        stream = container.add_stream("libopus", rate=sample_rate)
+        stream.bit_rate = bitrate
+        stream.layout = "mono"
+        frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="flt", layout="mono")
+        frame.sample_rate = sample_rate
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None): # flush
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+def encode_wav(wav, sample_rate=SAMPLE_RATE) -> bytes:
+    samples = np.clip(np.asarray(wav, dtype=np.float32).ravel(), -1.0, 1.0)
+    buffer = io.BytesIO()
+    write_wav(buffer, sample_rate, (samples * 32767).astype(np.int16))
+    return buffer.getvalue()
+
+
+def pick_format(accepted=None) -> str:
+    """
+    First format the client says it can play (index.html sends
+    `audio_formats`, e.g. Safari on older iPads can't play Ogg/Opus) that this
+    server can produce; Opus when the client didn't say.
+    """
+    available = [name for name in FORMATS if name != "opus" or av is not None]
+    for name in accepted or ["opus"]:
+        if name in available:
+            return name
+    return "wav"
+
+
+class ArtifactStore:
+    """
+    Synthesized answers as files the web client can fetch by URL. Artifacts
+    are content-addressed (the id is a hash of the encoded bytes, which also
+    serves as the ETag), expire ttl_seconds after they were last written, and
+    the oldest are evicted once the store exceeds max_bytes.
+    """
+    def __init__(self, root=DEFAULT_ARTIFACT_DIR, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict() # artifact id -> (file name, size, created)
+        self.size = 0
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Picks up artifacts left by a previous run, oldest first, and drops the expired ones."""
+        entries = []
+        for name in os.listdir(self.root):
+            artifact_id, ext = os.path.splitext(name)
+            if ext.lstrip(".") in {ext for ext, _ in FORMATS.values()}:
+                stat = os.stat(os.path.join(self.root, name))
+                entries.append((stat.st_mtime, artifact_id, name, stat.st_size))
+        for created, artifact_id, name, size in sorted(entries):
+            self.entries[artifact_id] = (name, size, created)
+            self.size += size
+        self.purge()
+
+    def put(self, data: bytes, audio_format="opus") -> str:
+        """Stores encoded audio and returns its artifact id."""
+        ext, _ = FORMATS[audio_format]
+        artifact_id = hashlib.sha256(data).hexdigest()[:32]
+        name = f"{artifact_id}.{ext}"
+        path = os.path.join(self.root, name)
+        with self.lock:
+            if artifact_id in self.entries:
+                # Same answer again: refresh its expiry instead of rewriting it
+                os.utime(path)
+                self.entries.move_to_end(artifact_id)
+                self.entries[artifact_id] = (name, len(data), time.time())
+                return artifact_id
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.entries[artifact_id] = (name, len(data), time.time())
+            self.size += len(data)
+        self.purge()
+        return artifact_id
+
+    def get(self, artifact_id: str):
+        """Returns (path, content type) of a live artifact, or None if unknown or expired."""
+        with self.lock:
+            entry = self.entries.get(artifact_id)
+        if entry is None or time.time() - entry[2] > self.ttl_seconds:
+            return None
+        name = entry[0]
+        _, content_type = next(value for value in FORMATS.values() if name.endswith(f".{value[0]}"))
+        return os.path.join(self.root, name), content_type
+
+    def purge(self) -> int:
+        """Deletes expired artifacts, then the oldest ones while over max_bytes. Returns how many went."""
+        now = time.time()
+        removed = []
+        with self.lock:
+            for artifact_id, (name, size, created) in list(self.entries.items()):
+                if now - created > self.ttl_seconds or self.size > self.max_bytes:
+                    del self.entries[artifact_id]
+                    self.size -= size
+                    removed.append(name)
+        for name in removed:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+        return len(removed)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"artifacts": len(self.entries), "bytes": self.size}
+
+
+def store_answer_audio(chatbot_logic, store, text: str, accepted_formats=None, url_prefix="/audio"):
+    """
+    Synthesizes `text`, encodes it for the client (Opus unless it can only
+    play WAV) and returns the URL to put in /ask's `audio_url`, or "" if
+    synthesis failed. Replaces generate_tts + serving the WAV it wrote.
+    """
+    wav = chatbot_logic.synthesize(text)
+    if wav is None:
+        return ""
+    audio_format = pick_format(accepted_formats)
+    data = encode_opus(wav) if audio_format == "opus" else encode_wav(wav)
+    return f"{url_prefix}/{store.put(data, audio_format)}"
+
+
+def make_audio_blueprint(store, url_prefix="/audio") -> Blueprint:
+    """
+    Flask routes serving the store's artifacts. send_file answers Range
+    requests with 206 partial content (so the browser can start playing and
+    seek before the whole file is down) and If-None-Match with 304.
+    Register with app.register_blueprint(make_audio_blueprint(store)).
+    """
+    blueprint = Blueprint("audio_artifacts", __name__, url_prefix=url_prefix)
+
+    @blueprint.route("/<artifact_id>")
+    def audio(artifact_id):
+        artifact = store.get(artifact_id)
+        if artifact is None:
+            abort(404)
+        path, content_type = artifact
+        response = send_file(path, mimetype=content_type, conditional=True, etag=artifact_id,
+                             max_age=store.ttl_seconds)
+        response.headers["Accept-Ranges"] = "bytes"
+        return response
+
+    return blueprint
@@ -0,0 +1,86 @@
+import numpy as np
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtMultimedia import QAudio, QAudioFormat, QAudioSink, QMediaDevices
+
+from chatbot_logic import SAMPLE_RATE, to_int16
+
+FEED_INTERVAL_MS = 10
+
+
+class PcmStreamPlayer(QObject):
+    """
+    Plays numpy audio buffers straight from memory through a QAudioSink.
+    Buffers can be enqueued while playback is running (one sentence, or even
+    a partial decoder chunk, at a time) and are played back-to-back with no
+    gap. Call end_of_stream() after the last buffer of an answer so the
+    player knows that running dry means "done" and not "waiting for more".
+    """
+    playback_started = pyqtSignal()
+    playback_finished = pyqtSignal()
+
+    def __init__(self, sample_rate=SAMPLE_RATE, parent=None):
+        super().__init__(parent)
+        audio_format = QAudioFormat()
+        audio_format.setSampleRate(sample_rate)
+        audio_format.setChannelCount(1)
+        audio_format.setSampleFormat(QAudioFormat.SampleFormat.Int16)
+        self.sink = QAudioSink(QMediaDevices.defaultAudioOutput(), audio_format, self)
+        self.device = None # QIODevice returned by sink.start() in push mode
+        self.pending = bytearray()
+        self.stream_ended = True
+
+        self.feed_timer = QTimer(self)
+        self.feed_timer.setInterval(FEED_INTERVAL_MS)
+        self.feed_timer.timeout.connect(self._feed)
+
+    def enqueue(self, samples: np.ndarray):
+        """Appends float32 or int16 samples to the playback queue, starting playback if needed."""
+        if samples.dtype != np.int16:
+            samples = to_int16(samples)
+        self.pending += samples.tobytes()
+        self.stream_ended = False
+        if self.device is None:
+            self.device = self.sink.start()
+            self.feed_timer.start()
+            self.playback_started.emit()
+        self._feed()
+
+    def end_of_stream(self):
+        """Marks that no more buffers are coming for the current answer."""
+        self.stream_ended = True
+        if self.device is None:
+            self.playback_finished.emit()
+
+    def stop(self):
+        """Stops playback immediately and drops anything still queued."""
+        self.pending.clear()
+        self.stream_ended = True
+        if self.device is not None:
+            self._finish()
+
+    def is_active(self) -> bool:
+        return self.device is not None
+
+    def buffered_seconds(self) -> float:
+        """Seconds of audio queued but not yet handed to the sink (safe to read from any thread)."""
+        return len(self.pending) / (2 * self.sink.format().sampleRate())
+
+    def _feed(self):
+        """Moves as much queued audio into the sink as it has room for."""
+        if self.device is None:
+            return
+        if self.pending:
+            count = min(len(self.pending), self.sink.bytesFree())
+            count -= count % 2 # whole int16 samples only
+            if count > 0:
+                self.device.write(bytes(self.pending[:count]))
+                del self.pending[:count]
+        elif self.stream_ended and self.sink.state() == QAudio.State.IdleState:
+            # Sink has played out everything we gave it
+            self._finish()
+
+    def _finish(self):
+        self.feed_timer.stop()
+        self.sink.stop()
+        self.device = None
+        self.playback_finished.emit()
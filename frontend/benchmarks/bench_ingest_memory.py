@@ -0,0 +1,180 @@
+"""
+Peak memory of document ingestion vs document size: whole-file reads
+(read bytes -> extract all pages -> chunk -> embed everything) against
+page-wise streaming (ingest_pipeline.ingest_files).
+
+Run from the frontend folder:
+    python -m benchmarks.bench_ingest_memory [--sizes-mb 1 4 16 64] [--synthetic pdf txt] [--files big.pdf ...]
+Without --files, synthetic textbooks of the given sizes are generated: PDFs
+with a text page and an (uncompressed grey) illustration per page, the case
+that matters, and plain text. Each (mode, document) pair runs in a fresh process and reports its
+peak RSS above what the imports alone cost. Embeddings come from a cheap stub
+and are thrown away, so the numbers are the ingestion path's own memory, not
+the model's or the index's (--model uses the real sentence-transformers model).
+Streaming extracts in-process here (workers=0) so the peak is all in one process.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import subprocess
+
+import numpy as np
+
+SENTENCE = "Two apples and three apples make five apples. Count them one by one with your finger. "
+DEFAULT_SIZES_MB = [1, 4, 16, 64]
+DIM = 384
+PDF_PAGE_LINES = 40 # lines of SENTENCE per synthetic PDF page
+PDF_IMAGE_SIZE = (320, 240) # grey illustration per page, 75 KB of image data
+
+
+class DiscardingRAG:
+    """Just enough of LocalRAG for ingestion: embeds (stub or real model) and keeps only ids."""
+    def __init__(self, model=None):
+        self.encoder = None
+        if model:
+            from sentence_transformers import SentenceTransformer
+            self.encoder = SentenceTransformer(model, device="cpu")
+        self.next_id = 0
+
+    def embed(self, texts, batch_size=64):
+        if self.encoder is not None:
+            return self.encoder.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+        return np.random.default_rng(len(texts)).standard_normal((len(texts), DIM), dtype=np.float32)
+
+    def add_chunks(self, chunks, embeddings, save=True):
+        ids = list(range(self.next_id, self.next_id + len(chunks)))
+        self.next_id += len(chunks)
+        return ids
+
+    def remove_chunks(self, ids, save=True):
+        return len(ids)
+
+    def save(self):
+        pass
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def make_textbook(folder: str, size_mb: int) -> str:
+    path = os.path.join(folder, f"textbook_{size_mb}mb.txt")
+    line = SENTENCE * 20 + "\n"
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(size_mb * 1024 * 1024 // len(line)):
+            f.write(line)
+    return path
+
+
+def make_pdf_textbook(folder: str, size_mb: int) -> str:
+    """A minimal PDF written by hand (no PDF library needed): per page a text stream and an image XObject."""
+    path = os.path.join(folder, f"textbook_{size_mb}mb.pdf")
+    width, height = PDF_IMAGE_SIZE
+    image = np.random.default_rng(0).integers(0, 256, width * height, dtype=np.uint8).tobytes()
+    text = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({SENTENCE.strip()}) '" for _ in range(PDF_PAGE_LINES)) + " ET"
+    content = f"{text}\nq {width} 0 0 {height} 40 40 cm /Im1 Do Q".encode("latin-1")
+    page_count = max(1, size_mb * 1024 * 1024 // (len(content) + len(image)))
+    # Objects 1-3 are the catalog, page tree and font; page i (from 0) is objects 4+3i (page), 5+3i (text), 6+3i (image)
+    kids = " ".join(f"{4 + 3 * i} 0 R" for i in range(page_count))
+    offsets = []
+    with open(path, "wb") as f:
+        def write_object(body: bytes, stream: bytes = None):
+            offsets.append(f.tell())
+            f.write(f"{len(offsets)} 0 obj\n".encode() + body)
+            if stream is not None:
+                f.write(b"\nstream\n" + stream + b"\nendstream")
+            f.write(b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        write_object(b"<< /Type /Catalog /Pages 2 0 R >>")
+        write_object(f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>".encode())
+        write_object(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        for i in range(page_count):
+            page = 4 + 3 * i
+            write_object(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {page + 1} 0 R "
+                         f"/Resources << /Font << /F1 3 0 R >> /XObject << /Im1 {page + 2} 0 R >> >> >>".encode())
+            write_object(f"<< /Length {len(content)} >>".encode(), content)
+            write_object(f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                         f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Length {len(image)} >>".encode(), image)
+        xref = f.tell()
+        f.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+        f.write("".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode())
+        f.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return path
+
+
+SYNTHETIC = {"pdf": make_pdf_textbook, "txt": make_textbook}
+
+
+def run_single(mode: str, path: str, model=None) -> dict:
+    from doc_text import extract_pages, chunk_pages
+    from ingest_pipeline import ingest_files, EMBED_BATCH_SIZE
+
+    rag = DiscardingRAG(model)
+    baseline = peak_rss_mb()
+    start_time = time.perf_counter()
+    if mode == "whole":
+        file_name = os.path.basename(path)
+        with open(path, "rb") as f:
+            file_bytes = f.read()
+        chunks = chunk_pages(file_name, extract_pages(file_name, file_bytes))
+        rag.add_chunks(chunks, rag.embed([chunk["text"] for chunk in chunks], batch_size=EMBED_BATCH_SIZE))
+        chunk_count = len(chunks)
+    else:
+        _, report = ingest_files(rag, [path], workers=0)
+        chunk_count = report.chunks
+    return {
+        "mode": mode,
+        "document": os.path.basename(path),
+        "document_mb": round(os.path.getsize(path) / (1024 * 1024), 2),
+        "chunks": chunk_count,
+        "seconds": round(time.perf_counter() - start_time, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "ingest_rss_mb": round(peak_rss_mb() - baseline, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=DEFAULT_SIZES_MB)
+    parser.add_argument("--synthetic", nargs="+", choices=list(SYNTHETIC), default=list(SYNTHETIC),
+                        help="kinds of synthetic textbook to generate")
+    parser.add_argument("--files", nargs="+", help="real documents to measure instead of synthetic ones")
+    parser.add_argument("--modes", nargs="+", choices=["whole", "streaming"], default=["whole", "streaming"])
+    parser.add_argument("--model", help="embed with this sentence-transformers model instead of the stub")
+    parser.add_argument("--single", nargs=2, metavar=("MODE", "PATH"), help="run one measurement and print JSON")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.single[0], args.single[1], args.model)))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        paths = args.files or [SYNTHETIC[kind](folder, size_mb) for kind in args.synthetic for size_mb in args.sizes_mb]
+        for path in paths:
+            for mode in args.modes:
+                command = [sys.executable, "-m", "benchmarks.bench_ingest_memory", "--single", mode, path]
+                if args.model:
+                    command += ["--model", args.model]
+                out = subprocess.run(command, capture_output=True, text=True, check=True)
+                # The pipeline prints progress; the result is the last line
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                results.append(result)
+                print(f"{result['document']:>24} ({result['document_mb']:7.1f} MB) {mode:>9}: "
+                      f"+{result['ingest_rss_mb']:7.1f} MB peak RSS, {result['seconds']:.1f}s")
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
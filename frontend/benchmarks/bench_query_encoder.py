@@ -0,0 +1,118 @@
+"""
+Throughput and per-query latency of question encoding under concurrent
+clients: query_encoder.QueryEncoder with and without micro-batching, with and
+without the query embedding cache.
+
+Run from the frontend folder:
+    python -m benchmarks.bench_query_encoder [--clients 1 4 16] [--wait-ms 2 5 10] --out query_encoder.json
+Every client thread sends --queries questions back to back, drawn from the
+labeled retrieval questions with a fraction (--repeat-rate) repeating one
+already asked. "unbatched" encodes on each caller's thread (one forward
+pass per question); "batched" gathers misses for --wait-ms. Uses the real
+sentence-transformers model (LocalRAG's unless --model).
+"""
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import threading
+
+import numpy as np
+
+from query_encoder import QueryEncoder
+
+QUESTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "retrieval_questions.json")
+DEFAULT_CLIENTS = [1, 4, 16]
+DEFAULT_WAIT_MS = [5.0]
+
+
+def question_stream(questions: list, count: int, repeat_rate: float, seed: int) -> list:
+    """Questions for one client: mostly fresh (a numbered variant), sometimes an earlier one again."""
+    rng = random.Random(seed)
+    asked = []
+    for i in range(count):
+        if asked and rng.random() < repeat_rate:
+            asked.append(rng.choice(asked))
+        else:
+            asked.append(f"{rng.choice(questions)} ({seed}-{i})")
+    return asked
+
+
+def run_config(encode_batch, questions: list, clients: int, queries: int, repeat_rate: float,
+               wait_ms: float, cache: bool) -> dict:
+    encoder = QueryEncoder(encode_batch, cache_size=4096 if cache else 0, max_wait_ms=wait_ms)
+    streams = [question_stream(questions, queries, repeat_rate, seed) for seed in range(clients)]
+    barrier = threading.Barrier(clients + 1)
+
+    def client(stream):
+        barrier.wait()
+        for text in stream:
+            encoder.encode(text)
+
+    threads = [threading.Thread(target=client, args=(stream,)) for stream in streams]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start_time
+    stats = encoder.stats()
+    return {
+        "mode": "batched" if wait_ms > 0 else "unbatched",
+        "wait_ms": wait_ms,
+        "cache": cache,
+        "clients": clients,
+        "queries": clients * queries,
+        "qps": round(clients * queries / seconds, 1),
+        **{name: stats[name] for name in ("hit_rate", "avg_batch", "latency_p50_ms", "latency_p95_ms")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=DEFAULT_CLIENTS)
+    parser.add_argument("--queries", type=int, default=50, help="questions per client")
+    parser.add_argument("--repeat-rate", type=float, default=0.3)
+    parser.add_argument("--wait-ms", type=float, nargs="+", default=DEFAULT_WAIT_MS)
+    parser.add_argument("--model", help="sentence-transformers model (default: LocalRAG's)")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    from local_rag import EMBEDDING_MODEL
+
+    model = SentenceTransformer(args.model or EMBEDDING_MODEL, device="cpu")
+
+    def encode_batch(texts):
+        return model.encode(texts, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+
+    with open(QUESTIONS, "r", encoding="utf-8") as f:
+        questions = [question["question"] for question in json.load(f)]
+    encode_batch(questions) # warm-up
+
+    results = []
+    for clients in args.clients:
+        for cache in (False, True):
+            for wait_ms in [0.0] + args.wait_ms:
+                result = run_config(encode_batch, questions, clients, args.queries, args.repeat_rate, wait_ms, cache)
+                results.append(result)
+                print(f"{clients:>3} clients, {result['mode']:>9} (wait {wait_ms:g} ms), cache {'on ' if cache else 'off'}: "
+                      f"{result['qps']:7.1f} q/s, p50 {result['latency_p50_ms']} ms, p95 {result['latency_p95_ms']} ms, "
+                      f"batch {result['avg_batch']}")
+
+    report = {
+        "machine": {"platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count()},
+        "model": args.model or EMBEDDING_MODEL,
+        "configs": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
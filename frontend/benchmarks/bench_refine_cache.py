@@ -0,0 +1,55 @@
+"""
+Latency saved per sentence by memoizing ChatTTS's refine-text stage.
+
+Run from the frontend folder:
+    python -m benchmarks.bench_refine_cache
+Each sentence is synthesized once with an empty refine cache (refine + code
+inference + decoding) and once with its refined text already cached (code
+inference + decoding only). The audio cache is disabled throughout.
+"""
+import json
+import time
+import argparse
+import statistics
+
+from chatbot_logic import ChatbotLogic
+from refine_cache import RefineCache, KNOWN_PHRASES
+from tts_cache import TTSCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    logic = ChatbotLogic(components=("tts",), tts_process=False)
+    logic.tts_cache = TTSCache(cache_dir=None, memory_bytes=0)
+    logic.refine_cache = RefineCache(path=None, params_signature=repr(logic.params_refine_text))
+
+    rows = []
+    for phrase in KNOWN_PHRASES:
+        start_time = time.perf_counter()
+        logic.synthesize(phrase)
+        uncached = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        logic.synthesize(phrase)
+        cached = time.perf_counter() - start_time
+
+        rows.append({"text": phrase, "refine_uncached_s": round(uncached, 3),
+                     "refine_cached_s": round(cached, 3), "saved_s": round(uncached - cached, 3)})
+        print(f"{uncached:6.2f}s -> {cached:6.2f}s  saved {uncached - cached:+.2f}s  {phrase}")
+
+    report = {
+        "median_saved_s": round(statistics.median(row["saved_s"] for row in rows), 3),
+        "mean_saved_s": round(statistics.mean(row["saved_s"] for row in rows), 3),
+        "sentences": rows,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Retrieval quality and latency of the RAG layer (local_rag.LocalRAG) on a fixed
+corpus, so changes to chunking, the embedding model or the index can be
+compared run to run.
+
+Run from the frontend folder:
+    python -m benchmarks.bench_retrieval --out retrieval.json
+    python -m benchmarks.bench_retrieval --baseline retrieval.json   # diff against a saved run
+    python -m benchmarks.bench_retrieval --corpus ../docs --questions my_questions.json --index-types flat ivfpq
+The corpus (benchmarks/retrieval_corpus) is ingested into a fresh in-memory
+index once, and the same embeddings are then indexed with each of
+--index-types (doc_index.INDEX_TYPES), every approximate one searched with each
+of its --nprobe / --ef-search settings. Each question in benchmarks/retrieval_questions.json names
+its source document and an evidence phrase; a retrieved chunk is relevant if
+it comes from that document and contains the phrase, which keeps the labels
+valid whatever the chunk size. --distractor-docs adds generated filler
+documents to grow the index without adding answers.
+
+Reported once: question encoding latency p50/p95 (the embedding model's
+share of each query; afterwards questions come from the query embedding
+cache). Reported per configuration: recall@k and MRR over the top --k chunks, how
+much of the exact (flat) top k was found, p50/p95 latency of retrieve() and
+of query() with a stub in place of the Groq LLM (retrieval + prompt building,
+the part of ChatbotLogic.get_response that runs locally), index build time
+(including IVF-PQ training) and index memory (serialized FAISS index plus
+chunk records) - the memory and latency vs recall trade-off for picking
+chatbot_logic.RAG_INDEX_TYPE. IVF-PQ only trains from --ivf-train-min chunks;
+below that it is still flat. With --baseline the exit status is 1 if
+recall/MRR dropped or latency, build time or memory grew by more than
+--tolerance.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import resource
+
+import faiss
+import numpy as np
+
+from doc_index import DocIndex, INDEX_TYPES, IVF_TRAIN_MIN_VECTORS
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(BENCH_DIR, "retrieval_corpus")
+DEFAULT_QUESTIONS = os.path.join(BENCH_DIR, "retrieval_questions.json")
+DEFAULT_KS = [1, 3, 5, 10]
+WARMUP_QUERIES = 3
+DEFAULT_TOLERANCE = 0.10 # 10% slower (or 10% lower recall) than the baseline counts as a regression
+DISTRACTOR_WORDS = 700
+DEFAULT_NPROBES = [4, 16, 64]
+DEFAULT_EF_SEARCHES = [16, 64, 256]
+
+
+class StubLLM:
+    """Stands in for ChatGroq so query() runs everything but generation."""
+    class Message:
+        content = "Great question! Let's look at it together."
+
+    def invoke(self, messages):
+        return self.Message()
+
+    def stream(self, messages):
+        yield self.Message()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def percentile_ms(seconds: list, q: float) -> float:
+    return round(float(np.percentile(seconds, q)) * 1000, 3)
+
+
+def make_distractors(corpus_paths: list, folder: str, count: int) -> list:
+    """Filler documents of shuffled corpus words: more chunks to search, none of them relevant."""
+    words = []
+    for path in corpus_paths:
+        with open(path, "r", encoding="utf-8") as f:
+            words += f.read().split()
+    rng = random.Random(0)
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"distractor_{i:04d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(" ".join(rng.choice(words) for _ in range(DISTRACTOR_WORDS)))
+        paths.append(path)
+    return paths
+
+
+def index_memory(rag) -> dict:
+    """Size of the FAISS index (as serialized, close to its in-memory size) and of the chunk records."""
+    index_bytes = faiss.serialize_index(rag.index.index).nbytes
+    chunk_bytes = sum(len(json.dumps(chunk, ensure_ascii=False).encode("utf-8")) for _, chunk in rag.index.chunks.items())
+    return {"faiss_mb": round(index_bytes / (1024 * 1024), 3), "chunks_mb": round(chunk_bytes / (1024 * 1024), 3)}
+
+
+def chunk_key(chunk: dict) -> tuple:
+    return chunk["source"], chunk["page"], chunk["text"]
+
+
+def evaluate(rag, questions: list, ks: list, exact=None) -> tuple:
+    """
+    Recall@k, MRR and latency over the labeled questions, plus how much of
+    the exact top k each search found if `exact` (per question, the chunk
+    keys an exact search returned) is given. Returns (metrics, this run's
+    per-question chunk keys).
+    """
+    max_k = max(ks)
+    for question in questions[:WARMUP_QUERIES]:
+        rag.retrieve(question["question"], k=max_k)
+
+    # Questions whose evidence got split across chunks: no retrieval could find them
+    labeled = {(chunk["source"], question["evidence"]) for _, chunk in rag.index.chunks.items()
+               for question in questions if chunk["source"] == question["source"] and question["evidence"] in chunk["text"]}
+    unanswerable = sum(1 for question in questions if (question["source"], question["evidence"]) not in labeled)
+
+    ranks, tops, retrieve_seconds, query_seconds = [], [], [], []
+    for question in questions:
+        start_time = time.perf_counter()
+        hits = rag.retrieve(question["question"], k=max_k)
+        retrieve_seconds.append(time.perf_counter() - start_time)
+        rank = next((position for position, (_, chunk) in enumerate(hits, start=1)
+                     if chunk["source"] == question["source"] and question["evidence"] in chunk["text"]), None)
+        ranks.append(rank)
+        tops.append([chunk_key(chunk) for _, chunk in hits])
+
+        start_time = time.perf_counter()
+        rag.query(question["question"])
+        query_seconds.append(time.perf_counter() - start_time)
+
+    metrics = {
+        "questions": len(questions),
+        "unanswerable": unanswerable,
+        "recall": {f"@{k}": round(sum(1 for rank in ranks if rank and rank <= k) / len(ranks), 4) for k in ks},
+        "mrr": round(sum(1.0 / rank for rank in ranks if rank) / len(ranks), 4),
+        "retrieve_ms": {"p50": percentile_ms(retrieve_seconds, 50), "p95": percentile_ms(retrieve_seconds, 95)},
+        "query_stub_llm_ms": {"p50": percentile_ms(query_seconds, 50), "p95": percentile_ms(query_seconds, 95)},
+    }
+    if exact is not None:
+        metrics["exact_overlap"] = {
+            f"@{k}": round(float(np.mean([len(set(top[:k]) & set(reference[:k])) / max(1, len(reference[:k]))
+                                          for top, reference in zip(tops, exact)])), 4)
+            for k in ks
+        }
+    return metrics, tops
+
+
+def search_settings(index_type: str, args) -> list:
+    if index_type == "ivfpq":
+        return [{"nprobe": nprobe} for nprobe in args.nprobe]
+    if index_type == "hnsw":
+        return [{"ef_search": ef_search} for ef_search in args.ef_search]
+    return [{}]
+
+
+def config_name(result) -> str:
+    return ",".join([result["index_type"]] + [f"{name}={value}" for name, value in result["search"].items()])
+
+
+def run(args) -> dict:
+    from local_rag import LocalRAG, EMBEDDING_MODEL
+    from ingest_pipeline import ingest_files
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    corpus_paths = sorted(os.path.join(args.corpus, name) for name in os.listdir(args.corpus)
+                          if os.path.isfile(os.path.join(args.corpus, name)))
+
+    folder = tempfile.mkdtemp(prefix="bench_retrieval_")
+    try:
+        paths = corpus_paths + make_distractors(corpus_paths, folder, args.distractor_docs)
+        # Nothing is saved: the index lives in memory only
+        rag = LocalRAG(index_dir=None, embedding_model=args.model or EMBEDDING_MODEL)
+        rag.llm = StubLLM()
+        start_time = time.perf_counter()
+        with rag.update():
+            _, report = ingest_files(rag, paths, workers=args.workers)
+        ingest_seconds = time.perf_counter() - start_time
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    # Encoding cost of a question on its own; afterwards the query embedding
+    # cache serves them, so the latencies below are search and prompt building
+    encode_seconds = []
+    for question in questions:
+        start_time = time.perf_counter()
+        rag.embed([question["question"]])
+        encode_seconds.append(time.perf_counter() - start_time)
+    rag.embed_queries([question["question"] for question in questions])
+
+    # Every index type is built from the same embeddings, so only index construction is timed
+    ids, vectors = rag.index._vectors()
+    chunks = [rag.index.chunks[int(i)] for i in ids]
+    exact_index = rag.index
+    _, exact = evaluate(rag, questions, args.k)
+
+    configs = []
+    for index_type in args.index_types:
+        doc_index = DocIndex(exact_index.dim, embedding_model=exact_index.embedding_model, index_type=index_type,
+                             train_min_vectors=args.ivf_train_min)
+        start_time = time.perf_counter()
+        doc_index.add(vectors, chunks)
+        doc_index.train_if_needed()
+        build_seconds = time.perf_counter() - start_time
+        rag.index = doc_index
+        for settings in search_settings(index_type, args):
+            doc_index.set_search_params(**settings)
+            metrics, _ = evaluate(rag, questions, args.k, exact=exact)
+            result = {"index_type": index_type, "search": settings, "trained": doc_index.trained,
+                      "build_s": round(build_seconds, 3), "index_memory": index_memory(rag)}
+            result.update(metrics)
+            configs.append(result)
+            recall = ", ".join(f"{k} {value}" for k, value in result["recall"].items())
+            print(f"{config_name(result)}: {result['index_memory']['faiss_mb']} MB index; recall {recall}; "
+                  f"MRR {result['mrr']}; retrieve p50 {result['retrieve_ms']['p50']} ms, "
+                  f"p95 {result['retrieve_ms']['p95']} ms")
+
+    return {
+        "model": exact_index.embedding_model,
+        "documents": report.documents,
+        "chunks": len(chunks),
+        "ingest_s": round(ingest_seconds, 3),
+        "query_encode_ms": {"p50": percentile_ms(encode_seconds, 50), "p95": percentile_ms(encode_seconds, 95)},
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "configs": configs,
+    }
+
+
+def diff_against(baseline: dict, results: dict, tolerance: float) -> list:
+    """Prints metric changes per configuration against a saved run and returns the regressions."""
+    previous = {config_name(result): result for result in baseline.get("configs", [])}
+    regressions = []
+    for result in results["configs"]:
+        name = config_name(result)
+        if name not in previous:
+            print(f"{name}: not in the baseline")
+            continue
+        old_result = previous[name]
+        # (metric, old, new, True if bigger is better)
+        metrics = [(f"recall{k}", old_result.get("recall", {}).get(k), value, True)
+                   for k, value in result["recall"].items()]
+        metrics.append(("mrr", old_result.get("mrr"), result["mrr"], True))
+        metrics += [(f"{metric}_{q}", old_result.get(metric, {}).get(q), result[metric][q], False)
+                    for metric in ("retrieve_ms", "query_stub_llm_ms") for q in ("p50", "p95")]
+        metrics.append(("build_s", old_result.get("build_s"), result["build_s"], False))
+        metrics.append(("faiss_mb", old_result.get("index_memory", {}).get("faiss_mb"),
+                        result["index_memory"]["faiss_mb"], False))
+        for metric, old, new, bigger_is_better in metrics:
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = -change if bigger_is_better else change
+            flag = "  ❌ regression" if worse > tolerance else ""
+            print(f"{name} {metric}: {old} -> {new} ({change:+.1%}){flag}")
+            if worse > tolerance:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="folder of documents to index")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="labeled questions JSON")
+    parser.add_argument("--model", help="sentence-transformers model (default: LocalRAG's)")
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_KS)
+    parser.add_argument("--distractor-docs", type=int, default=0)
+    parser.add_argument("--index-types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--nprobe", type=int, nargs="+", default=DEFAULT_NPROBES, help="IVF-PQ settings to try")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=DEFAULT_EF_SEARCHES, help="HNSW settings to try")
+    parser.add_argument("--ivf-train-min", type=int, default=IVF_TRAIN_MIN_VECTORS,
+                        help="train IVF-PQ from this many chunks (lower it to try IVF-PQ on a small corpus)")
+    parser.add_argument("--workers", type=int, default=0, help="extraction processes (0 = in this process)")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --out to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    results = run(args)
+    report = {
+        "machine": {"platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count()},
+        "corpus": os.path.basename(os.path.normpath(args.corpus)),
+        "distractor_docs": args.distractor_docs,
+        **results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = diff_against(json.load(f), results, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Correctness and speed of the single-pass text normalizer.
+
+Run from the frontend folder:
+    python -m benchmarks.bench_text_normalizer
+First every case in normalizer_golden.json (grade 1-2 math answers) is run
+through normalize_for_tts and compared with its expected spoken form; any
+mismatch is printed and the script exits with status 1. Then the corpus is
+normalized repeatedly with the new normalizer and with the previous
+inflect-based _clean_text (kept below for comparison) and the per-sentence
+times are reported.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+from text_normalizer import normalize_for_tts
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "normalizer_golden.json")
+
+
+def legacy_clean_text(text: str, p) -> str:
+    """ChatbotLogic._clean_text before text_normalizer: one str.replace per symbol, then regexes."""
+    SYMBOL_MAP = {'+': 'plus', '-': 'minus', '*': 'times', '/': 'divided by', '=': 'equals', '%': 'percent', '>': 'greater than', '<': 'less than', '&': 'and', '@': 'at', '#': 'number', '$': 'dollar', '^': 'caret', '√': 'square root'}
+    for symbol, word in SYMBOL_MAP.items():
+        text = text.replace(symbol, f' {word} ')
+    def replace_digits(match):
+        num = int(match.group(0))
+        return p.number_to_words(num)
+    text = re.sub(r'\b\d+\b', replace_digits, text)
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    if not text or len(text.strip()) < 3:
+        return "Let's try again with a different question!"
+    return text
+
+
+def time_per_call(function, texts, rounds) -> float:
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            function(text)
+    return (time.perf_counter() - start_time) / (rounds * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200, help="passes over the corpus per timing")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+
+    failures = 0
+    for case in cases:
+        spoken = normalize_for_tts(case["input"])
+        if spoken != case["expected"]:
+            failures += 1
+            print(f"❌ {case['input']!r}\n   expected: {case['expected']!r}\n   got:      {spoken!r}")
+    print(f"Golden corpus: {len(cases) - failures}/{len(cases)} cases match")
+
+    texts = [case["input"] for case in cases]
+    report = {"golden_cases": len(cases), "golden_failures": failures,
+              "normalizer_us": round(time_per_call(normalize_for_tts, texts, args.rounds) * 1e6, 2)}
+    try:
+        import inflect
+    except ImportError:
+        print("inflect is not installed; skipping the comparison with the old _clean_text")
+    else:
+        p = inflect.engine()
+        report["legacy_us"] = round(time_per_call(lambda text: legacy_clean_text(text, p), texts, args.rounds) * 1e6, 2)
+        report["speedup"] = round(report["legacy_us"] / report["normalizer_us"], 2)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Real-time factor of one long ChatTTS call vs length-grouped batched sentences.
+
+Run from the frontend folder (CPU-only machines are the interesting case):
+    python -m benchmarks.bench_tts_batch [--repeats 2] [--out batch.json]
+RTF = synthesis seconds / seconds of audio produced; lower is better, below 1
+means faster than real time. The phrase cache is disabled for the run.
+"""
+import json
+import time
+import argparse
+
+from chatbot_logic import ChatbotLogic, SAMPLE_RATE, TTS_MAX_BATCH, TTS_MAX_LENGTH_RATIO
+from tts_cache import TTSCache
+from refine_cache import RefineCache
+
+LONG_ANSWERS = [
+    "Great question! Two plus three is five. Hold up two fingers on one hand. "
+    "Now hold up three fingers on the other hand. Count them all together. You did it!",
+    "A triangle has three sides and three corners. Look around the room. "
+    "Can you find something shaped like a triangle? Maybe a slice of pizza! "
+    "Draw one in the air with your finger.",
+    "The word cat starts with the letter c. Say it with me, c, a, t. "
+    "Now let's try hat. Just change the first letter to h. "
+    "Cat and hat rhyme because they sound the same at the end. Wonderful work!",
+]
+
+
+def timed(fn):
+    start_time = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    logic = ChatbotLogic(components=("tts",), tts_process=False)
+    logic.tts_cache = TTSCache(cache_dir=None, memory_bytes=0)
+    logic.refine_cache = RefineCache(path=None, params_signature=repr(logic.params_refine_text))
+
+    totals = {"single": [0.0, 0.0], "batched": [0.0, 0.0]} # [synthesis s, audio s]
+    answers = []
+    for answer in LONG_ANSWERS:
+        for _ in range(args.repeats):
+            wav, single_s = timed(lambda: logic.synthesize(answer))
+            wavs, batched_s = timed(lambda: logic.synthesize_batch(answer))
+            single_audio = len(wav) / SAMPLE_RATE if wav is not None else 0.0
+            batched_audio = sum(len(w) for w in wavs if w is not None) / SAMPLE_RATE
+            totals["single"][0] += single_s
+            totals["single"][1] += single_audio
+            totals["batched"][0] += batched_s
+            totals["batched"][1] += batched_audio
+            answers.append({
+                "chars": len(answer),
+                "sentences": len(wavs),
+                "single": {"synthesis_s": round(single_s, 3), "audio_s": round(single_audio, 3),
+                           "rtf": round(single_s / single_audio, 3) if single_audio else None},
+                "batched": {"synthesis_s": round(batched_s, 3), "audio_s": round(batched_audio, 3),
+                            "rtf": round(batched_s / batched_audio, 3) if batched_audio else None},
+            })
+
+    summary = {mode: round(synth / audio, 3) if audio else None for mode, (synth, audio) in totals.items()}
+    report = {
+        "max_batch": TTS_MAX_BATCH,
+        "max_length_ratio": TTS_MAX_LENGTH_RATIO,
+        "rtf": summary,
+        "answers": answers,
+    }
+    print(f"RTF one long string: {summary['single']}  batched sentences: {summary['batched']}")
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
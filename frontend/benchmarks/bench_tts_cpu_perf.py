@@ -0,0 +1,147 @@
+"""
+Real-time factor of ChatTTS on the CPU in float, int8 and int8 + compile
+modes, with an audio-similarity check of each against the float baseline.
+
+Run from the frontend folder on the target machine:
+    python -m benchmarks.bench_tts_cpu_perf [--modes float int8 int8_compile] [--out cpu.json]
+Each mode runs in a fresh process (thread pools and compilation are
+process-wide). Every phrase is synthesized with the same torch seed in every
+mode; the float run also repeats each phrase with another seed, which gives
+the similarity two float renderings already have ("float_reseeded").
+
+Sampled speech never matches sample for sample, so similarity is the
+correlation of the mean log-magnitude spectra (voice timbre), reported
+together with the duration ratio. RTF = synthesis seconds / audio seconds.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+MODES = {
+    "float": {"cpu_perf": False, "compile_tts": False},
+    "int8": {"cpu_perf": True, "compile_tts": False},
+    "int8_compile": {"cpu_perf": True, "compile_tts": True},
+}
+PHRASES = [
+    "Two plus three is five.",
+    "Let's count the apples together.",
+    "A triangle has three sides and three corners.",
+    "Great job, you're doing amazing!",
+    "Can you show me four fingers on one hand?",
+]
+SEED = 1330
+
+
+def run_single(mode: str, wav_dir: str) -> dict:
+    import torch
+    from chatbot_logic import ChatbotLogic, SAMPLE_RATE
+    from tts_cache import TTSCache
+    from refine_cache import RefineCache
+
+    start_time = time.perf_counter()
+    logic = ChatbotLogic(components=("tts",), tts_process=False, **MODES[mode])
+    boot_seconds = time.perf_counter() - start_time
+    logic.tts_cache = TTSCache(cache_dir=None, memory_bytes=0)
+    logic.refine_cache = RefineCache(path=None, params_signature=repr(logic.params_refine_text))
+
+    synthesis_s = audio_s = 0.0
+    for i, phrase in enumerate(PHRASES):
+        torch.manual_seed(SEED)
+        start_time = time.perf_counter()
+        wav = logic.synthesize(phrase)
+        synthesis_s += time.perf_counter() - start_time
+        if wav is not None:
+            audio_s += len(wav) / SAMPLE_RATE
+            np.save(os.path.join(wav_dir, f"{mode}_{i}.npy"), wav)
+        if mode == "float":
+            torch.manual_seed(SEED + 1)
+            wav = logic.synthesize(phrase)
+            if wav is not None:
+                np.save(os.path.join(wav_dir, f"float_reseeded_{i}.npy"), wav)
+
+    return {
+        "mode": mode,
+        "threads": torch.get_num_threads(),
+        "interop_threads": torch.get_num_interop_threads(),
+        "boot_s": round(boot_seconds, 3),
+        "synthesis_s": round(synthesis_s, 3),
+        "audio_s": round(audio_s, 3),
+        "rtf": round(synthesis_s / audio_s, 3) if audio_s else None,
+    }
+
+
+def spectral_profile(wav, n_fft=1024, hop=256) -> np.ndarray:
+    """Mean log-magnitude spectrum of a waveform."""
+    if len(wav) < n_fft:
+        wav = np.pad(wav, (0, n_fft - len(wav)))
+    frames = np.lib.stride_tricks.sliding_window_view(wav, n_fft)[::hop]
+    magnitude = np.abs(np.fft.rfft(frames * np.hanning(n_fft), axis=1))
+    return np.log(magnitude + 1e-5).mean(axis=0)
+
+
+def similarity(reference, wav) -> dict:
+    a, b = spectral_profile(reference), spectral_profile(wav)
+    return {
+        "spectral_correlation": round(float(np.corrcoef(a, b)[0, 1]), 4),
+        "duration_ratio": round(len(wav) / len(reference), 3),
+    }
+
+
+def compare(wav_dir: str, mode: str) -> dict:
+    """Average similarity of one mode's audio to the float audio over all phrases."""
+    scores = []
+    for i in range(len(PHRASES)):
+        reference_path = os.path.join(wav_dir, f"float_{i}.npy")
+        path = os.path.join(wav_dir, f"{mode}_{i}.npy")
+        if os.path.exists(reference_path) and os.path.exists(path):
+            scores.append(similarity(np.load(reference_path), np.load(path)))
+    if not scores:
+        return {}
+    return {key: round(sum(score[key] for score in scores) / len(scores), 4) for key in scores[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--single", choices=list(MODES), help="run one mode in this process and print JSON")
+    parser.add_argument("--wav-dir", help="where --single saves its audio")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.single, args.wav_dir)))
+        return
+
+    modes = ["float"] + [mode for mode in args.modes if mode != "float"]
+    results = []
+    with tempfile.TemporaryDirectory() as wav_dir:
+        for mode in modes:
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_tts_cpu_perf", "--single", mode, "--wav-dir", wav_dir],
+                capture_output=True, text=True, check=True
+            )
+            # ChatbotLogic prints progress; the result is the last line
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        for result in results:
+            result["vs_float"] = compare(wav_dir, result["mode"] if result["mode"] != "float" else "float_reseeded")
+
+    baseline = results[0]["rtf"]
+    for result in results:
+        speedup = f"{baseline / result['rtf']:.2f}x" if baseline and result["rtf"] else "n/a"
+        print(f"{result['mode']:>13}: RTF {result['rtf']} ({speedup} vs float), "
+              f"similarity {result['vs_float'].get('spectral_correlation')}, "
+              f"{result['threads']} threads, boot {result['boot_s']:.1f}s")
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
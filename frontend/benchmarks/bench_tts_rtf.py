@@ -0,0 +1,187 @@
+"""
+Release-to-release TTS performance: ChatbotLogic.generate_tts over a fixed
+corpus of short, medium and long child-directed answers.
+
+Run from the frontend folder:
+    python -m benchmarks.bench_tts_rtf --out tts_rtf.json
+    python -m benchmarks.bench_tts_rtf --baseline tts_rtf.json   # diff against a saved run
+Only ChatTTS is loaded (no RAG, no network), in this process (no TTS worker),
+with the phrase cache disabled. Every combination of --threads and batching
+(one infer() per answer vs length-grouped sentence batches) runs in a fresh
+process, so thread pools and peak RSS don't carry over between them. The
+thread count torch actually used is reported as torch_threads.
+
+Per text size the JSON reports synthesis time, audio duration, RTF
+(synthesis / audio, lower is better), time to first sample (first chunk of
+synthesize_stream) and the process's peak RSS. With --baseline the RTF and
+time to first sample of each configuration are compared with the saved run,
+and the exit status is 1 if any got worse by more than --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import resource
+import subprocess
+
+from scipy.io import wavfile
+
+CORPUS = {
+    "short": [
+        "Great job!",
+        "Two plus two is four.",
+        "Let's try again.",
+        "Can you count to five?",
+    ],
+    "medium": [
+        "A triangle has three sides and three corners. Can you draw one in the air?",
+        "Five apples take away two apples leaves three apples. Let's count them together.",
+        "The word cat starts with the letter c. What other words start with c?",
+    ],
+    "long": [
+        "Great question! Two plus three is five. Hold up two fingers on one hand. "
+        "Now hold up three fingers on the other hand. Count them all together. You did it!",
+        "A circle is round like a ball and has no corners at all. A square has four sides "
+        "that are all the same length. Look around the classroom. Can you find something "
+        "round and something square? Tell me what you found!",
+    ],
+}
+DEFAULT_THREADS = [1, 2, 4]
+DEFAULT_TOLERANCE = 0.10 # 10% slower than the baseline counts as a regression
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_single(threads: int, batched: bool) -> dict:
+    import torch
+    from chatbot_logic import ChatbotLogic
+    from tts_cache import TTSCache
+    from refine_cache import RefineCache
+    from cpu_perf import configure_threads
+
+    # ChatbotLogic only applies tts_threads in CPU performance mode, which is
+    # off by default; set the thread count here so every mode gets it
+    configure_threads(threads)
+    logic = ChatbotLogic(components=("tts",), tts_process=False, tts_threads=threads)
+    logic.tts_cache = TTSCache(cache_dir=None, memory_bytes=0)
+
+    def fresh_refine_cache():
+        # Every timed run pays for refinement: batched and unbatched synthesis
+        # key the refine cache differently, so sharing one would favour one of them
+        logic.refine_cache = RefineCache(path=None, params_signature=repr(logic.params_refine_text))
+
+    sizes = {}
+    with tempfile.TemporaryDirectory() as out_dir:
+        output_path = os.path.join(out_dir, "answer.wav")
+        for size, texts in CORPUS.items():
+            synthesis_s = audio_s = first_sample_s = 0.0
+            for text in texts:
+                fresh_refine_cache()
+                start_time = time.perf_counter()
+                for _ in logic.synthesize_stream(text):
+                    first_sample_s += time.perf_counter() - start_time
+                    break
+
+                fresh_refine_cache()
+                start_time = time.perf_counter()
+                path = logic.generate_tts(text, output_path, batched=batched)
+                synthesis_s += time.perf_counter() - start_time
+                if path:
+                    rate, samples = wavfile.read(path)
+                    audio_s += len(samples) / rate
+            sizes[size] = {
+                "texts": len(texts),
+                "synthesis_s": round(synthesis_s, 3),
+                "audio_s": round(audio_s, 3),
+                "rtf": round(synthesis_s / audio_s, 3) if audio_s else None,
+                "time_to_first_sample_s": round(first_sample_s / len(texts), 3),
+            }
+    return {"threads": threads, "torch_threads": torch.get_num_threads(), "batched": batched,
+            "peak_rss_mb": peak_rss_mb(), "sizes": sizes}
+
+
+def config_name(result) -> str:
+    return f"threads={result['threads']},batched={result['batched']}"
+
+
+def diff_against(baseline: dict, results: list, tolerance: float) -> list:
+    """Prints metric changes per configuration and returns the regressions."""
+    previous = {config_name(result): result for result in baseline.get("configs", [])}
+    regressions = []
+    for result in results:
+        name = config_name(result)
+        if name not in previous:
+            print(f"{name}: not in the baseline")
+            continue
+        for size, stats in result["sizes"].items():
+            before = previous[name]["sizes"].get(size, {})
+            for metric in ("rtf", "time_to_first_sample_s"):
+                old, new = before.get(metric), stats.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                flag = "  ❌ regression" if change > tolerance else ""
+                print(f"{name} {size:>6} {metric}: {old} -> {new} ({change:+.1%}){flag}")
+                if change > tolerance:
+                    regressions.append((name, size, metric, old, new))
+        old_rss = previous[name].get("peak_rss_mb")
+        if old_rss:
+            print(f"{name} peak RSS: {old_rss} -> {result['peak_rss_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=DEFAULT_THREADS)
+    parser.add_argument("--batching", choices=["off", "on", "both"], default="both")
+    parser.add_argument("--single", nargs=2, metavar=("THREADS", "BATCHED"),
+                        help="run one configuration in this process and print JSON")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --out to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(int(args.single[0]), args.single[1] == "1")))
+        return
+
+    batching = {"off": [False], "on": [True], "both": [False, True]}[args.batching]
+    results = []
+    for threads in args.threads:
+        for batched in batching:
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_tts_rtf", "--single", str(threads), str(int(batched))],
+                capture_output=True, text=True, check=True
+            )
+            # ChatbotLogic prints progress; the result is the last line
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            results.append(result)
+            rtfs = ", ".join(f"{size} {stats['rtf']}" for size, stats in result["sizes"].items())
+            print(f"{config_name(result)} ({result['torch_threads']} torch threads): RTF {rtfs}; "
+                  f"peak RSS {result['peak_rss_mb']} MB")
+
+    report = {
+        "machine": {"platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count()},
+        "configs": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = diff_against(json.load(f), results, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+First-turn vs steady-state TTS latency, with and without the boot warm-up pass.
+
+Run from the frontend folder:
+    python -m benchmarks.bench_tts_warmup
+Each mode runs in a fresh process so lazy initialisation from one run can't
+leak into the other. The phrase cache is disabled so every call really infers.
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+PHRASES = [
+    "Two plus three is five.",
+    "Let's count the apples together.",
+    "A triangle has three sides.",
+    "Great job, you're doing amazing!",
+    "Can you show me four fingers?",
+    "The cat sat on the mat.",
+]
+
+
+def run_single(warm_up: bool) -> dict:
+    from chatbot_logic import ChatbotLogic
+    from tts_cache import TTSCache
+    from refine_cache import RefineCache
+
+    start_time = time.perf_counter()
+    logic = ChatbotLogic(components=("tts",), warm_up_tts=warm_up, tts_process=False)
+    boot_seconds = time.perf_counter() - start_time
+    logic.tts_cache = TTSCache(cache_dir=None, memory_bytes=0)
+    logic.refine_cache = RefineCache(path=None, params_signature=repr(logic.params_refine_text))
+
+    latencies = []
+    for phrase in PHRASES:
+        start_time = time.perf_counter()
+        logic.synthesize(phrase)
+        latencies.append(time.perf_counter() - start_time)
+
+    steady = statistics.median(latencies[1:])
+    return {
+        "warm_up": warm_up,
+        "boot_s": round(boot_seconds, 3),
+        "first_turn_s": round(latencies[0], 3),
+        "steady_state_s": round(steady, 3),
+        "first_turn_gap_s": round(latencies[0] - steady, 3),
+        "latencies_s": [round(t, 3) for t in latencies],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--single", choices=["cold", "warm"], help="run one mode in this process and print JSON")
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.single == "warm")))
+        return
+
+    results = []
+    for mode in ("cold", "warm"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_tts_warmup", "--single", mode],
+            capture_output=True, text=True, check=True
+        )
+        # ChatbotLogic prints progress; the result is the last line
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    for result in results:
+        label = "with warm-up   " if result["warm_up"] else "without warm-up"
+        print(f"{label}: first turn {result['first_turn_s']:.2f}s, steady state {result['steady_state_s']:.2f}s, "
+              f"gap {result['first_turn_gap_s']:+.2f}s (boot {result['boot_s']:.1f}s)")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
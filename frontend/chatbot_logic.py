@@ -1,8 +1,9 @@
 import os
 import sys
 import subprocess
-import re
-import inflect
+import time
+import threading
+import contextlib
 import torch
 import numpy as np
 from scipy.io.wavfile import write as write_wav
@@ -14,58 +15,439 @@ parent_dir_of_repo = "./backend"
 sys.path.insert(0, os.path.abspath(parent_dir_of_repo))
 import ChatTTS
 from backend.rag_system import RAGSystem
+from local_rag import LocalRAG
+from doc_index import StaleSnapshotError
+from streaming import split_sentences, iter_sentences, prefetch, is_cancelled
+from tts_cache import TTSCache, make_key
+import refine_cache
+from refine_cache import RefineCache
+from tts_process import TTSProcessClient
+from text_normalizer import normalize_for_tts
+from cpu_perf import configure_threads, quantize_linear_int8
+from ingest_manifest import IngestManifest
+from ingest_pipeline import ingest_files
+from semantic_cache import SemanticCache
+from doc_watcher import DocWatcher
+
+SAMPLE_RATE = 24000 # ChatTTS output rate
+# Ask ChatTTS for partial audio while it decodes a sentence (infer(stream=True))
+STREAM_PARTIAL_AUDIO = True
+# The voice is sampled once (seed 1330) and reused from this file on later starts
+SPEAKER_EMB_PATH = "speaker_emb.txt"
+# Short synthetic sentence run at boot so the first real answer doesn't pay lazy-init costs
+WARM_UP_TTS = True
+WARM_UP_TEXT = "Hello friend, let us learn together."
+# Batched synthesis: at most this many sentences per infer() call, and the
+# longest text in a batch may be at most this many times the shortest, so
+# short sentences aren't padded out to the length of long ones.
+TTS_MAX_BATCH = 4
+TTS_MAX_LENGTH_RATIO = 1.6
+# Run ChatTTS in its own process (tts_process.py) so inference doesn't compete
+# with Qt and RealtimeSTT for the GIL. Falls back to in-process if it can't start.
+TTS_WORKER_PROCESS = True
+# CPU performance mode for the fanless classroom PCs (see cpu_perf.py): int8
+# dynamic quantization of the GPT/decoder Linear layers and explicit torch
+# thread counts. Only applies when ChatTTS runs on the CPU. Off until its
+# speed and voice quality have been checked on the target PC
+# (benchmarks/bench_tts_cpu_perf.py).
+TTS_CPU_PERF_MODE = False
+# Let ChatTTS torch.compile its GPT. Costs boot time and only pays off on some
+# CPUs; check with benchmarks/bench_tts_cpu_perf.py before turning it on.
+TTS_COMPILE = False
+# torch intra-op threads in CPU performance mode; None = physical cores minus one
+TTS_NUM_THREADS = None
+# Documents picked up from ./docs at boot, and the record of what is already
+# in the RAG index so unchanged files aren't parsed and embedded again
+SUPPORTED_DOC_EXTS = {".pdf", ".docx", ".pptx", ".txt"}
+INGEST_MANIFEST_PATH = "ingest_manifest.json"
+DOCS_FOLDER = "./docs"
+# Keep watching ./docs after boot and update the index as files are added,
+# changed or deleted (doc_watcher.py), so new worksheets need no restart.
+# Only for backends that keep an index between runs (LocalRAG).
+WATCH_DOCS = True
+# "local": local_rag.LocalRAG (FAISS index kept on disk, batched parallel ingest);
+# "backend": backend.rag_system.RAGSystem, which re-reads and re-ingests every
+# document on every boot (see how_to_setup.md for what it doesn't support)
+RAG_BACKEND = "local"
+# LocalRAG's FAISS index: "flat" (exact), "hnsw" (faster on big corpora) or
+# "ivfpq" (a fraction of the memory, for district-wide corpora on 8 GB PCs).
+# Compare them on your documents with benchmarks/bench_retrieval.py.
+RAG_INDEX_TYPE = "flat"
+# Reuse the answer to an earlier question with the same meaning instead of
+# calling the LLM again (see semantic_cache.py)
+SEMANTIC_ANSWER_CACHE = True
 
 # This class encapsulates all the backend logic from your original script.
 class ChatbotLogic:
-    def __init__(self):
+    def __init__(self, rag=None, background=False, on_component_ready=None,
+                 components=("rag", "tts"), warm_up_tts=WARM_UP_TTS, tts_process=TTS_WORKER_PROCESS,
+                 cpu_perf=TTS_CPU_PERF_MODE, compile_tts=TTS_COMPILE, tts_threads=TTS_NUM_THREADS):
+        """
+        With background=True the constructor returns immediately and the RAG
+        index (plus document ingestion) and the ChatTTS model load in parallel
+        on their own threads. on_component_ready(name, seconds, ok) is called
+        from that thread as each of "rag" and "tts" finishes; calls that need a
+        component wait for it. `components` limits what gets loaded (e.g. just
+        ("tts",) for TTS benchmarks). tts_process=False keeps ChatTTS in this
+        process instead of a worker process. cpu_perf, compile_tts and
+        tts_threads pick the CPU performance mode, ChatTTS's compile option and
+        the torch thread count.
+        """
         print("Initializing Chatbot Logic...")
         # ----------------- SETUP -----------------
-        self.p = inflect.engine()
-        self.rag = RAGSystem()
-        auto_ingest_docs(self.rag)
+        # Anything with RAGSystem's interface can be passed in (e.g. stub_llm.StubRAG)
+        self.rag = rag
+        self.chattts = None
+        self.tts_engine = None # TTSProcessClient when ChatTTS runs out of process
+        self.tts_process = tts_process
+        self.on_component_ready = on_component_ready
+        self.components = components
+        self.warm_up_tts = warm_up_tts
+        self.cpu_perf = cpu_perf
+        self.compile_tts = compile_tts
+        self.tts_threads = tts_threads
+        self.answer_cache = None
+        self.doc_watcher = None
+        self.ready = {"rag": threading.Event(), "tts": threading.Event()}
+        self.boot_times = {}
+        self.boot_errors = {}
+
+        loaders = {name: loader for name, loader in (("rag", self._load_rag), ("tts", self._load_tts)) if name in components}
+        if background:
+            for name, loader in loaders.items():
+                threading.Thread(target=self._boot_component, args=(name, loader), name=f"boot-{name}", daemon=True).start()
+        else:
+            for name, loader in loaders.items():
+                self._boot_component(name, loader, reraise=True)
+            print("Chatbot Logic Initialized Successfully.")
 
+    def _load_rag(self):
+        if self.rag is None:
+            self.rag = LocalRAG(index_type=RAG_INDEX_TYPE) if RAG_BACKEND == "local" else RAGSystem()
+        auto_ingest_docs(self.rag, DOCS_FOLDER)
+        if WATCH_DOCS and getattr(self.rag, "persistent", False):
+            self.doc_watcher = DocWatcher(DOCS_FOLDER, lambda: auto_ingest_docs(self.rag, DOCS_FOLDER),
+                                          exts=SUPPORTED_DOC_EXTS).start()
+        if SEMANTIC_ANSWER_CACHE:
+            # Backends without embeddings only get exact (normalized) repeats
+            embed = getattr(self.rag, "embed_queries", None) or getattr(self.rag, "embed", None)
+            self.answer_cache = SemanticCache(embed=embed,
+                                              corpus_version=lambda: getattr(self.rag, "corpus_version", None))
+
+    def _load_tts(self):
+        if self.tts_process:
+            engine = TTSProcessClient(warm_up_tts=self.warm_up_tts, cpu_perf=self.cpu_perf,
+                                      compile_tts=self.compile_tts, tts_threads=self.tts_threads,
+                                      on_failed=self._on_tts_worker_failed)
+            if engine.start():
+                self.tts_engine = engine
+                return
+            print("⚠️ TTS worker process didn't start, loading ChatTTS in this process instead.")
+            engine.close()
+        self._load_tts_in_process()
+
+    def _on_tts_worker_failed(self):
+        """The TTS worker crashed for good mid-session: load ChatTTS here instead of going mute."""
+        print("⚠️ TTS worker process is gone, loading ChatTTS in this process instead.")
+        # Requests wait in wait_until_ready("tts") until the in-process model is up
+        self.ready["tts"].clear()
+        threading.Thread(target=self._boot_component, args=("tts", self._load_tts_in_process),
+                         name="boot-tts-fallback", daemon=True).start()
+
+    def _load_tts_in_process(self):
         # ----------------- TTS SETUP -----------------
         device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"TTS will use {device.upper()} for processing")
-        self.chattts = ChatTTS.Chat()
-        self.chattts.load(compile=False, device=device)
-        torch.manual_seed(1330)
-        spk_id = self.chattts.sample_random_speaker()
+        cpu_perf = self.cpu_perf and device == "cpu"
+        if cpu_perf:
+            threads, interop_threads = configure_threads(self.tts_threads)
+            print(f"TTS CPU mode: {threads} threads, {interop_threads} inter-op threads")
+        chattts = ChatTTS.Chat()
+        chattts.load(compile=self.compile_tts, device=device)
+        if cpu_perf:
+            quantized = quantize_linear_int8(chattts)
+            print(f"TTS CPU mode: int8 Linear layers in {', '.join(quantized) or 'nothing'}")
+        spk_id = load_speaker(chattts)
 
         self.params_infer_code = ChatTTS.Chat.InferCodeParams(
             spk_emb=spk_id, temperature=0.7, top_P=0.9, top_K=30
         )
         self.params_refine_text = ChatTTS.Chat.RefineTextParams()
-        print("Chatbot Logic Initialized Successfully.")
+        # Repeated phrases (greetings, encouragement, fallbacks) skip inference entirely
+        self.tts_cache = TTSCache()
+        # Text refinement output depends only on the cleaned text (and refine params)
+        self.refine_cache = RefineCache(params_signature=repr(self.params_refine_text))
+        if self.warm_up_tts:
+            self._warm_up(chattts)
+        self.chattts = chattts
+        if self.tts_engine is not None:
+            # Taking over from a failed worker
+            self.tts_engine.close()
+            self.tts_engine = None
+
+    def _warm_up(self, chattts):
+        """Runs one throwaway inference through refine, code and decoder so their lazy setup happens now."""
+        start_time = time.perf_counter()
+        try:
+            chattts.infer(
+                [WARM_UP_TEXT],
+                params_refine_text=self.params_refine_text,
+                params_infer_code=self.params_infer_code,
+                use_decoder=True
+            )
+            self.boot_times["tts_warm_up"] = time.perf_counter() - start_time
+            print(f"⏱ TTS warm-up took {self.boot_times['tts_warm_up']:.2f}s")
+        except Exception as e:
+            print(f"⚠️ TTS warm-up failed (first answer may be slower): {e}")
+
+    def _boot_component(self, name, loader, reraise=False):
+        """Runs one loader, logs how long it took and signals readiness (even on failure)."""
+        start_time = time.perf_counter()
+        try:
+            loader()
+        except Exception as e:
+            self.boot_errors[name] = e
+            print(f"⚠️ Failed to load {name}: {e}")
+            if reraise:
+                raise
+        finally:
+            self.boot_times[name] = time.perf_counter() - start_time
+            self.ready[name].set()
+        print(f"⏱ {name} ready in {self.boot_times[name]:.2f}s")
+        if self.on_component_ready:
+            self.on_component_ready(name, self.boot_times[name], name not in self.boot_errors)
+
+    def is_ready(self, name: str) -> bool:
+        return self.ready[name].is_set() and name not in self.boot_errors
+
+    def wait_until_ready(self, name: str, timeout=None) -> bool:
+        """Blocks until "rag" or "tts" has loaded. Raises if it failed, returns False on timeout."""
+        if name not in self.components:
+            raise RuntimeError(f"{name} was not loaded by this ChatbotLogic")
+        if not self.ready[name].wait(timeout):
+            return False
+        if name in self.boot_errors:
+            raise RuntimeError(f"{name} failed to load: {self.boot_errors[name]}")
+        return True
 
     def get_response(self, text: str) -> str:
-        """Queries the RAG system to get a text response."""
-        return self.rag.query(text)
+        """Queries the RAG system to get a text response, unless the same question was answered recently."""
+        self.wait_until_ready("rag")
+        cached = self.answer_cache.lookup(text) if self.answer_cache is not None else None
+        if cached is not None:
+            return cached
+        start_time = time.perf_counter()
+        response = self.rag.query(text)
+        if self.answer_cache is not None:
+            self.answer_cache.store(text, response, time.perf_counter() - start_time)
+        return response
 
-    def generate_tts(self, text: str, output_path="output.wav") -> str:
+    def stream_response(self, text: str, cancel=None):
+        """
+        Yields the response in pieces as the LLM produces them. The LLM runs on
+        a background thread, so it keeps generating while the caller does TTS.
+        Falls back to a single piece if the RAG backend can't stream.
+        Setting the `cancel` event stops the stream and abandons the LLM call.
+        A question answered recently (same meaning, see semantic_cache.py) is
+        answered from the cache in one piece; its sentences are then in the
+        TTS cache too, so the audio comes back without inference as well.
+        """
+        self.wait_until_ready("rag")
+        cached = self.answer_cache.lookup(text) if self.answer_cache is not None else None
+        if cached is not None:
+            yield cached
+            return
+        start_time = time.perf_counter()
+        stream_query = getattr(self.rag, "stream_query", None)
+        pieces = []
+        for piece in ([self.rag.query(text)] if stream_query is None else prefetch(stream_query(text), cancel=cancel)):
+            pieces.append(piece)
+            yield piece
+        # Only complete answers are worth repeating
+        if self.answer_cache is not None and not is_cancelled(cancel):
+            self.answer_cache.store(text, "".join(pieces), time.perf_counter() - start_time)
+
+    def generate_tts(self, text: str, output_path="output.wav", batched=False) -> str:
         """
         Generates TTS audio from text and SAVES it to a file.
         CRITICAL CHANGE: This function NO LONGER plays the audio.
         It just creates the file and returns the path.
+        The desktop app doesn't use this any more (see synthesize_stream); it is
+        kept for callers that need a file (the web client should use
+        audio_artifacts.store_answer_audio, which serves compressed Opus).
+        With batched=True the answer is synthesized sentence by sentence in
+        length-grouped batches (synthesize_batch) and the pieces are joined.
+        """
+        if batched:
+            wavs = [wav for wav in self.synthesize_batch(text) if wav is not None]
+            wav = np.concatenate(wavs) if wavs else None
+        else:
+            wav = self.synthesize(text)
+        if wav is None:
+            return ""
+        try:
+            # Save the audio file
+            write_wav(output_path, SAMPLE_RATE, to_int16(wav))
+            return output_path
+        except Exception as e:
+            print(f"⚠️ TTS Error: {str(e)}")
+            return ""
+
+    def synthesize(self, text: str, cancel=None):
+        """
+        Generates TTS audio from text and returns it in memory as a float32
+        numpy array (None on failure or if `cancel` was set meanwhile).
         """
         try:
+            self.wait_until_ready("tts")
+            if self.tts_engine is not None:
+                return self.tts_engine.synthesize(text, cancel)
             safe_text = self._clean_text(text)
-            wavs = self.chattts.infer(
-                [safe_text],
-                params_refine_text=self.params_refine_text,
-                params_infer_code=self.params_infer_code,
-                use_decoder=True
-            )
+            cache_key = self._tts_cache_key(safe_text)
+            wav = self.tts_cache.get(cache_key)
+            if wav is not None:
+                return wav
+            wavs = self._infer([safe_text], cancel=cancel)
+            if is_cancelled(cancel):
+                # Interrupted by cancel_tts(); whatever came back is truncated
+                return None
             if not wavs or wavs[0] is None:
                 print("⚠️ No audio generated.")
-                return ""
+                return None
+            wav = np.asarray(wavs[0], dtype=np.float32).ravel()
+            self.tts_cache.put(cache_key, wav)
+            return wav
+        except Exception as e:
+            print(f"⚠️ TTS Error: {str(e)}")
+            return None
 
-            # Save the audio file
-            write_wav(output_path, 24000, (wavs[0] * 32767).astype(np.int16))
-            return output_path
+    def synthesize_stream(self, text, cancel=None):
+        """
+        Splits the answer into sentences and yields float32 audio chunks as soon
+        as they are synthesized, so playback can start on sentence 1 while the
+        rest is still being made. With STREAM_PARTIAL_AUDIO each sentence also
+        arrives in several partial chunks straight from ChatTTS's decoder.
+        `text` can be a full string or a stream of chunks from stream_response.
+        Stops between sentences/chunks once the `cancel` event is set.
+        """
+        sentences = split_sentences(text) if isinstance(text, str) else iter_sentences(text)
+        for sentence in sentences:
+            if is_cancelled(cancel):
+                return
+            if self.tts_engine is not None:
+                yield from self.tts_engine.synthesize_stream(sentence, cancel)
+            elif STREAM_PARTIAL_AUDIO:
+                yield from self._synthesize_partial(sentence, cancel)
+            else:
+                wav = self.synthesize(sentence, cancel)
+                if wav is not None:
+                    yield wav
+
+    def _synthesize_partial(self, text: str, cancel=None):
+        """Yields the new samples ChatTTS decodes for one sentence, chunk by chunk."""
+        try:
+            self.wait_until_ready("tts")
+            safe_text = self._clean_text(text)
+            cache_key = self._tts_cache_key(safe_text)
+            wav = self.tts_cache.get(cache_key)
+            if wav is not None:
+                yield wav
+                return
+            chunks = []
+            for wavs in self._infer([safe_text], stream=True, cancel=cancel):
+                if is_cancelled(cancel):
+                    # Leaving the loop closes ChatTTS's generator and stops inference
+                    return
+                if wavs is not None and len(wavs) and wavs[0] is not None and np.size(wavs[0]):
+                    chunk = np.asarray(wavs[0], dtype=np.float32).ravel()
+                    chunks.append(chunk)
+                    yield chunk
+            if chunks:
+                self.tts_cache.put(cache_key, np.concatenate(chunks))
         except Exception as e:
             print(f"⚠️ TTS Error: {str(e)}")
-            return ""
+
+    def synthesize_batch(self, text, cancel=None) -> list:
+        """
+        Splits `text` (a string, or a list of already split sentences) into
+        sentence units, synthesizes the uncached ones in length-grouped batches
+        with one ChatTTS infer() call per batch, and returns the waveforms in
+        the original sentence order (None for any unit that failed).
+        """
+        sentences = split_sentences(text) if isinstance(text, str) else list(text)
+        try:
+            self.wait_until_ready("tts")
+            if self.tts_engine is not None:
+                return self.tts_engine.synthesize_batch(sentences, cancel)
+            safe_texts = [self._clean_text(sentence) for sentence in sentences]
+            keys = [self._tts_cache_key(safe_text) for safe_text in safe_texts]
+            results = [self.tts_cache.get(key) for key in keys]
+            missing = [(i, safe_texts[i]) for i, wav in enumerate(results) if wav is None]
+            for batch in group_by_length(missing, TTS_MAX_BATCH, TTS_MAX_LENGTH_RATIO):
+                if is_cancelled(cancel):
+                    break
+                wavs = self._infer([safe_text for _, safe_text in batch], cancel=cancel)
+                if is_cancelled(cancel):
+                    break
+                for (i, _), wav in zip(batch, wavs or []):
+                    if wav is not None and np.size(wav):
+                        results[i] = np.asarray(wav, dtype=np.float32).ravel()
+                        self.tts_cache.put(keys[i], results[i])
+            return results
+        except Exception as e:
+            print(f"⚠️ TTS Error: {str(e)}")
+            return [None] * len(sentences)
+
+    def _infer(self, safe_texts: list, stream=False, cancel=None):
+        """Code inference + decoding with the refine stage cached (refine_cache.infer)."""
+        return refine_cache.infer(self.chattts, self.refine_cache, safe_texts, self.params_refine_text,
+                                  self.params_infer_code, stream=stream, cancel=cancel)
+
+    def _refine(self, safe_texts: list, save=True, cancel=None) -> list:
+        """ChatTTS-refined versions of cleaned texts, memoized (refine_cache.refine)."""
+        return refine_cache.refine(self.chattts, self.refine_cache, safe_texts, self.params_refine_text,
+                                   save=save, cancel=cancel)
+
+    def precompute_refined(self, phrases) -> int:
+        """
+        Runs the refine stage offline for known phrases (greetings, praise,
+        fallbacks) and stores the results, so at runtime those phrases only
+        need code inference and decoding. Returns how many were new.
+        """
+        self.wait_until_ready("tts")
+        if self.tts_engine is not None:
+            raise RuntimeError("precompute_refined needs ChatTTS in this process (tts_process=False)")
+        safe_texts = list(dict.fromkeys(self._clean_text(phrase) for phrase in phrases))
+        new = [text for text in safe_texts if self.refine_cache.get(text) is None]
+        if new:
+            self._refine(new)
+        return len(new)
+
+    def cancel_tts(self):
+        """Asks ChatTTS to abort the inference in progress (it checks between generated tokens)."""
+        if self.tts_engine is not None:
+            self.tts_engine.cancel()
+        elif self.chattts is not None and hasattr(self.chattts, "interrupt"):
+            self.chattts.interrupt()
+
+    def tts_cache_stats(self) -> dict:
+        """Hit/miss stats of the TTS phrase cache, wherever ChatTTS is running."""
+        if self.tts_engine is not None:
+            return self.tts_engine.cache_stats()
+        return self.tts_cache.stats()
+
+    def rag_stats(self) -> dict:
+        """Index size and query encoding metrics (cache hit rate, batching, latency) of the RAG backend."""
+        stats = getattr(self.rag, "stats", None)
+        return stats() if stats is not None else {}
+
+    def answer_cache_stats(self) -> dict:
+        """Hit rate and LLM time saved by the semantic answer cache."""
+        return self.answer_cache.stats() if self.answer_cache is not None else {}
+
+    def _tts_cache_key(self, safe_text: str) -> str:
+        params = self.params_infer_code
+        return make_key(safe_text, params.spk_emb, params.temperature, params.top_P, params.top_K)
 
     def launch_game(self, game_name: str):
         """Launches a game script as a new process."""
@@ -88,39 +470,114 @@ class ChatbotLogic:
 
 
     def _clean_text(self, text: str) -> str:
-        """
-        Private helper method for cleaning text.
-        (Copied directly from your clean_text function)
-        """
-        # --- All your text cleaning logic from teacher_chatbot.py goes here ---
-        # (I've omitted the full code for brevity, but you should copy it here)
-        SYMBOL_MAP = {'+': 'plus', '-': 'minus', '*': 'times', '/': 'divided by', '=': 'equals', '%': 'percent', '>': 'greater than', '<': 'less than', '&': 'and', '@': 'at', '#': 'number', '$': 'dollar', '^': 'caret', '√': 'square root'}
-        for symbol, word in SYMBOL_MAP.items():
-            text = text.replace(symbol, f' {word} ')
-        def replace_digits(match):
-            num = int(match.group(0))
-            return self.p.number_to_words(num)
-        text = re.sub(r'\b\d+\b', replace_digits, text)
-        text = re.sub(r'[^\w\s]', ' ', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        if not text or len(text.strip()) < 3:
-            return "Let's try again with a different question!"
-        return text
+        """Spoken form of `text` for ChatTTS (see text_normalizer.normalize_for_tts)."""
+        return normalize_for_tts(text)
+
+def group_by_length(items, max_batch: int, max_ratio: float) -> list:
+    """
+    Groups (index, text) pairs into batches of similar text length: sorts by
+    length and starts a new batch when it is full or the next text is more
+    than max_ratio times longer than the batch's shortest one.
+    """
+    batches = []
+    for item in sorted(items, key=lambda pair: len(pair[1])):
+        if batches and len(batches[-1]) < max_batch and len(item[1]) <= max_ratio * max(len(batches[-1][0][1]), 1):
+            batches[-1].append(item)
+        else:
+            batches.append([item])
+    return batches
+
+def load_speaker(chattts, path=SPEAKER_EMB_PATH) -> str:
+    """Reloads the saved speaker embedding, or samples one with the usual seed and saves it."""
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            spk_emb = f.read().strip()
+        if spk_emb:
+            return spk_emb
+    torch.manual_seed(1330)
+    spk_emb = chattts.sample_random_speaker()
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(spk_emb)
+    except OSError as e:
+        print(f"⚠️ Could not save speaker embedding: {e}")
+    return spk_emb
+
+def to_int16(wav: np.ndarray) -> np.ndarray:
+    """Converts float32 audio in [-1, 1] to int16 PCM."""
+    return (np.clip(wav, -1.0, 1.0) * 32767).astype(np.int16)
 
 # Helper function also moved from the original script
-def auto_ingest_docs(rag, docs_folder="./docs"):
+def auto_ingest_docs(rag, docs_folder=DOCS_FOLDER, manifest_path=INGEST_MANIFEST_PATH) -> dict:
+    """
+    Brings the RAG index in line with the docs folder: new and changed files
+    are ingested, unchanged ones skipped and deleted ones removed from the
+    index, using the manifest of what was ingested before (ingest_manifest.py).
+    That needs a backend that keeps its index between runs: `persistent = True`,
+    an `index_id`, ingest_file() returning the new chunk ids and
+    remove_chunks(ids). Any other backend gets every file, as before.
+    A backend with update() (LocalRAG) gets all changes as one atomic swap,
+    so queries served meanwhile see either the old documents or the new. If
+    another robot process sharing the index saved first, the backend reloads
+    its snapshot and the folder is synced again on top of it.
+    Returns how many files were ingested, unchanged, removed and failed.
+    """
+    for attempt in range(2):
+        try:
+            return _sync_docs(rag, docs_folder, manifest_path)
+        except StaleSnapshotError as e:
+            if attempt:
+                raise
+            print(f"Another process updated the RAG index ({e}), syncing ./docs again on top of it.")
+
+
+def _sync_docs(rag, docs_folder, manifest_path) -> dict:
     if not os.path.exists(docs_folder):
         os.makedirs(docs_folder)
-        return
-    supported_exts = {".pdf", ".docx", ".pptx", ".txt"}
-    files = [f for f in os.listdir(docs_folder) if os.path.isfile(os.path.join(docs_folder, f))]
-    for file_name in files:
-        ext = os.path.splitext(file_name)[1].lower()
-        if ext in supported_exts:
-            file_path = os.path.join(docs_folder, file_name)
-            try:
-                with open(file_path, "rb") as f:
-                    file_bytes = f.read()
-                rag.ingest_file(file_name, file_bytes)
-            except Exception as e:
-                print(f"Failed to ingest {file_name}: {e}")
\ No newline at end of file
+        return {}
+    names = sorted(
+        name for name in os.listdir(docs_folder)
+        if os.path.isfile(os.path.join(docs_folder, name)) and os.path.splitext(name)[1].lower() in SUPPORTED_DOC_EXTS
+    )
+    manifest = None
+    if getattr(rag, "persistent", False):
+        manifest = IngestManifest(manifest_path, index_id=getattr(rag, "index_id", ""))
+        to_ingest, deleted = manifest.plan(docs_folder, names)
+    else:
+        to_ingest, deleted = [(name, None, None) for name in names], []
+
+    update = rag.update() if (to_ingest or deleted) and hasattr(rag, "update") else contextlib.nullcontext()
+    with update:
+        for file_name in deleted:
+            print(f"Removing deleted document from the index: {file_name}")
+            rag.remove_chunks(manifest.forget(file_name))
+        if manifest is not None:
+            # Changed files: their old chunks go before the new ones come in
+            for file_name, _, _ in to_ingest:
+                old_chunk_ids = manifest.forget(file_name)
+                if old_chunk_ids:
+                    rag.remove_chunks(old_chunk_ids)
+
+        if to_ingest and hasattr(rag, "add_chunks"):
+            # Parallel extraction, batched embedding, one index writer (ingest_pipeline.py)
+            chunk_ids, _ = ingest_files(rag, [os.path.join(docs_folder, file_name) for file_name, _, _ in to_ingest])
+        else:
+            chunk_ids = {}
+            for file_name, _, _ in to_ingest:
+                try:
+                    with open(os.path.join(docs_folder, file_name), "rb") as f:
+                        file_bytes = f.read()
+                    chunk_ids[file_name] = rag.ingest_file(file_name, file_bytes)
+                except Exception as e:
+                    print(f"Failed to ingest {file_name}: {e}")
+
+    if manifest is not None:
+        for file_name, stat, sha256 in to_ingest:
+            if file_name in chunk_ids:
+                manifest.record(file_name, stat, sha256, chunk_ids[file_name])
+        manifest.save()
+    summary = {"ingested": len(chunk_ids), "unchanged": len(names) - len(to_ingest), "removed": len(deleted),
+               "failed": len(to_ingest) - len(chunk_ids)}
+    print(f"Documents: {summary['ingested']} ingested, {summary['unchanged']} unchanged, "
+          f"{summary['removed']} removed, {summary['failed']} failed")
+    return summary
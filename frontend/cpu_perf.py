@@ -0,0 +1,69 @@
+import os
+
+import torch
+
+# ChatTTS.Chat submodules whose nn.Linear layers get int8 weights in CPU
+# performance mode: the GPT's transformer (attention + MLP projections) and
+# the decoder's ConvNeXt pointwise layers. The GPT's embedding and
+# weight-normalized output heads are left in float.
+QUANTIZE_MODULES = ("gpt.gpt", "decoder")
+# Cores left free for RealtimeSTT and the Qt event loop
+RESERVED_CORES = 1
+
+
+def physical_cores() -> int:
+    """Physical core count (hyper-threads don't help matrix multiplies), falling back to logical."""
+    try:
+        import psutil
+        cores = psutil.cpu_count(logical=False)
+    except ImportError:
+        cores = None
+    return cores or os.cpu_count() or 1
+
+
+def configure_threads(num_threads=None, interop_threads=1) -> tuple:
+    """
+    Sets torch's intra-op and inter-op thread pools explicitly instead of
+    letting each library grab every logical core. By default ChatTTS gets all
+    physical cores but RESERVED_CORES. Inter-op threads can only be set before
+    torch starts any parallel work; if that already happened they are left as
+    they are. Returns the (intra-op, inter-op) counts in effect.
+    """
+    if num_threads is None:
+        num_threads = max(1, physical_cores() - RESERVED_CORES)
+    torch.set_num_threads(num_threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            pass
+    return torch.get_num_threads(), torch.get_num_interop_threads()
+
+
+def _resolve(root, path: str):
+    for name in path.split("."):
+        root = getattr(root, name, None)
+        if root is None:
+            return None
+    return root
+
+
+def quantize_linear_int8(chattts, module_paths=QUANTIZE_MODULES) -> list:
+    """
+    Replaces the nn.Linear layers under the given ChatTTS submodules with
+    dynamically quantized int8 ones (weights stored as int8, activations
+    quantized on the fly), in place. Returns the paths that were quantized;
+    a submodule that is missing or can't be quantized is skipped with a warning.
+    """
+    quantized = []
+    for path in module_paths:
+        module = _resolve(chattts, path)
+        if not isinstance(module, torch.nn.Module):
+            print(f"⚠️ ChatTTS has no {path} module to quantize")
+            continue
+        try:
+            torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+            quantized.append(path)
+        except Exception as e:
+            print(f"⚠️ Could not quantize {path}, keeping it in float: {e}")
+    return quantized
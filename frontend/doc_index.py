@@ -0,0 +1,381 @@
+import os
+import json
+import mmap
+import uuid
+import contextlib
+
+try:
+    import fcntl
+except ImportError: # Windows: no cross-process lock, one robot process per index folder
+    fcntl = None
+
+import faiss
+import numpy as np
+
+from latency_tracer import write_atomic
+
+# Bump when the snapshot layout changes; older snapshots are rebuilt from ./docs
+SNAPSHOT_FORMAT = 1
+META_FILE = "meta.json"
+LOCK_FILE = ".lock"
+# IO_FLAG_MMAP maps inverted lists; IO_FLAG_MMAP_IFC (FAISS >= 1.10) also maps flat vector codes
+MMAP_FLAGS = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+
+# "flat": exact search, 4 bytes per dimension per chunk, time linear in corpus size.
+# "hnsw": graph search, about as much memory as flat (plus links) but sublinear time.
+# "ivfpq": inverted lists of product-quantized codes, a few percent of flat's memory.
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+DEFAULT_INDEX_TYPE = "flat"
+HNSW_M = 32 # graph links per vector
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64 # candidates explored per search; higher = better recall, slower
+IVF_NPROBE = 16 # inverted lists scanned per search; higher = better recall, slower
+# IVF-PQ is trained on the corpus itself; until it has this many chunks the
+# index stays flat (only ~15 MB at 384 dims). Each PQ codebook has 256 centroids,
+# which k-means wants ~39 training points apiece for.
+IVF_TRAIN_MIN_VECTORS = 10000
+# PQ code size: one byte per this many dimensions (96 bytes instead of 1536 at 384 dims)
+PQ_DIMS_PER_CODE = 4
+
+
+def _pq_codes(dim: int) -> int:
+    """Number of PQ sub-quantizers: about dim / PQ_DIMS_PER_CODE, dividing dim exactly."""
+    return next(m for m in range(max(1, dim // PQ_DIMS_PER_CODE), 0, -1) if dim % m == 0)
+
+
+def _ivf_lists(count: int) -> int:
+    # ~4*sqrt(n) lists, with at least 39 training points per list (FAISS's k-means minimum)
+    return max(1, min(int(4 * count ** 0.5), count // 39))
+
+
+class StaleSnapshotError(RuntimeError):
+    """save() found a newer generation of the same index on disk, saved by another process."""
+
+
+def _owned_copy(index):
+    """
+    A copy of a FAISS index in ordinary memory. clone_index of a memory-mapped
+    index still points into the mapping, which can't grow.
+    """
+    return faiss.deserialize_index(faiss.serialize_index(index))
+
+
+def _generation_files(generation: int, token="") -> dict:
+    # A token unique to each save, so no process ever overwrites a file another one has mapped
+    suffix = f"{generation}-{token}" if token else f"{generation}"
+    return {
+        "index": f"index-{suffix}.faiss",
+        "chunks": f"chunks-{suffix}.jsonl",
+        "ids": f"chunk_ids-{suffix}.npy",
+        "offsets": f"chunk_offsets-{suffix}.npy",
+    }
+
+
+@contextlib.contextmanager
+def _folder_lock(folder: str):
+    """Exclusive lock on the snapshot folder across processes (a no-op where fcntl is missing)."""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(folder, LOCK_FILE), "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class MappedChunks:
+    """
+    Read-only view of a snapshot's chunk records: one JSON line per chunk,
+    found through sorted id and byte-offset arrays. All three are memory
+    mapped, so nothing is parsed until a search returns the chunk.
+    """
+    def __init__(self, folder: str, files: dict):
+        self.ids = np.load(os.path.join(folder, files["ids"]), mmap_mode="r")
+        self.offsets = np.load(os.path.join(folder, files["offsets"]), mmap_mode="r")
+        with open(os.path.join(folder, files["chunks"]), "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _position(self, chunk_id: int):
+        position = int(np.searchsorted(self.ids, chunk_id))
+        return position if position < len(self.ids) and self.ids[position] == chunk_id else None
+
+    def __contains__(self, chunk_id):
+        return self._position(int(chunk_id)) is not None
+
+    def _record(self, position: int) -> dict:
+        start = int(self.offsets[position])
+        end = self.data.find(b"\n", start)
+        return json.loads(self.data[start:end if end != -1 else len(self.data)])
+
+    def __getitem__(self, chunk_id):
+        position = self._position(int(chunk_id))
+        if position is None:
+            raise KeyError(chunk_id)
+        return self._record(position)
+
+    def items(self):
+        for position, chunk_id in enumerate(self.ids):
+            yield int(chunk_id), self._record(position)
+
+
+class DocIndex:
+    """
+    FAISS inner-product index over normalized chunk embeddings (so scores are
+    cosine similarities), with the chunk records kept alongside by id. Ids are
+    stable: removing a document's chunks never renumbers anyone else's, which
+    is what lets the ingest manifest remember them.
+
+    save() writes a snapshot generation (FAISS index, chunk records, lookup
+    arrays) and then switches meta.json to it. load() memory-maps the current
+    generation (faiss IO_FLAG_MMAP, np.load mmap_mode), so startup doesn't
+    depend on corpus size and several robot processes on one machine share the
+    same page-cache pages. The first change after loading copies the index
+    into memory.
+
+    index_type picks the FAISS index (INDEX_TYPES). Approximate indexes trade
+    recall for memory or speed, tuned with nprobe (IVF-PQ) and ef_search
+    (HNSW); benchmarks/bench_retrieval.py measures the trade-off on a corpus.
+    IVF-PQ trains itself in train_if_needed() once there are enough chunks,
+    on everything ingested so far; before that it searches exactly. HNSW
+    can't delete vectors, so removing chunks rebuilds its graph. Only flat
+    indexes are memory-mapped.
+    """
+    def __init__(self, dim: int, index_id=None, embedding_model="", index_type=DEFAULT_INDEX_TYPE,
+                 nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH, train_min_vectors=IVF_TRAIN_MIN_VECTORS):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+        self.dim = dim
+        self.index_id = index_id or uuid.uuid4().hex
+        self.embedding_model = embedding_model
+        self.index_type = index_type
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.train_min_vectors = train_min_vectors
+        self.trained = False # IVF-PQ only: False while still searching a flat index
+        self.index = self._empty_index()
+        self.chunks = {} # id -> {"source", "page", "text"}
+        self.next_id = 0
+        self.generation = 0
+        self.mapped = False
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def _empty_index(self):
+        if self.index_type == "hnsw":
+            hnsw = faiss.IndexHNSWFlat(self.dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+            hnsw.hnsw.efSearch = self.ef_search
+            return faiss.IndexIDMap2(hnsw)
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))
+
+    def _vectors(self) -> tuple:
+        """(ids, vectors) of everything in an IndexIDMap2-wrapped flat or HNSW index."""
+        ids = faiss.vector_to_array(self.index.id_map).astype(np.int64)
+        vectors = self.index.index.reconstruct_n(0, self.index.ntotal) if len(ids) else np.zeros((0, self.dim), np.float32)
+        return ids, vectors
+
+    def set_search_params(self, nprobe=None, ef_search=None):
+        """Changes the recall/speed settings of the approximate index types."""
+        self.nprobe = nprobe or self.nprobe
+        self.ef_search = ef_search or self.ef_search
+        inner = faiss.downcast_index(self.index.index if isinstance(self.index, faiss.IndexIDMap2) else self.index)
+        if hasattr(inner, "hnsw"):
+            inner.hnsw.efSearch = self.ef_search
+        if hasattr(inner, "nprobe"):
+            inner.nprobe = self.nprobe
+
+    def train_if_needed(self) -> bool:
+        """
+        Moves an untrained IVF-PQ index with train_min_vectors or more chunks
+        from its flat start to IVF-PQ, trained on all of them. Returns True if
+        it trained.
+        """
+        if self.index_type != "ivfpq" or self.trained or self.index.ntotal < self.train_min_vectors:
+            return False
+        self._writable()
+        ids, vectors = self._vectors()
+        nlist = _ivf_lists(len(ids))
+        ivf = faiss.index_factory(self.dim, f"IVF{nlist},PQ{_pq_codes(self.dim)}", faiss.METRIC_INNER_PRODUCT)
+        print(f"Training IVF-PQ index ({nlist} lists) on {len(ids)} chunks...")
+        ivf.train(vectors)
+        # Native ids rather than IndexIDMap2: IVF removes by id itself, and the hash map lets it do so
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        ivf.add_with_ids(vectors, ids)
+        self.index = ivf
+        self.trained = True
+        self.set_search_params()
+        return True
+
+    def _writable(self):
+        """Copies a memory-mapped index and its chunk records into memory before the first change."""
+        if self.mapped:
+            self.index = _owned_copy(self.index)
+            self.chunks = dict(self.chunks.items())
+            self.mapped = False
+
+    def copy(self):
+        """An in-memory copy to change while this one keeps serving searches."""
+        doc_index = DocIndex(self.dim, index_id=self.index_id, embedding_model=self.embedding_model,
+                             index_type=self.index_type, nprobe=self.nprobe, ef_search=self.ef_search,
+                             train_min_vectors=self.train_min_vectors)
+        doc_index.index = _owned_copy(self.index)
+        doc_index.trained = self.trained
+        doc_index.chunks = dict(self.chunks.items())
+        doc_index.next_id = self.next_id
+        doc_index.generation = self.generation
+        doc_index.set_search_params()
+        return doc_index
+
+    def add(self, embeddings: np.ndarray, chunks: list) -> list:
+        """Adds chunk records with their embeddings and returns the ids they were given."""
+        ids = list(range(self.next_id, self.next_id + len(chunks)))
+        if not ids:
+            return ids
+        self._writable()
+        self.index.add_with_ids(np.ascontiguousarray(embeddings, dtype=np.float32), np.asarray(ids, dtype=np.int64))
+        self.chunks.update(zip(ids, chunks))
+        self.next_id += len(ids)
+        return ids
+
+    def remove(self, ids) -> int:
+        ids = [int(i) for i in ids if int(i) in self.chunks]
+        if ids:
+            self._writable()
+            if self.index_type == "hnsw":
+                # HNSW graphs don't support deletion: rebuild from the vectors that stay
+                all_ids, vectors = self._vectors()
+                keep = ~np.isin(all_ids, ids)
+                self.index = self._empty_index()
+                if keep.any():
+                    self.index.add_with_ids(np.ascontiguousarray(vectors[keep]), all_ids[keep])
+            else:
+                self.index.remove_ids(np.asarray(ids, dtype=np.int64))
+            for i in ids:
+                del self.chunks[i]
+        return len(ids)
+
+    def search(self, embeddings: np.ndarray, k: int) -> list:
+        """For each query embedding, up to k (score, chunk record) pairs, best first."""
+        if not len(self.chunks):
+            return [[] for _ in range(len(embeddings))]
+        scores, ids = self.index.search(np.ascontiguousarray(embeddings, dtype=np.float32), min(k, len(self.chunks)))
+        return [[(float(score), self.chunks[int(i)]) for score, i in zip(row_scores, row_ids) if i != -1]
+                for row_scores, row_ids in zip(scores, ids)]
+
+    def save(self, folder: str):
+        """
+        Writes a new snapshot generation, points meta.json at it and deletes
+        older ones. Files are never rewritten in place, and saves from several
+        processes sharing the folder take turns. Raises StaleSnapshotError
+        instead of saving if another process has saved a newer generation of
+        this index since it was loaded: writing this copy over it would drop
+        that process's documents while the shared ingest manifest still lists
+        them. The caller reloads and redoes its change on top.
+        """
+        os.makedirs(folder, exist_ok=True)
+        with _folder_lock(folder):
+            current_meta = self._read_meta(folder) or {}
+            if current_meta.get("index_id") == self.index_id and current_meta.get("generation", 0) > self.generation:
+                raise StaleSnapshotError(f"{folder} is at generation {current_meta['generation']}, "
+                                         f"this copy of the index at {self.generation}")
+            # A rebuilt index (new index_id) still counts generations up from the one it replaces
+            generation = max(self.generation, current_meta.get("generation", 0)) + 1
+            files = _generation_files(generation, uuid.uuid4().hex[:8])
+            faiss.write_index(self.index, os.path.join(folder, files["index"]))
+            ids, offsets = [], []
+            with open(os.path.join(folder, files["chunks"]), "wb") as f:
+                for chunk_id, chunk in sorted(self.chunks.items()):
+                    ids.append(chunk_id)
+                    offsets.append(f.tell())
+                    f.write(json.dumps(chunk, ensure_ascii=False).encode("utf-8") + b"\n")
+            np.save(os.path.join(folder, files["ids"]), np.asarray(ids, dtype=np.int64))
+            np.save(os.path.join(folder, files["offsets"]), np.asarray(offsets, dtype=np.int64))
+            meta = {
+                "format": SNAPSHOT_FORMAT, "faiss": faiss.__version__, "embedding_model": self.embedding_model,
+                "dim": self.dim, "index_id": self.index_id, "next_id": self.next_id,
+                "generation": generation, "files": files, "chunks": len(ids), "index_type": self.index_type,
+                "trained": self.trained,
+            }
+            write_atomic(os.path.join(folder, META_FILE), json.dumps(meta, indent=1))
+            self.generation = generation
+            # Processes still mapping the old files keep them alive until they let go (POSIX unlink semantics)
+            current = set(files.values()) | {META_FILE}
+            for name in os.listdir(folder):
+                if name not in current and name.split("-")[0] in ("index", "chunks", "chunk_ids", "chunk_offsets"):
+                    try:
+                        os.remove(os.path.join(folder, name))
+                    except OSError:
+                        pass
+
+    @classmethod
+    def load(cls, folder: str, embedding_model="", dim=None, mmap_io=True, index_type=DEFAULT_INDEX_TYPE,
+             nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH, train_min_vectors=IVF_TRAIN_MIN_VECTORS):
+        """
+        Opens the current snapshot in `folder`, memory-mapped unless mmap_io is
+        False. Returns None if there is none, or if it was written by another
+        snapshot format, FAISS major version, embedding model (or dimension) or
+        index type, in which case the caller builds a fresh index.
+        """
+        options = {"index_type": index_type, "nprobe": nprobe, "ef_search": ef_search,
+                   "train_min_vectors": train_min_vectors}
+        for attempt in range(2):
+            meta = cls._read_meta(folder)
+            if meta is None:
+                return None
+            try:
+                return cls._open(folder, meta, embedding_model, dim, mmap_io, options)
+            except (OSError, RuntimeError) as e:
+                # Another process may have saved a new generation and deleted this one meanwhile
+                if attempt:
+                    print(f"⚠️ Index snapshot is damaged, rebuilding: {e}")
+        return None
+
+    @staticmethod
+    def _read_meta(folder: str):
+        meta_path = os.path.join(folder, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable index snapshot: {e}")
+            return None
+
+    @classmethod
+    def _open(cls, folder: str, meta: dict, embedding_model, dim, mmap_io, options):
+        if meta.get("format") != SNAPSHOT_FORMAT or meta.get("faiss", "").split(".")[0] != faiss.__version__.split(".")[0]:
+            print(f"Index snapshot format/FAISS version changed ({meta.get('format')}, {meta.get('faiss')}), rebuilding.")
+            return None
+        if (embedding_model and meta.get("embedding_model") != embedding_model) or (dim and meta.get("dim") != dim):
+            print(f"Index snapshot was built with {meta.get('embedding_model')} ({meta.get('dim')}d), rebuilding.")
+            return None
+        # Snapshots from before index types were flat
+        if meta.get("index_type", "flat") != options["index_type"]:
+            print(f"Index snapshot is {meta.get('index_type', 'flat')}, not {options['index_type']}; rebuilding.")
+            return None
+
+        files = meta.get("files") or _generation_files(meta["generation"])
+        doc_index = cls(meta["dim"], index_id=meta["index_id"], embedding_model=meta.get("embedding_model", ""), **options)
+        index_path = os.path.join(folder, files["index"])
+        # HNSW graphs and IVF-PQ's hash map can't be mapped; IVF-PQ codes are small in memory anyway
+        if mmap_io and options["index_type"] == "flat":
+            doc_index.index = faiss.read_index(index_path, MMAP_FLAGS)
+        else:
+            doc_index.index = faiss.read_index(index_path)
+        if mmap_io:
+            doc_index.chunks = MappedChunks(folder, files)
+            doc_index.mapped = True
+        else:
+            doc_index.chunks = dict(MappedChunks(folder, files).items())
+        doc_index.trained = meta.get("trained", False)
+        doc_index.next_id = meta["next_id"]
+        doc_index.generation = meta["generation"]
+        doc_index.set_search_params()
+        return doc_index
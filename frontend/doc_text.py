@@ -0,0 +1,114 @@
+import io
+import os
+
+# Chunks are what gets embedded and retrieved: about a paragraph of textbook
+# text, overlapping a little so an answer split across a boundary survives
+CHUNK_CHARS = 800
+CHUNK_OVERLAP_CHARS = 120
+# Plain text has no pages; it is read and chunked this many characters at a time
+TEXT_PAGE_CHARS = 8000
+
+
+def extract_pages(file_name: str, file_bytes: bytes) -> list:
+    """Text of each page (PDF), slide (PPTX) or whole document (DOCX/TXT) as (page number, text) pairs."""
+    ext = os.path.splitext(file_name)[1].lower()
+    if ext == ".pdf":
+        from pypdf import PdfReader
+        reader = PdfReader(io.BytesIO(file_bytes))
+        return [(number, page.extract_text() or "") for number, page in enumerate(reader.pages, start=1)]
+    if ext == ".pptx":
+        from pptx import Presentation
+        slides = Presentation(io.BytesIO(file_bytes)).slides
+        return [(number, "\n".join(shape.text_frame.text for shape in slide.shapes if shape.has_text_frame))
+                for number, slide in enumerate(slides, start=1)]
+    if ext == ".docx":
+        import docx2txt
+        return [(1, docx2txt.process(io.BytesIO(file_bytes)) or "")]
+    if ext == ".txt":
+        return [(1, file_bytes.decode("utf-8", errors="replace"))]
+    raise ValueError(f"Unsupported document type: {ext}")
+
+
+def chunk_text(text: str, size=CHUNK_CHARS, overlap=CHUNK_OVERLAP_CHARS) -> list:
+    """Splits text into ~size-character chunks on word boundaries, each overlapping the previous one."""
+    words = text.split()
+    chunks = []
+    start = 0
+    while start < len(words):
+        length = 0
+        end = start
+        while end < len(words) and (length == 0 or length + len(words[end]) + 1 <= size):
+            length += len(words[end]) + 1
+            end += 1
+        chunks.append(" ".join(words[start:end]))
+        if end == len(words):
+            break
+        # Step back over roughly `overlap` characters of words for the next chunk
+        back = end
+        while back > start + 1 and sum(len(word) + 1 for word in words[back - 1:end]) <= overlap:
+            back -= 1
+        start = back
+    return chunks
+
+
+def chunk_pages(file_name: str, pages) -> list:
+    """Chunk records ({"source", "page", "text"}) for (page number, text) pairs."""
+    return [{"source": file_name, "page": number, "text": chunk}
+            for number, text in pages for chunk in chunk_text(text)]
+
+
+def iter_pages(path: str):
+    """
+    Yields (page number, text) one page/slide at a time. PDF and TXT are
+    read from the file as pages are reached, so neither is ever held in
+    memory whole. PPTX and DOCX are not streamed: python-pptx opens the
+    whole package (images included) before the first slide, and docx2txt
+    extracts all the text at once (text only, small even for big
+    documents). DOCX and TXT are cut into TEXT_PAGE_CHARS pseudo-pages.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        from pypdf import PdfReader
+        # An open file, not a path: given a path pypdf reads the whole file into memory
+        with open(path, "rb") as f:
+            reader = PdfReader(f)
+            for number in range(1, len(reader.pages) + 1):
+                yield number, reader.pages[number - 1].extract_text() or ""
+                # Drop parsed objects (fonts, images) of pages already done; they are re-read if needed
+                reader.resolved_objects.clear()
+    elif ext == ".pptx":
+        from pptx import Presentation
+        for number, slide in enumerate(Presentation(path).slides, start=1):
+            yield number, "\n".join(shape.text_frame.text for shape in slide.shapes if shape.has_text_frame)
+    elif ext == ".docx":
+        import docx2txt
+        yield from _text_pages(io.StringIO(docx2txt.process(path) or ""))
+    elif ext == ".txt":
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            yield from _text_pages(f)
+    else:
+        raise ValueError(f"Unsupported document type: {ext}")
+
+
+def _text_pages(f, size=TEXT_PAGE_CHARS):
+    number, carry = 1, ""
+    while True:
+        block = f.read(size)
+        if not block:
+            break
+        text = carry + block
+        # Don't cut a word in half: what follows the last whitespace starts the next page
+        cut = max(text.rfind(" "), text.rfind("\n")) if len(block) == size else -1
+        text, carry = (text[:cut], text[cut:]) if cut > 0 else (text, "")
+        yield number, text
+        number += 1
+    if carry.strip():
+        yield number, carry
+
+
+def iter_chunks(path: str):
+    """Yields the chunk records of a document page by page (one list per page with text)."""
+    file_name = os.path.basename(path)
+    for number, text in iter_pages(path):
+        chunks = chunk_pages(file_name, [(number, text)])
+        yield number, chunks
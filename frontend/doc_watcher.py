@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import threading
+
+# A change is handled once the folder has been quiet this long, so a file still
+# being copied (or a teacher dropping in ten worksheets) becomes one update
+DEBOUNCE_SECONDS = 3.0
+# How often the folder is listed when inotify isn't available
+POLL_SECONDS = 5.0
+
+# inotify(7) event bits: writes finished, files created/deleted/renamed, and
+# IN_MODIFY so a long copy keeps pushing the debounce deadline back
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+               | _IN_DELETE_SELF | _IN_MOVE_SELF)
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII") # wd, mask, cookie, name length
+
+
+class _Inotify:
+    """Minimal inotify on one directory through libc (Linux only; raises OSError elsewhere)."""
+    def __init__(self, folder: str):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is Linux only")
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), _WATCH_MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed for {folder}")
+
+    def read(self, timeout: float) -> list:
+        """Names of the entries that changed within `timeout` seconds ("" for the folder itself)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names, offset = [], 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            names.append(os.fsdecode(data[offset:offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DocWatcher:
+    """
+    Watches the docs folder on a background thread and calls on_change() once
+    changes to files with one of `exts` (any extension if None) have settled
+    for debounce_seconds. Uses inotify where the platform has it and falls
+    back to listing the folder every poll_seconds (size and mtime of each
+    file). on_change runs on the watcher thread, one call at a time; changes
+    made while it runs trigger another call afterwards.
+    """
+    def __init__(self, folder: str, on_change, exts=None, debounce_seconds=DEBOUNCE_SECONDS,
+                 poll_seconds=POLL_SECONDS):
+        self.folder = folder
+        self.on_change = on_change
+        self.exts = {ext.lower() for ext in exts} if exts else None
+        self.debounce_seconds = debounce_seconds
+        self.poll_seconds = poll_seconds
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.mode = None # "inotify" or "polling" once started
+
+    def start(self):
+        os.makedirs(self.folder, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name="doc-watcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def _relevant(self, name: str) -> bool:
+        return not name or self.exts is None or os.path.splitext(name)[1].lower() in self.exts
+
+    def _snapshot(self) -> dict:
+        snapshot = {}
+        try:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if entry.is_file() and self._relevant(entry.name):
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def _run(self):
+        try:
+            inotify = _Inotify(self.folder)
+            self.mode = "inotify"
+        except (OSError, AttributeError) as e:
+            inotify = None
+            self.mode = "polling"
+            print(f"Watching {self.folder} by polling every {self.poll_seconds:g}s ({e})")
+        snapshot = self._snapshot()
+        deadline = None # when the pending change is considered settled
+        try:
+            while not self.stop_event.is_set():
+                wait = self.poll_seconds if deadline is None else max(0.0, deadline - time.monotonic())
+                if inotify is not None:
+                    changed = any(self._relevant(name) for name in inotify.read(min(wait, 1.0)))
+                else:
+                    if self.stop_event.wait(min(wait, self.poll_seconds)):
+                        break
+                    current = self._snapshot()
+                    changed, snapshot = current != snapshot, current
+                if changed:
+                    deadline = time.monotonic() + self.debounce_seconds
+                elif deadline is not None and time.monotonic() >= deadline:
+                    deadline = None
+                    # Taken before on_change so edits made while it runs show up as changes afterwards
+                    snapshot = self._snapshot()
+                    try:
+                        self.on_change()
+                    except Exception as e:
+                        print(f"⚠️ Updating from {self.folder} failed: {e}")
+        finally:
+            if inotify is not None:
+                inotify.close()
@@ -0,0 +1,87 @@
+import os
+import json
+import hashlib
+
+from latency_tracer import write_atomic
+
+DEFAULT_MANIFEST_PATH = "ingest_manifest.json"
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """Hashes a file in blocks, so a large textbook is never read into memory whole."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """
+    What auto_ingest_docs has already put into the RAG index: for each
+    document (by name inside the docs folder) its size, mtime, sha256 and the
+    chunk ids the index gave it. Entries only mean something for the index
+    they were written against, so the file remembers that index's id and
+    starts empty if it changes (index deleted, rebuilt or swapped).
+    """
+    def __init__(self, path=DEFAULT_MANIFEST_PATH, index_id=""):
+        self.path = path
+        self.index_id = index_id
+        self.files = {} # name -> {"size", "mtime", "sha256", "chunk_ids"}
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable ingest manifest: {e}")
+            return
+        if data.get("index") != self.index_id:
+            print("RAG index changed, re-ingesting all documents.")
+            return
+        self.files.update(data.get("files", {}))
+
+    def plan(self, docs_folder: str, names) -> tuple:
+        """
+        Sorts the documents currently in the folder into (to_ingest, deleted).
+        A file whose size and mtime match its entry is unchanged without being
+        read, so a boot with nothing new only costs one stat() per file. If
+        size or mtime changed the content hash decides (a copied or touched
+        file with the same bytes is not re-ingested).
+        """
+        to_ingest = []
+        for name in names:
+            stat = os.stat(os.path.join(docs_folder, name))
+            entry = self.files.get(name)
+            if entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                continue
+            sha256 = file_sha256(os.path.join(docs_folder, name))
+            if entry is not None and entry["sha256"] == sha256:
+                entry["size"], entry["mtime"] = stat.st_size, stat.st_mtime
+                continue
+            to_ingest.append((name, stat, sha256))
+        present = set(names)
+        deleted = [name for name in self.files if name not in present]
+        return to_ingest, deleted
+
+    def record(self, name: str, stat, sha256: str, chunk_ids):
+        self.files[name] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256,
+                            "chunk_ids": list(chunk_ids or [])}
+
+    def forget(self, name: str):
+        """Drops a document's entry and returns the chunk ids it had in the index."""
+        entry = self.files.pop(name, None)
+        return entry["chunk_ids"] if entry else []
+
+    def save(self):
+        if not self.path:
+            return
+        data = {"index": self.index_id, "files": self.files}
+        try:
+            write_atomic(self.path, json.dumps(data, ensure_ascii=False, indent=1))
+        except OSError as e:
+            print(f"⚠️ Could not save ingest manifest: {e}")
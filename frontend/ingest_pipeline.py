@@ -0,0 +1,231 @@
+import os
+import time
+import queue
+import itertools
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+import ingest_worker
+from ingest_worker import stream_file
+from spawn_main import as_main
+
+# Text extraction (pypdf, docx2txt, python-pptx) is CPU-bound Python, so it
+# runs in worker processes (ingest_worker.py). Two keep extraction ahead of
+# embedding without taking the cores and memory STT, the LLM and TTS need.
+EXTRACT_WORKERS = 2
+# Chunks per embedding forward pass, filled across document and page boundaries
+EMBED_BATCH_SIZE = 64
+# Pages (lists of chunk records) in flight between extraction and embedding.
+# Documents stream through page by page, so together with the embedding batch
+# this bounds ingestion memory however large a document is.
+PAGE_QUEUE_SIZE = 16
+# Seconds to wait for a worker's last pages to arrive after its file is done
+DRAIN_TIMEOUT_SECONDS = 30
+
+
+class IngestReport:
+    """Counts and throughput of one ingest run."""
+    def __init__(self):
+        self.documents = 0
+        self.pages = 0
+        self.chunks = 0
+        self.failed = {} # file name -> error message
+        self.seconds = 0.0
+
+    def summary(self) -> dict:
+        seconds = max(self.seconds, 1e-9)
+        return {
+            "documents": self.documents,
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "failed": len(self.failed),
+            "seconds": round(self.seconds, 3),
+            "documents_per_second": round(self.documents / seconds, 3),
+            "pages_per_second": round(self.pages / seconds, 3),
+        }
+
+
+def ingest_files(rag, paths, workers=EXTRACT_WORKERS, batch_size=EMBED_BATCH_SIZE) -> tuple:
+    """
+    Ingests documents through three stages: a process pool that extracts and
+    chunks files page by page, one embedding stage that packs chunks from any
+    number of pages and files into full batches of `batch_size`, and a single
+    writer that adds them to the index (saved once at the end). Pages stream
+    through bounded queues, so peak memory doesn't grow with document size.
+    `rag` needs embed(texts, batch_size), add_chunks(chunks, embeddings, save)
+    and remove_chunks(ids, save), plus save(). A file that fails in any stage
+    is reported and left out of the index; the others carry on.
+    Returns ({file name: chunk ids} for the files that made it, IngestReport).
+    workers=0 extracts in this process.
+    """
+    start_time = time.perf_counter()
+    report = IngestReport()
+    pages = queue.Queue(PAGE_QUEUE_SIZE)
+    batches = queue.Queue(2)
+    chunk_ids = {}
+    failed = report.failed
+
+    def embed_stage():
+        pending = []
+        while True:
+            chunks = pages.get()
+            if chunks is not None:
+                pending += chunks
+            while len(pending) >= batch_size or (chunks is None and pending):
+                batch, pending = pending[:batch_size], pending[batch_size:]
+                try:
+                    batches.put((batch, rag.embed([chunk["text"] for chunk in batch], batch_size=batch_size)))
+                except Exception:
+                    # Retry file by file so one bad document doesn't fail its batch-mates
+                    for source in dict.fromkeys(chunk["source"] for chunk in batch):
+                        part = [chunk for chunk in batch if chunk["source"] == source]
+                        try:
+                            batches.put((part, rag.embed([chunk["text"] for chunk in part], batch_size=batch_size)))
+                        except Exception as e:
+                            failed.setdefault(source, f"embedding failed: {e}")
+            if chunks is None:
+                batches.put(None)
+                return
+
+    def write_stage():
+        while True:
+            item = batches.get()
+            if item is None:
+                return
+            batch, embeddings = item
+            try:
+                ids = rag.add_chunks(batch, embeddings, save=False)
+            except Exception as e:
+                for chunk in batch:
+                    failed.setdefault(chunk["source"], f"index write failed: {e}")
+                continue
+            for chunk, chunk_id in zip(batch, ids):
+                chunk_ids.setdefault(chunk["source"], []).append(chunk_id)
+
+    stages = [threading.Thread(target=embed_stage, name="ingest-embed", daemon=True),
+              threading.Thread(target=write_stage, name="ingest-write", daemon=True)]
+    for stage in stages:
+        stage.start()
+
+    class PageSink:
+        """Receives pages from stream_file and hands them to the embedding stage."""
+        def put(self, message):
+            if message[1] is not None:
+                report.chunks += len(message[1])
+                pages.put(message[1])
+
+    succeeded = []
+    if workers:
+        for path, page_count, error in _extract_in_pool(list(paths), workers, PageSink()):
+            if error is None:
+                report.pages += page_count
+                succeeded.append(os.path.basename(path))
+            else:
+                failed[os.path.basename(path)] = str(error)
+    else:
+        for path in paths:
+            try:
+                report.pages += stream_file(path, PageSink())
+                succeeded.append(os.path.basename(path))
+            except Exception as e:
+                failed[os.path.basename(path)] = str(e)
+    pages.put(None)
+    for stage in stages:
+        stage.join()
+
+    # Files that failed after some of their chunks were written don't stay half-indexed
+    for file_name, error in failed.items():
+        print(f"Failed to ingest {file_name}: {error}")
+        partial = chunk_ids.pop(file_name, None)
+        if partial:
+            rag.remove_chunks(partial, save=False)
+    rag.save()
+    chunk_ids = {file_name: chunk_ids.get(file_name, []) for file_name in succeeded if file_name not in failed}
+
+    report.documents = len(chunk_ids)
+    report.seconds = time.perf_counter() - start_time
+    summary = report.summary()
+    print(f"Ingested {summary['documents']} documents ({summary['pages']} pages, {summary['chunks']} chunks) "
+          f"in {summary['seconds']:.1f}s: {summary['documents_per_second']:.2f} docs/s, "
+          f"{summary['pages_per_second']:.1f} pages/s, {summary['failed']} failed")
+    return chunk_ids, report
+
+
+def _extract_in_pool(paths: list, workers: int, sink):
+    """
+    Yields (path, page count, error) as worker processes finish files, while
+    a collector thread passes the pages they stream back on to `sink`. Only a
+    few files are in flight at a time. If a worker dies outright (a parser
+    crash, out of memory) the files it was working on fail and a fresh pool
+    takes the rest.
+    """
+    # Spawned, not forked: the parent may hold torch/Qt threads
+    ctx = mp.get_context("spawn")
+    worker_pages = ctx.Queue(PAGE_QUEUE_SIZE)
+    ended = set()
+    ended_changed = threading.Condition()
+
+    def collect():
+        while True:
+            message = worker_pages.get()
+            if message is None:
+                return
+            if message[1] is None:
+                with ended_changed:
+                    ended.add(message[0])
+                    ended_changed.notify_all()
+            else:
+                sink.put(message)
+
+    collector = threading.Thread(target=collect, name="ingest-collect", daemon=True)
+    collector.start()
+
+    def wait_for_pages(path):
+        # A file's result can overtake its last pages, which travel through worker_pages
+        with ended_changed:
+            ended_changed.wait_for(lambda: os.path.basename(path) in ended, DRAIN_TIMEOUT_SECONDS)
+
+    remaining = iter(paths)
+    unsubmitted = None # taken from `remaining` but refused by a broken pool
+
+    def submit(pool, path, in_flight):
+        nonlocal unsubmitted
+        unsubmitted = path
+        # The pool starts its worker processes inside submit()
+        with as_main():
+            in_flight[pool.submit(stream_file, path)] = path
+        unsubmitted = None
+
+    try:
+        while True:
+            with ProcessPoolExecutor(workers, mp_context=ctx, initializer=ingest_worker.init,
+                                     initargs=(worker_pages,)) as pool:
+                in_flight = {}
+                try:
+                    for path in remaining:
+                        submit(pool, path, in_flight)
+                        if len(in_flight) >= workers * 2:
+                            break
+                    while in_flight:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            path = in_flight.pop(future)
+                            error = future.exception()
+                            wait_for_pages(path)
+                            yield path, None if error else future.result(), error
+                            next_path = next(remaining, None)
+                            if next_path is not None:
+                                submit(pool, next_path, in_flight)
+                    return
+                except BrokenProcessPool as e:
+                    for path in in_flight.values():
+                        yield path, 0, e
+                    if unsubmitted is not None:
+                        # Never reached a worker, so it goes to the next pool
+                        remaining = itertools.chain([unsubmitted], remaining)
+                        unsubmitted = None
+    finally:
+        worker_pages.put(None)
+        collector.join()
@@ -0,0 +1,33 @@
+import os
+
+from doc_text import iter_chunks
+
+# Worker side of ingest_pipeline's extraction pool. The pool's processes are
+# started under spawn_main.as_main(), so all they import is this module and
+# doc_text's parsers.
+
+_pages = None # worker process side: queue back to the parent, set by init
+
+
+def init(pages):
+    global _pages
+    _pages = pages
+
+
+def stream_file(path: str, pages=None) -> int:
+    """
+    Extracts and chunks one document page by page, putting (file name, chunk
+    records) on `pages` (the parent's queue in a worker process) for each
+    page with text, then (file name, None) when done, also on error.
+    Returns the number of pages.
+    """
+    pages = pages if pages is not None else _pages
+    file_name = os.path.basename(path)
+    count = 0
+    try:
+        for count, chunks in iter_chunks(path):
+            if chunks:
+                pages.put((file_name, chunks))
+    finally:
+        pages.put((file_name, None))
+    return count
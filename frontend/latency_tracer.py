@@ -0,0 +1,164 @@
+import os
+import json
+import math
+import time
+import threading
+from collections import deque
+
+# stage name -> (start event, end event). Events are marked from the pipeline
+# in py_app.py; a stage is only reported for turns where both events happened.
+# In streaming mode "rag" and "tts" overlap, that's expected.
+STAGES = {
+    "wake_to_speech": ("wakeword", "vad_start"),
+    "stt": ("vad_start", "stt_done"),
+    "rag": ("rag_start", "rag_done"),
+    "tts": ("tts_start", "tts_done"),
+    "first_audio_ready": ("stt_done", "tts_first_audio"),
+    "time_to_first_audio": ("stt_done", "playback_start"),
+    "playback": ("playback_start", "playback_end"),
+}
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyTracer:
+    """
+    Records one span record per voice turn into a bounded ring buffer.
+    mark() is a perf_counter() call plus a dict insert under a lock, so it is
+    cheap enough to leave on all the time; percentiles are only computed when
+    exporting.
+
+    Capture events (wake word, speech, transcription) go to the open record.
+    Once the pipeline has the question, bind() ties that record to its turn
+    id, and later stages pass the id to mark() and end_turn(). Those calls
+    are dropped if their turn isn't the open record's any more (cancelled,
+    or still playing while the next question comes in), since the stages of
+    different turns overlap.
+    """
+    def __init__(self, capacity=1000):
+        self.turns = deque(maxlen=capacity)
+        self.current = None
+        self.lock = threading.Lock()
+        self.turn_count = 0
+
+    def start_turn(self):
+        """Starts a new turn, closing any turn that was left open (e.g. empty transcription)."""
+        with self.lock:
+            self._close_current()
+            self._open_turn()
+
+    def bind(self, turn_id: int):
+        """Ties the open record (opening one if needed) to the pipeline turn it became."""
+        with self.lock:
+            if self.current is None:
+                self._open_turn()
+            self.current["turn_id"] = turn_id
+
+    def mark(self, event: str, turn_id=None):
+        """
+        Records the first time `event` happens in the current turn (opening one
+        if needed). With a turn_id, only if the current record is that turn's.
+        """
+        now = time.perf_counter()
+        with self.lock:
+            if turn_id is not None and not self._is_current(turn_id):
+                return
+            if self.current is None:
+                self._open_turn()
+            self.current["events"].setdefault(event, now)
+
+    def end_turn(self, turn_id=None):
+        """Closes the current turn (with a turn_id, only if it is that turn's) and stores its record."""
+        with self.lock:
+            if turn_id is None or self._is_current(turn_id):
+                self._close_current()
+
+    def _is_current(self, turn_id: int) -> bool:
+        return self.current is not None and self.current.get("turn_id") == turn_id
+
+    def _open_turn(self):
+        self.turn_count += 1
+        self.current = {"turn": self.turn_count, "turn_id": None, "timestamp": time.time(), "events": {}}
+
+    def _close_current(self):
+        if self.current is None or not self.current["events"]:
+            self.current = None
+            return
+        events = self.current["events"]
+        origin = min(events.values())
+        record = {
+            "turn": self.current["turn"],
+            "timestamp": self.current["timestamp"],
+            "complete": "playback_end" in events,
+            "events_ms": {name: round((t - origin) * 1000, 2) for name, t in events.items()},
+            "stages_ms": {},
+        }
+        for stage, (start, end) in STAGES.items():
+            if start in events and end in events:
+                record["stages_ms"][stage] = round((events[end] - events[start]) * 1000, 2)
+        if record["complete"]:
+            record["stages_ms"]["turn"] = round((max(events.values()) - origin) * 1000, 2)
+        self.turns.append(record)
+        self.current = None
+
+    def records(self) -> list:
+        with self.lock:
+            return list(self.turns)
+
+    def summary(self) -> dict:
+        """Returns {stage: {"count", "sum_ms", "p50", "p95", "p99"}} over the buffered turns."""
+        samples = {}
+        for record in self.records():
+            for stage, ms in record["stages_ms"].items():
+                samples.setdefault(stage, []).append(ms)
+        summary = {}
+        for stage, values in samples.items():
+            values.sort()
+            stats = {"count": len(values), "sum_ms": round(sum(values), 2)}
+            for q in QUANTILES:
+                stats[f"p{int(q * 100)}"] = percentile(values, q)
+            summary[stage] = stats
+        return summary
+
+    def export_jsonl(self, path):
+        """Writes every buffered turn record as one JSON object per line."""
+        _ensure_parent(path)
+        with open(path, "w", encoding="utf-8") as f:
+            for record in self.records():
+                f.write(json.dumps(record) + "\n")
+
+    def export_prometheus(self, path, metric="hta_turn_stage_seconds"):
+        """Writes per-stage p50/p95/p99 in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {metric} Latency of each stage of a voice turn.",
+            f"# TYPE {metric} summary",
+        ]
+        for stage, stats in sorted(self.summary().items()):
+            for q in QUANTILES:
+                value = stats[f"p{int(q * 100)}"] / 1000
+                lines.append(f'{metric}{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {stats["sum_ms"] / 1000:.6f}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {stats["count"]}')
+        write_atomic(path, "\n".join(lines) + "\n")
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def write_atomic(path, text: str):
+    """Writes a file via a temp file and rename, so a scraper never reads it half-written."""
+    _ensure_parent(path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _ensure_parent(path):
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
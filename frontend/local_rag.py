@@ -0,0 +1,200 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from doc_index import DocIndex, StaleSnapshotError, DEFAULT_INDEX_TYPE, IVF_NPROBE, HNSW_EF_SEARCH
+from doc_text import extract_pages, chunk_pages
+from ingest_pipeline import EMBED_BATCH_SIZE, ingest_files
+from query_encoder import QueryEncoder
+
+DEFAULT_INDEX_DIR = "rag_index"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+GROQ_MODEL = "llama-3.1-8b-instant"
+TOP_K = 4
+
+SYSTEM_PROMPT = (
+    "You are Robo Teacher, a friendly and patient teaching assistant for 1st and 2nd grade "
+    "students (ages 6-8), part of a humanoid robot that helps children learn Math and English. "
+    "Use short, simple sentences, familiar examples and lots of encouragement. Ask one question "
+    "at a time. Keep everything appropriate for ages 6-8 and stick to Math and English. "
+    "Use the textbook excerpts below when they help answer the question."
+)
+
+
+class LocalRAG:
+    """
+    RAG over the ./docs textbooks kept in this process: sentence-transformers
+    embeddings in a FAISS index (doc_index.DocIndex) that is snapshotted to
+    index_dir after every change and memory-mapped back at startup, and
+    answers from Groq via langchain-groq.
+    Has RAGSystem's interface (ingest_file, query, stream_query) plus what
+    auto_ingest_docs needs to skip unchanged documents (persistent, index_id,
+    remove_chunks) and to ingest in batches (embed, add_chunks), and what the
+    semantic answer cache needs (embed_queries, corpus_version).
+
+    Changes never touch the index queries are searching: they go to a copy
+    (see update()) that replaces it in one reference assignment when done, so
+    queries run without locks while documents are re-ingested.
+    """
+    persistent = True
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR, embedding_model=EMBEDDING_MODEL, llm_model=GROQ_MODEL, top_k=TOP_K,
+                 index_type=DEFAULT_INDEX_TYPE, nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH):
+        """index_type is "flat", "hnsw" or "ivfpq" (see doc_index.DocIndex); nprobe and ef_search tune the latter two."""
+        from sentence_transformers import SentenceTransformer
+
+        self.index_dir = index_dir
+        self.top_k = top_k
+        self.llm_model = llm_model
+        self.llm = None
+        self.encoder = SentenceTransformer(embedding_model, device="cpu")
+        # Questions: LRU-cached and micro-batched across concurrent callers
+        self.query_encoder = QueryEncoder(self.embed)
+        self.lock = threading.Lock() # guards self.staged
+        self.update_lock = threading.Lock() # one update at a time
+        self.staged = None # copy of the index being changed during update()
+        dim = self.encoder.get_sentence_embedding_dimension()
+        # Memory-mapped snapshot from the last run; None if missing or built with another model/format
+        options = {"index_type": index_type, "nprobe": nprobe, "ef_search": ef_search}
+        self.load_options = {"embedding_model": embedding_model, "dim": dim, **options}
+        self.index = DocIndex.load(index_dir, **self.load_options) if index_dir else None
+        if self.index is None:
+            self.index = DocIndex(dim, embedding_model=embedding_model, **options)
+        print(f"RAG index has {len(self.index)} chunks ({index_type})")
+
+    @property
+    def index_id(self) -> str:
+        return self.index.index_id
+
+    @property
+    def corpus_version(self) -> str:
+        """Changes whenever documents are added or removed (each change saves a new snapshot generation)."""
+        return f"{self.index.index_id}:{self.index.generation}"
+
+    # ----------------- INGESTION -----------------
+    def embed(self, texts: list, batch_size=EMBED_BATCH_SIZE) -> np.ndarray:
+        """Normalized float32 embeddings, so inner product is cosine similarity."""
+        return self.encoder.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                   normalize_embeddings=True).astype(np.float32)
+
+    @contextmanager
+    def update(self, save=True):
+        """
+        Groups changes into one atomic update: add_chunks and remove_chunks
+        calls (from any thread) until the block ends go to a private copy of
+        the index, which is then saved and swapped in. Searches keep using the
+        old index until the swap and are never blocked. Nothing is swapped in
+        if the block raises. An IVF-PQ index that has grown big enough is
+        trained before the swap. If another process sharing index_dir saved
+        first, its snapshot is loaded in place of the live index and
+        StaleSnapshotError is raised, so the change can be redone on top.
+        """
+        with self.update_lock:
+            staged = self.index.copy()
+            with self.lock:
+                self.staged = staged
+            try:
+                yield staged
+                with self.lock:
+                    self.staged = None
+                # IVF-PQ trains on the corpus once it is big enough
+                staged.train_if_needed()
+                if save and self.index_dir:
+                    try:
+                        staged.save(self.index_dir)
+                    except StaleSnapshotError:
+                        self.reload()
+                        raise
+                # Searches already running finish on the old index
+                self.index = staged
+            finally:
+                with self.lock:
+                    self.staged = None
+
+    def reload(self):
+        """Switches to the snapshot currently in index_dir (saved by another process)."""
+        index = DocIndex.load(self.index_dir, **self.load_options)
+        if index is not None:
+            self.index = index
+            print(f"Reloaded the RAG index saved by another process ({len(index)} chunks)")
+
+    def add_chunks(self, chunks: list, embeddings: np.ndarray, save=True) -> list:
+        """Adds already embedded chunk records and returns their ids."""
+        with self.lock:
+            if self.staged is not None:
+                return self.staged.add(embeddings, chunks)
+        with self.update(save=save) as staged:
+            return staged.add(embeddings, chunks)
+
+    def ingest_file(self, file_name: str, file_bytes: bytes) -> list:
+        """
+        Extracts, chunks and embeds one document given as bytes. Returns the ids
+        of its chunks. For documents on disk ingest_path keeps memory bounded.
+        """
+        chunks = chunk_pages(file_name, extract_pages(file_name, file_bytes))
+        if not chunks:
+            return []
+        return self.add_chunks(chunks, self.embed([chunk["text"] for chunk in chunks]))
+
+    def ingest_path(self, path: str) -> list:
+        """Streams one document from disk page by page through chunking and embedding. Returns its chunk ids."""
+        with self.update():
+            chunk_ids, report = ingest_files(self, [path], workers=0)
+        if report.failed:
+            raise RuntimeError(next(iter(report.failed.values())))
+        return chunk_ids[os.path.basename(path)]
+
+    def remove_chunks(self, ids, save=True) -> int:
+        if not ids:
+            return 0
+        with self.lock:
+            if self.staged is not None:
+                return self.staged.remove(ids)
+        with self.update(save=save) as staged:
+            return staged.remove(ids)
+
+    def save(self):
+        """Saves the live index; inside update() that happens when the update is swapped in."""
+        with self.lock:
+            if self.staged is not None:
+                return
+        if self.index_dir:
+            self.index.save(self.index_dir)
+
+    # ----------------- QUERYING -----------------
+    def embed_queries(self, texts: list) -> np.ndarray:
+        """Like embed(), for questions: through the query embedding cache and batcher."""
+        return np.stack([self.query_encoder.encode(text) for text in texts])
+
+    def retrieve(self, text: str, k=None) -> list:
+        """The k chunks closest to the question, as (score, chunk record) pairs."""
+        return self.index.search(self.embed_queries([text]), k or self.top_k)[0]
+
+    def stats(self) -> dict:
+        return {"chunks": len(self.index), "index_type": self.index.index_type,
+                "query_encoder": self.query_encoder.stats()}
+
+    def _messages(self, text: str):
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        excerpts = "\n\n".join(f"[{chunk['source']} p.{chunk['page']}] {chunk['text']}" for _, chunk in self.retrieve(text))
+        return [SystemMessage(SYSTEM_PROMPT),
+                HumanMessage(f"TEXTBOOK EXCERPTS:\n{excerpts or 'None'}\n\nSTUDENT'S QUESTION: {text}")]
+
+    def _llm(self):
+        if self.llm is None:
+            from dotenv import load_dotenv
+            from langchain_groq import ChatGroq
+            load_dotenv()
+            self.llm = ChatGroq(model=self.llm_model, api_key=os.environ.get("GROQ_API_KEY"), temperature=0.3)
+        return self.llm
+
+    def query(self, text: str) -> str:
+        return self._llm().invoke(self._messages(text)).content
+
+    def stream_query(self, text: str):
+        for chunk in self._llm().stream(self._messages(text)):
+            if chunk.content:
+                yield chunk.content
@@ -1,14 +1,24 @@
 import sys
-import time # <-- Import for heartbeat sleep
+import itertools
 import pyaudio # <-- Import for listing audio devices
 from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel
 from PyQt6.QtGui import QMovie
-from PyQt6.QtCore import QThread, pyqtSignal, QObject, QUrl
-from PyQt6.QtMultimedia import QSoundEffect
+from PyQt6.QtCore import QThread, pyqtSignal, QObject
 
 from chatbot_logic import ChatbotLogic
+from audio_player import PcmStreamPlayer
+from latency_tracer import LatencyTracer
+from voice_pipeline import VoicePipeline
 from RealtimeSTT import AudioToTextRecorder
 
+# Synthesize and play the answer sentence by sentence instead of as one big wav
+STREAM_TTS = True
+# Per-turn latency records are exported here every few turns and on Stop
+TRACE_JSONL_PATH = "traces/latency.jsonl"
+TRACE_PROM_PATH = "traces/latency.prom"
+TRACE_EXPORT_EVERY_TURNS = 10
+TRACE_PIPELINE_PROM_PATH = "traces/pipeline.prom"
+
 def list_audio_devices():
     """Helper function to print available audio input devices."""
     print("🎤 Listing available audio input devices...")
@@ -25,16 +35,33 @@ def list_audio_devices():
 
 class BackendWorker(QObject):
     state_changed = pyqtSignal(str)
-    tts_audio_ready = pyqtSignal(str)
+    # Audio signals carry the turn id so the UI can drop audio from cancelled turns
+    tts_audio_ready = pyqtSignal(object, int) # numpy audio buffer, turn id
+    tts_finished = pyqtSignal(int)
+    stop_playback = pyqtSignal(int) # barge-in: cancel everything up to this turn id
 
-    def __init__(self, chatbot_logic: ChatbotLogic):
+    def __init__(self, chatbot_logic: ChatbotLogic, tracer: LatencyTracer, audio_backlog=lambda: 0.0,
+                 turn_ids=None):
         super().__init__()
         self.chatbot_logic = chatbot_logic
+        self.tracer = tracer
         self.is_running = True
         self.recorder = None
+        # Reasoning, synthesis and playback run as their own stages; this
+        # thread only does capture/STT and feeds them.
+        self.pipeline = VoicePipeline(
+            chatbot_logic, tracer,
+            emit_state=self.state_changed.emit,
+            emit_audio=self.tts_audio_ready.emit,
+            emit_finished=self.tts_finished.emit,
+            emit_stop=self.stop_playback.emit,
+            audio_backlog=audio_backlog,
+            stream_tts=STREAM_TTS,
+            turn_ids=turn_ids,
+        )
 
     def run(self):
-        """The main STT -> LLM -> TTS pipeline loop."""
+        """The capture/STT loop; everything after transcription happens in the pipeline stages."""
         print("Backend worker running...")
         list_audio_devices()
         
@@ -56,22 +83,27 @@ class BackendWorker(QObject):
             )
             
             print("✅ AudioToTextRecorder initialized successfully")
+            self.pipeline.start()
             self.state_changed.emit("idle")
             
             while self.is_running:
                 print("... waiting for transcription ...")
                 text = self.recorder.text()
+                self.tracer.mark("stt_done")
                 
                 if text and self.is_running:
-                    self._process_text(text.strip())
+                    self.pipeline.submit(text)
                 elif not self.is_running:
                     break
+                else:
+                    self.tracer.end_turn()
 
         except Exception as e:
             print(f"An error occurred in the backend worker: {e}")
             import traceback
             traceback.print_exc()
         finally:
+            self.pipeline.stop()
             if self.recorder:
                 self.recorder.stop()
             print("Backend worker stopped.")
@@ -79,33 +111,18 @@ class BackendWorker(QObject):
     def _on_wakeword_detected(self):
         """Callback when wake word is detected."""
         print("🎤 Wake word 'hey_jarvis' detected!")
+        # Barge-in: the child wants to talk, silence and abandon the old answer
+        self.pipeline.cancel_current()
+        self.tracer.start_turn()
+        self.tracer.mark("wakeword")
         self.state_changed.emit("listening")
 
     def _on_vad_start(self):
         """Callback when voice activity starts (speech begins)."""
         print("👂 Speech detected, listening...")
+        self.tracer.mark("vad_start")
         self.state_changed.emit("listening")
 
-    def _process_text(self, text):
-        """Processes transcribed text to generate and play a response."""
-        if not text.strip() or len(text.strip()) < 3:
-            self.state_changed.emit("idle")
-            return
-
-        print(f"Transcribed Text: {text}")
-
-        self.state_changed.emit("thinking")
-        response_text = self.chatbot_logic.get_response(text)
-        print(f"RAG Response: {response_text}")
-
-        output_path = self.chatbot_logic.generate_tts(response_text)
-
-        if output_path:
-            self.state_changed.emit("speaking")
-            self.tts_audio_ready.emit(output_path)
-        else:
-            self.state_changed.emit("idle")
-
     def stop(self):
         """Signals the run loop to exit and aborts blocking calls."""
         print("Signaling backend worker to stop...")
@@ -115,6 +132,9 @@ class BackendWorker(QObject):
 
 
 class MainWindow(QWidget):
+    # Emitted from ChatbotLogic's boot threads: (component, seconds, ok)
+    component_ready = pyqtSignal(str, float, bool)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Humanoid Teaching Assistant")
@@ -127,6 +147,7 @@ class MainWindow(QWidget):
         self.setup_animations()
         
         self.start_button = QPushButton("Start")
+        self.start_button.setEnabled(False) # Enabled once the RAG system is ready
         self.stop_button = QPushButton("Stop")
         self.stop_button.setEnabled(False)
         self.layout.addWidget(self.start_button)
@@ -134,16 +155,29 @@ class MainWindow(QWidget):
         self.setLayout(self.layout)
 
         # --- INITIALIZE CHATBOT LOGIC ---
-        # This can take a while, so we do it once when the app starts
-        self.chatbot_logic = ChatbotLogic()
+        # RAG ingestion and the ChatTTS model load in parallel in the background,
+        # so the window stays responsive; component_ready reports each one.
+        self.boot_status = {"rag": "⏳", "tts": "⏳"}
+        self.component_ready.connect(self._on_component_ready)
+        self.update_humanoid_state("warming_up")
+        self.chatbot_logic = ChatbotLogic(background=True, on_component_ready=self.component_ready.emit)
         
         # --- ADD AUDIO PLAYER ---
-        self.audio_player = QSoundEffect()
+        # Audio buffers come straight from ChatTTS in memory and are played
+        # back-to-back, so there is no output.wav round-trip between sentences.
+        self.audio_player = PcmStreamPlayer(parent=self)
+        self.tracer = LatencyTracer()
+        self.cancelled_turn = -1 # audio from turns up to this id is dropped
+        self.finishing_turn = None # turn whose last audio the player is playing out
+        # Shared by every session's pipeline so turn ids never restart and
+        # cancelled_turn stays meaningful after Stop -> Start
+        self.turn_ids = itertools.count(1)
+        self.barging_in = False
         
         # --- CONNECTIONS ---
         self.start_button.clicked.connect(self.start_backend)
         self.stop_button.clicked.connect(self.stop_backend)
-        self.audio_player.playingChanged.connect(self._on_audio_finished)
+        self.audio_player.playback_finished.connect(self._on_audio_finished)
 
     def setup_animations(self):
         """Setup animations with fallback handling."""
@@ -173,12 +207,15 @@ class MainWindow(QWidget):
         self.stop_button.setEnabled(True)
         self.backend_thread = QThread()
         # Pass the initialized chatbot logic to the worker
-        self.backend_worker = BackendWorker(self.chatbot_logic)
+        self.backend_worker = BackendWorker(self.chatbot_logic, self.tracer, self.audio_player.buffered_seconds,
+                                            self.turn_ids)
         self.backend_worker.moveToThread(self.backend_thread)
 
         # Connect signals
         self.backend_worker.state_changed.connect(self.update_humanoid_state)
         self.backend_worker.tts_audio_ready.connect(self.play_audio)
+        self.backend_worker.tts_finished.connect(self._on_tts_finished)
+        self.backend_worker.stop_playback.connect(self._on_barge_in)
         self.backend_thread.started.connect(self.backend_worker.run)
         
         self.backend_thread.start()
@@ -191,13 +228,45 @@ class MainWindow(QWidget):
             self.backend_worker.stop() # Gracefully stop the loop
             self.backend_thread.quit()
             self.backend_thread.wait()
+        self.audio_player.stop()
+        self.tracer.end_turn()
+        self.export_traces()
+        if self.chatbot_logic.is_ready("tts"):
+            print(f"TTS cache: {self.chatbot_logic.tts_cache_stats()}")
+        if self.chatbot_logic.is_ready("rag"):
+            print(f"Answer cache: {self.chatbot_logic.answer_cache_stats()}")
+            print(f"RAG: {self.chatbot_logic.rag_stats()}")
         self.humanoid_label.setMovie(self.idle_anim) # Reset to idle
         if self.idle_anim:
             self.idle_anim.start()
         self.humanoid_label.setText("Session Ended.")
 
+    def _on_component_ready(self, name, seconds, ok):
+        """Slot called as each ChatbotLogic component finishes loading."""
+        print(f"Boot: {name} {'ready' if ok else 'FAILED'} after {seconds:.1f}s")
+        self.boot_status[name] = "✅" if ok else "❌"
+        # Answers only need RAG; speech waits for the voice model if it's still loading
+        if name == "rag" and ok and not self.stop_button.isEnabled():
+            self.start_button.setEnabled(True)
+        if all(status != "⏳" for status in self.boot_status.values()):
+            times = ", ".join(f"{n} {t:.1f}s" for n, t in self.chatbot_logic.boot_times.items())
+            print(f"⏱ Boot finished: {times}")
+        if not self.stop_button.isEnabled():
+            self.update_humanoid_state("warming_up" if "⏳" in self.boot_status.values() else "ready")
+
     def update_humanoid_state(self, state):
         print(f"UI changing to state: {state}")
+        if state in ("warming_up", "ready"):
+            # Boot progress is always shown as text
+            self.humanoid_label.clear()
+            if state == "warming_up":
+                self.humanoid_label.setText(
+                    f"⏳ Warming up... Knowledge {self.boot_status['rag']}  Voice {self.boot_status['tts']}")
+            elif self.boot_status["rag"] == "✅":
+                self.humanoid_label.setText("Press Start to Begin")
+            else:
+                self.humanoid_label.setText("❌ Could not load the knowledge base. Check the logs.")
+            return
         
         # Handle animations if available, otherwise use text
         if self.listening_anim and self.thinking_anim and self.speaking_anim and self.idle_anim:
@@ -225,22 +294,52 @@ class MainWindow(QWidget):
             elif state == "speaking":
                 self.humanoid_label.setText("🗣 Speaking...")
             
-    def play_audio(self, path: str):
-        """Slot to play the generated audio file."""
-        if path:
-            print(f"UI playing audio: {path}")
-            url = QUrl.fromLocalFile(path)
-            # By adding a unique query string, we force QSoundEffect to reload the file
-            # and not use a cached version.
-            url.setQuery(f"v={time.time()}")
-            self.audio_player.setSource(url)
-            self.audio_player.play()
+    def play_audio(self, wav, turn_id=0):
+        """Slot to play a generated audio buffer; queued behind anything already playing."""
+        if turn_id <= self.cancelled_turn:
+            return
+        if wav is not None and len(wav):
+            self.tracer.mark("playback_start", turn_id)
+            self.audio_player.enqueue(wav)
+
+    def _on_tts_finished(self, turn_id=0):
+        """Slot called once the worker has emitted the last audio buffer of an answer."""
+        if turn_id <= self.cancelled_turn:
+            return
+        self.finishing_turn = turn_id
+        self.audio_player.end_of_stream()
+
+    def _on_barge_in(self, turn_id):
+        """Slot called when the child interrupts: stop talking right away."""
+        self.cancelled_turn = max(self.cancelled_turn, turn_id)
+        if self.audio_player.is_active():
+            print("Barge-in: stopping playback.")
+            self.barging_in = True
+            self.audio_player.stop()
+            self.barging_in = False
 
     def _on_audio_finished(self):
-        """Callback when audio playback state changes."""
-        if not self.audio_player.isPlaying():
-            print("Audio finished, returning to idle state.")
-            self.update_humanoid_state("idle")
+        """Callback when the player has played out the whole answer."""
+        if self.barging_in:
+            # Cut off on purpose; the new turn is already being traced and shown
+            return
+        print("Audio finished, returning to idle state.")
+        # A later turn may already be in progress; its record isn't this turn's
+        self.tracer.mark("playback_end", self.finishing_turn)
+        self.tracer.end_turn(self.finishing_turn)
+        if self.tracer.turn_count % TRACE_EXPORT_EVERY_TURNS == 0:
+            self.export_traces()
+        self.update_humanoid_state("idle")
+
+    def export_traces(self):
+        """Writes the buffered turn records as JSONL and the per-stage percentiles for Prometheus."""
+        try:
+            self.tracer.export_jsonl(TRACE_JSONL_PATH)
+            self.tracer.export_prometheus(TRACE_PROM_PATH)
+            if hasattr(self, 'backend_worker'):
+                self.backend_worker.pipeline.export_prometheus(TRACE_PIPELINE_PROM_PATH)
+        except OSError as e:
+            print(f"⚠️ Could not export latency traces: {e}")
 
 # The main execution block remains the same
 if __name__ == "__main__":
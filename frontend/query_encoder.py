@@ -0,0 +1,123 @@
+import time
+import queue
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Query embeddings kept (one 384-d float32 vector is 1.5 KB)
+QUERY_CACHE_SIZE = 2048
+# A batch is sent once it has this many queries, or once the first one has
+# waited BATCH_WAIT_MS for others to arrive
+MAX_BATCH = 32
+BATCH_WAIT_MS = 5.0
+# Per-query latencies kept for the percentiles in stats()
+LATENCY_WINDOW = 1000
+
+
+def normalize_query(text: str) -> str:
+    """Cache key: case and spacing don't change what an uncased embedding model sees."""
+    return " ".join(text.lower().split())
+
+
+class QueryEncoder:
+    """
+    Encodes questions for retrieval. Repeats come from an LRU cache keyed by
+    the normalized question. Misses from concurrent callers (several clients,
+    or the answer cache and retrieval of one turn) are gathered for up to
+    max_wait_ms into one encode_batch(texts) call on a background thread, so
+    they share a forward pass instead of queueing for the model one by one.
+    A caller alone pays at most max_wait_ms for this; max_wait_ms=0 encodes
+    on the caller's thread without batching.
+    """
+    def __init__(self, encode_batch, cache_size=QUERY_CACHE_SIZE, max_batch=MAX_BATCH, max_wait_ms=BATCH_WAIT_MS):
+        self.encode_batch = encode_batch
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.cache = OrderedDict() # normalized question -> embedding
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.worker = None
+        self.queries = 0
+        self.hits = 0
+        self.batches = 0
+        self.encoded = 0
+        self.encode_seconds = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def encode(self, text: str) -> np.ndarray:
+        """The embedding of one question (from the cache, or encoded in the next batch)."""
+        start_time = time.perf_counter()
+        key = normalize_query(text)
+        with self.lock:
+            self.queries += 1
+            embedding = self.cache.get(key)
+            if embedding is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+        if embedding is None:
+            if self.max_wait > 0:
+                future = Future()
+                self._start_worker()
+                self.pending.put((key, future))
+                embedding = future.result()
+            else:
+                embedding = self._encode([key])[key]
+        with self.lock:
+            self.latencies.append(time.perf_counter() - start_time)
+        return embedding
+
+    def _start_worker(self):
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, name="query-encoder", daemon=True)
+                self.worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.pending.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                embeddings = self._encode(list(dict.fromkeys(key for key, _ in batch)))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for key, future in batch:
+                future.set_result(embeddings[key])
+
+    def _encode(self, keys: list) -> dict:
+        start_time = time.perf_counter()
+        embeddings = dict(zip(keys, np.asarray(self.encode_batch(keys), dtype=np.float32)))
+        with self.lock:
+            self.batches += 1
+            self.encoded += len(keys)
+            self.encode_seconds += time.perf_counter() - start_time
+            for key, embedding in embeddings.items():
+                self.cache[key] = embedding
+                self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return embeddings
+
+    def stats(self) -> dict:
+        with self.lock:
+            latencies = np.asarray(self.latencies) * 1000
+            return {
+                "queries": self.queries,
+                "cache_hits": self.hits,
+                "hit_rate": round(self.hits / self.queries, 3) if self.queries else 0.0,
+                "batches": self.batches,
+                "avg_batch": round(self.encoded / self.batches, 2) if self.batches else 0.0,
+                # Queries the model got through per second of encoding
+                "encode_qps": round(self.encoded / self.encode_seconds, 1) if self.encode_seconds else 0.0,
+                "latency_p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else 0.0,
+                "latency_p95_ms": round(float(np.percentile(latencies, 95)), 2) if len(latencies) else 0.0,
+            }
@@ -0,0 +1,152 @@
+import os
+import json
+import argparse
+import threading
+from collections import OrderedDict
+
+from latency_tracer import write_atomic
+from streaming import is_cancelled
+
+DEFAULT_REFINE_CACHE_PATH = "refine_cache.json"
+DEFAULT_MAX_ENTRIES = 5000
+
+# Things the robot says a lot; precomputing them means only code inference
+# and decoding run when they come up at runtime.
+KNOWN_PHRASES = [
+    "Let's try again with a different question!",
+    "Great job!",
+    "You're doing amazing!",
+    "Let's try together!",
+    "Let me help you learn about that step by step!",
+    "Hello friend, let us learn together.",
+    "Can you show me with your fingers?",
+    "Wonderful work, keep it up!",
+]
+
+
+class RefineCache:
+    """
+    Memo of ChatTTS's text-refinement output, keyed by the cleaned input text.
+    Entries are only valid for the refine parameters they were made with, so
+    the file remembers those and starts empty if they change. Bounded LRU,
+    persisted as JSON.
+    """
+    def __init__(self, path=DEFAULT_REFINE_CACHE_PATH, params_signature="", max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.params_signature = params_signature
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable refine cache: {e}")
+            return
+        if data.get("params") != self.params_signature:
+            print("Refine parameters changed, starting with an empty refine cache.")
+            return
+        self.entries.update(data.get("entries", {}))
+
+    def get(self, text: str):
+        with self.lock:
+            refined = self.entries.get(text)
+            if refined is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(text)
+            self.hits += 1
+            return refined
+
+    def put(self, text: str, refined: str, save=True):
+        with self.lock:
+            self.entries[text] = refined
+            self.entries.move_to_end(text)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        if save:
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            data = {"params": self.params_signature, "entries": dict(self.entries)}
+        try:
+            write_atomic(self.path, json.dumps(data, ensure_ascii=False, indent=1))
+        except OSError as e:
+            print(f"⚠️ Could not save refine cache: {e}")
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0}
+
+
+def refine(chattts, refine_cache, safe_texts: list, params_refine_text=None, save=True, cancel=None) -> list:
+    """
+    Returns ChatTTS-refined versions of cleaned texts, computing and
+    memoizing any not seen before. If `cancel` gets set meanwhile the
+    refinement may have been cut short by cancel_tts(), so nothing is
+    memoized.
+    """
+    refined = [refine_cache.get(text) for text in safe_texts]
+    missing = [i for i, text in enumerate(refined) if text is None]
+    if missing:
+        new_texts = chattts.infer(
+            [safe_texts[i] for i in missing],
+            refine_text_only=True,
+            params_refine_text=params_refine_text
+        )
+        if is_cancelled(cancel):
+            return refined
+        for i, text in zip(missing, new_texts):
+            refined[i] = text
+            refine_cache.put(safe_texts[i], text, save=False)
+        if save:
+            refine_cache.save()
+    return refined
+
+
+def infer(chattts, refine_cache, safe_texts: list, params_refine_text=None, params_infer_code=None,
+          stream=False, cancel=None):
+    """
+    Runs ChatTTS code inference + decoding on cleaned texts. The refine
+    stage is served from `refine_cache`, and only the misses go through
+    ChatTTS's refinement model (in one batch). Returns no audio if `cancel`
+    was set during refinement: a second infer() would reset ChatTTS's
+    interrupt and run the cancelled turn's code inference anyway.
+    """
+    refined = refine(chattts, refine_cache, safe_texts, params_refine_text, cancel=cancel)
+    if is_cancelled(cancel):
+        return []
+    return chattts.infer(
+        refined,
+        stream=stream,
+        skip_refine_text=True,
+        params_infer_code=params_infer_code,
+        use_decoder=True
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute ChatTTS refined text for known phrases.")
+    parser.add_argument("phrase_file", nargs="?", help="text file with one phrase per line (default: built-in KNOWN_PHRASES)")
+    args = parser.parse_args()
+
+    from chatbot_logic import ChatbotLogic
+    phrases = KNOWN_PHRASES
+    if args.phrase_file:
+        with open(args.phrase_file, "r", encoding="utf-8") as f:
+            phrases = [line.strip() for line in f if line.strip()]
+    logic = ChatbotLogic(components=("tts",), warm_up_tts=False, tts_process=False)
+    added = logic.precompute_refined(phrases)
+    print(f"Refined {added} new phrases; cache now has {logic.refine_cache.stats()['entries']} entries.")
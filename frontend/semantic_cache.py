@@ -0,0 +1,172 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from text_normalizer import normalize_for_tts, FALLBACK_TEXT, ONES, TENS, SCALES, IRREGULAR_ORDINALS
+
+# Cosine similarity of normalized questions above which the stored answer is reused
+SIMILARITY_THRESHOLD = 0.92
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 500
+# Shorter utterances ("Hi!", "No!", "Why?") mean something different every
+# time, depending on what was said before, so they are never cached
+MIN_QUESTION_WORDS = 2
+
+# Words that decide the answer to a math question however close the rest of
+# it is: "what is two plus two" and "what is two plus three" embed almost the
+# same. A stored answer is only reused if these appear identically, in order.
+_CARDINALS = ONES + [tens for tens in TENS if tens] + ["hundred"] + [name for _, name in SCALES]
+_ORDINALS = [IRREGULAR_ORDINALS.get(word) or (word[:-1] + "ieth" if word.endswith("y") else word + "th")
+             for word in _CARDINALS[1:]]
+NUMBER_WORDS = frozenset(_CARDINALS + _ORDINALS + [word + "s" for word in _ORDINALS]
+                         + ["half", "halves", "quarter", "quarters", "point", "negative"])
+OPERATOR_WORDS = frozenset(["plus", "minus", "times", "multiplied", "divided", "over", "equals", "percent",
+                            "greater", "less", "power", "square", "squared", "cube", "cubed", "root",
+                            "sum", "difference", "product", "quotient", "double", "twice", "triple"])
+
+
+def normalize_question(text: str) -> str:
+    """
+    Canonical form of a transcript: numbers and symbols spelled out the way
+    TTS would say them, lower case, no apostrophes, so "What's 2+2?" and
+    "whats two plus two" are the same question. Returns "" for utterances
+    too short to cache (see MIN_QUESTION_WORDS), including anything the
+    normalizer replaces with its fallback text.
+    """
+    spoken = normalize_for_tts(text)
+    if spoken == FALLBACK_TEXT:
+        return ""
+    question = re.sub(r"\s+", " ", spoken.lower().replace("'", "")).strip()
+    return question if len(question.split()) >= MIN_QUESTION_WORDS else ""
+
+
+def math_terms(question: str) -> tuple:
+    """The numbers, number words and operators of a normalized question, in order."""
+    return tuple(word for word in question.split()
+                 if word.isdigit() or word in NUMBER_WORDS or word in OPERATOR_WORDS)
+
+
+class SemanticCache:
+    """
+    Answers to recent questions, found by meaning rather than exact wording.
+    Identical normalized questions always match. Otherwise the question is
+    embedded as asked with `embed(texts)` (normalized vectors, e.g.
+    LocalRAG.embed_queries, so retrieval of a miss reuses the same cached
+    embedding instead of encoding a second string), and a lookup returns the
+    stored answer of the closest question if its cosine similarity is at
+    least `threshold` and it has the same math_terms(). Without an embed
+    function only identical normalized questions match.
+
+    Entries expire after ttl_seconds and the least recently used go once there
+    are max_entries. Everything is dropped when corpus_version() (e.g. the
+    RAG index generation) changes, since answers may depend on the documents.
+    The answer's audio doesn't need storing here: synthesizing the same answer
+    again is served per sentence by the TTS cache.
+    """
+    def __init__(self, embed=None, corpus_version=lambda: None, threshold=SIMILARITY_THRESHOLD,
+                 ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.embed = embed
+        self.corpus_version = corpus_version
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = OrderedDict() # normalized question -> {"answer", "vector", "terms", "created", "seconds"}
+        self.keys = []      # row order of self.vectors
+        self.vectors = None # (len(keys), dim) matrix, rebuilt lazily after changes
+        self.version = corpus_version()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.guarded = 0 # similar enough, but with different numbers or operators
+        self.saved_seconds = 0.0
+        self.lookup_seconds = 0.0
+
+    def _check_corpus(self):
+        version = self.corpus_version()
+        if version != self.version:
+            if self.entries:
+                print("Documents changed, clearing the answer cache.")
+            self.entries.clear()
+            self.vectors = None
+            self.version = version
+
+    def _matrix(self):
+        if self.vectors is None:
+            self.keys = [key for key, entry in self.entries.items() if entry["vector"] is not None]
+            self.vectors = np.stack([self.entries[key]["vector"] for key in self.keys]) if self.keys else None
+        return self.vectors
+
+    def _vector(self, text: str):
+        if self.embed is None:
+            return None
+        return np.asarray(self.embed([text])[0], dtype=np.float32)
+
+    def lookup(self, text: str):
+        """Returns the stored answer for a question with the same meaning, or None."""
+        start_time = time.perf_counter()
+        question = normalize_question(text)
+        if not question:
+            return None
+        # Embed outside the lock; only needed if there is no exact match
+        vector = None if question in self.entries else self._vector(text)
+        with self.lock:
+            self._check_corpus()
+            now = time.time()
+            for key in [key for key, entry in self.entries.items() if now - entry["created"] > self.ttl_seconds]:
+                del self.entries[key]
+                self.vectors = None
+            key = question if question in self.entries else None
+            if key is None and vector is not None:
+                matrix = self._matrix()
+                if matrix is not None:
+                    scores = matrix @ vector
+                    terms = math_terms(question)
+                    for best in np.argsort(-scores):
+                        if scores[best] < self.threshold:
+                            break
+                        if self.entries[self.keys[best]]["terms"] == terms:
+                            key = self.keys[best]
+                            break
+                        self.guarded += 1
+            self.lookup_seconds += time.perf_counter() - start_time
+            if key is None:
+                self.misses += 1
+                return None
+            entry = self.entries[key]
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry["seconds"]
+            return entry["answer"]
+
+    def store(self, text: str, answer: str, seconds=0.0):
+        """Remembers the answer to a question; `seconds` is what producing it cost (for the stats)."""
+        if not answer or not answer.strip():
+            return
+        question = normalize_question(text)
+        if not question:
+            return
+        vector = self._vector(text)
+        with self.lock:
+            self._check_corpus()
+            self.entries[question] = {"answer": answer, "vector": vector, "terms": math_terms(question),
+                                      "created": time.time(), "seconds": seconds}
+            self.entries.move_to_end(question)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.vectors = None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.vectors = None
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses, "guarded": self.guarded,
+                    "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                    "saved_s": round(self.saved_seconds, 2),
+                    "avg_lookup_ms": round(1000 * self.lookup_seconds / lookups, 2) if lookups else 0.0}
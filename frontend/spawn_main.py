@@ -0,0 +1,22 @@
+import sys
+import threading
+import contextlib
+
+# Spawned children import the parent's __main__ before running anything. For
+# py_app that is PyQt6, torch and RealtimeSTT: seconds and hundreds of MB per
+# worker process. Workers started inside as_main() import this (empty) module
+# as their __main__ instead, and then only what their target function needs.
+
+_main_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def as_main():
+    """Processes spawned inside this block import this module as their __main__ instead of the parent's."""
+    with _main_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = sys.modules[__name__]
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main
@@ -0,0 +1,84 @@
+import re
+import queue
+import threading
+
+# Sentence boundary: terminal punctuation (optionally followed by a closing
+# quote/bracket) and whitespace. Used to cut answers into TTS-sized pieces.
+SENTENCE_BOUNDARY = re.compile(r'(?:(?<=[.!?])|(?<=[.!?]["\')\]]))\s+')
+# Pieces shorter than this are merged into the next sentence so ChatTTS
+# doesn't get fed a lone "Yes!" with odd prosody.
+MIN_SENTENCE_CHARS = 12
+# How often a consumer blocked on a prefetch queue re-checks its cancel event
+CANCEL_POLL_SECONDS = 0.02
+
+
+def split_sentences(text: str) -> list:
+    """Splits text into sentences, merging very short fragments forward."""
+    return list(iter_sentences([text]))
+
+
+def iter_sentences(chunks):
+    """
+    Cuts a stream of text chunks (e.g. LLM tokens) at sentence boundaries and
+    yields each sentence as soon as it is complete. The tail is flushed at the end.
+    """
+    buffer = ""
+    pending = ""
+    for chunk in chunks:
+        buffer += chunk
+        pieces = SENTENCE_BOUNDARY.split(buffer)
+        # The last piece may still be growing, keep it in the buffer
+        buffer = pieces.pop()
+        for piece in pieces:
+            pending = f"{pending} {piece.strip()}".strip()
+            if len(pending) >= MIN_SENTENCE_CHARS:
+                yield pending
+                pending = ""
+    tail = f"{pending} {buffer.strip()}".strip()
+    if tail:
+        yield tail
+
+
+def prefetch(iterable, maxsize=0, cancel=None):
+    """
+    Runs an iterator on a background thread and yields its items from a queue,
+    so a slow producer (the LLM) keeps going while the consumer (TTS) is busy.
+    Exceptions raised by the producer are re-raised in the consumer.
+    If the `cancel` event is set, both sides stop early and the producer's
+    iterator is closed (which for an LLM stream drops the connection).
+    """
+    items = queue.Queue(maxsize)
+    done = object()
+
+    def producer():
+        try:
+            for item in iterable:
+                if is_cancelled(cancel):
+                    break
+                items.put(item)
+        except Exception as e:
+            items.put(e)
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+            items.put(done)
+
+    threading.Thread(target=producer, daemon=True).start()
+    while True:
+        try:
+            item = items.get(timeout=CANCEL_POLL_SECONDS)
+        except queue.Empty:
+            if is_cancelled(cancel):
+                return
+            continue
+        if item is done or is_cancelled(cancel):
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def is_cancelled(cancel) -> bool:
+    """True if an optional cancel event (threading.Event) has been set."""
+    return cancel is not None and cancel.is_set()
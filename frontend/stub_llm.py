@@ -0,0 +1,69 @@
+import re
+import time
+import argparse
+
+from streaming import iter_sentences, prefetch
+
+DEFAULT_ANSWER = (
+    "Great job asking! Two plus two is four. "
+    "Hold up two fingers on each hand and count them all. "
+    "You got it, you're doing amazing!"
+)
+
+
+class StubRAG:
+    """
+    Offline stand-in for RAGSystem. Streams a canned answer word by word at a
+    fixed token rate, so streaming and TTS overlap can be tried without network.
+    Use it as ChatbotLogic(rag=StubRAG()).
+    """
+    def __init__(self, answer=DEFAULT_ANSWER, tokens_per_second=15.0, first_token_delay=0.3):
+        self.answer = answer
+        self.tokens_per_second = tokens_per_second
+        self.first_token_delay = first_token_delay
+
+    def ingest_file(self, file_name, file_bytes):
+        pass
+
+    def query(self, text: str) -> str:
+        return "".join(self.stream_query(text))
+
+    def stream_query(self, text: str):
+        time.sleep(self.first_token_delay)
+        for token in re.findall(r'\S+\s*', self.answer):
+            time.sleep(1.0 / self.tokens_per_second)
+            yield token
+
+
+def run_overlap_demo(args):
+    """
+    Feeds the stub token stream through the sentence cutter into a fake TTS
+    that sleeps per character, and prints when each stage happened.
+    """
+    rag = StubRAG(tokens_per_second=args.tokens_per_second)
+    start = time.perf_counter()
+    llm_done = {}
+
+    def tokens():
+        yield from rag.stream_query("what is two plus two")
+        llm_done["at"] = time.perf_counter() - start
+
+    first_audio = None
+    for sentence in iter_sentences(prefetch(tokens())):
+        tts_start = time.perf_counter() - start
+        time.sleep(len(sentence) * args.tts_seconds_per_char)
+        tts_end = time.perf_counter() - start
+        first_audio = first_audio if first_audio is not None else tts_end
+        print(f"[{tts_start:5.2f}s -> {tts_end:5.2f}s] TTS: {sentence}")
+
+    sequential = llm_done["at"] + len(rag.answer) * args.tts_seconds_per_char
+    print(f"LLM finished at      {llm_done['at']:.2f}s")
+    print(f"First audio ready at {first_audio:.2f}s")
+    print(f"All audio ready at   {time.perf_counter() - start:.2f}s (sequential would be ~{sequential:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show LLM/TTS overlap with a stub LLM (no network).")
+    parser.add_argument("--tokens-per-second", type=float, default=15.0)
+    parser.add_argument("--tts-seconds-per-char", type=float, default=0.02)
+    run_overlap_demo(parser.parse_args())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The frontend modules are imported flat (as py_app does), so tests run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,106 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from doc_index import DocIndex, StaleSnapshotError, META_FILE
+
+DIM = 16
+
+
+def vectors(count, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((count, DIM)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def chunks(count, source="book.txt"):
+    return [{"source": source, "page": 1, "text": f"chunk {i}"} for i in range(count)]
+
+
+def saved_index(folder, count=50):
+    doc_index = DocIndex(DIM, embedding_model="test-model")
+    doc_index.add(vectors(count), chunks(count))
+    doc_index.save(folder)
+    return doc_index
+
+
+def test_save_and_load_round_trip(tmp_path):
+    original = saved_index(str(tmp_path))
+    loaded = DocIndex.load(str(tmp_path), embedding_model="test-model", dim=DIM)
+    assert loaded.mapped
+    assert len(loaded) == 50 and loaded.next_id == 50 and loaded.index_id == original.index_id
+    score, chunk = loaded.search(vectors(50)[3:4], 1)[0][0]
+    assert chunk["text"] == "chunk 3" and score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_change_after_memory_mapped_load(tmp_path):
+    saved_index(str(tmp_path))
+    loaded = DocIndex.load(str(tmp_path), embedding_model="test-model", dim=DIM)
+    ids = loaded.add(vectors(5, seed=1), chunks(5, source="new.txt"))
+    assert ids == [50, 51, 52, 53, 54]
+    assert loaded.remove([0, 1]) == 2
+    assert len(loaded) == 53 and loaded.index.ntotal == 53
+    loaded.save(str(tmp_path))
+    reloaded = DocIndex.load(str(tmp_path), embedding_model="test-model", dim=DIM)
+    assert len(reloaded) == 53 and 0 not in reloaded.chunks and reloaded.chunks[54]["source"] == "new.txt"
+
+
+def test_copy_of_loaded_index_leaves_it_untouched(tmp_path):
+    saved_index(str(tmp_path))
+    loaded = DocIndex.load(str(tmp_path), embedding_model="test-model", dim=DIM)
+    staged = loaded.copy()
+    staged.add(vectors(3, seed=2), chunks(3))
+    staged.remove([5])
+    assert len(loaded) == 50 and loaded.index.ntotal == 50
+    assert len(staged) == 52
+
+
+def test_stale_save_is_refused(tmp_path):
+    folder = str(tmp_path)
+    saved_index(folder)
+    loaded = DocIndex.load(folder, embedding_model="test-model", dim=DIM)
+    # Two processes load the same generation; the second one saves first
+    mine = DocIndex.load(folder, embedding_model="test-model", dim=DIM, mmap_io=False)
+    other = DocIndex.load(folder, embedding_model="test-model", dim=DIM, mmap_io=False)
+    other.add(vectors(2, seed=3), chunks(2, source="other.txt"))
+    other.save(folder)
+    mine.add(vectors(1, seed=4), chunks(1, source="mine.txt"))
+    with pytest.raises(StaleSnapshotError):
+        mine.save(folder)
+    with open(os.path.join(folder, META_FILE), encoding="utf-8") as f:
+        assert json.load(f)["generation"] == 2
+    # The other process's documents survive, and a load of the old generation still reads its (unlinked) files
+    assert len(DocIndex.load(folder, embedding_model="test-model", dim=DIM)) == 52
+    assert len(loaded) == 50 and loaded.search(vectors(50)[:1], 1)[0][0][1]["text"] == "chunk 0"
+
+
+def test_rebuilt_index_replaces_an_old_one(tmp_path):
+    folder = str(tmp_path)
+    saved_index(folder)
+    saved_index(folder, count=10)
+    with open(os.path.join(folder, META_FILE), encoding="utf-8") as f:
+        assert json.load(f)["generation"] == 2
+    assert len(DocIndex.load(folder, embedding_model="test-model", dim=DIM)) == 10
+
+
+def test_load_rejects_other_model_or_index_type(tmp_path):
+    saved_index(str(tmp_path))
+    assert DocIndex.load(str(tmp_path), embedding_model="other-model", dim=DIM) is None
+    assert DocIndex.load(str(tmp_path), embedding_model="test-model", dim=DIM, index_type="hnsw") is None
+
+
+@pytest.mark.parametrize("index_type", ["hnsw", "ivfpq"])
+def test_approximate_index_types(tmp_path, index_type):
+    doc_index = DocIndex(DIM, index_type=index_type, train_min_vectors=400)
+    doc_index.add(vectors(500), chunks(500))
+    assert doc_index.train_if_needed() == (index_type == "ivfpq")
+    assert doc_index.remove([0, 1, 2]) == 3
+    assert doc_index.index.ntotal == 497
+    doc_index.save(str(tmp_path))
+    loaded = DocIndex.load(str(tmp_path), index_type=index_type)
+    assert loaded.trained == (index_type == "ivfpq") and len(loaded) == 497
+    assert len(loaded.search(vectors(1, seed=4), 5)[0]) == 5
@@ -0,0 +1,51 @@
+import sys
+import time
+import threading
+
+import pytest
+
+import doc_watcher
+from doc_watcher import DocWatcher
+
+
+def no_inotify(folder):
+    raise OSError("inotify disabled for this test")
+
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_change_during_on_change_triggers_another_call(tmp_path, monkeypatch, polling):
+    if polling:
+        monkeypatch.setattr(doc_watcher, "_Inotify", no_inotify)
+    elif not sys.platform.startswith("linux"):
+        pytest.skip("inotify is Linux only")
+    calls = []
+    second = threading.Event()
+
+    def on_change():
+        calls.append(sorted(path.name for path in tmp_path.iterdir()))
+        if len(calls) == 1:
+            (tmp_path / "added_during_update.txt").write_text("more")
+        else:
+            second.set()
+
+    watcher = DocWatcher(str(tmp_path), on_change, exts={".txt"}, debounce_seconds=0.2, poll_seconds=0.1).start()
+    try:
+        time.sleep(0.3)
+        (tmp_path / "lesson.txt").write_text("plants")
+        assert second.wait(5), f"only {len(calls)} call(s) in {watcher.mode} mode"
+    finally:
+        watcher.stop(2)
+    assert watcher.mode == ("polling" if polling else "inotify")
+    assert calls[-1] == ["added_during_update.txt", "lesson.txt"]
+
+
+def test_other_extensions_are_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(doc_watcher, "_Inotify", no_inotify)
+    called = threading.Event()
+    watcher = DocWatcher(str(tmp_path), called.set, exts={".pdf"}, debounce_seconds=0.1, poll_seconds=0.05).start()
+    try:
+        time.sleep(0.2)
+        (tmp_path / "notes.txt").write_text("ignored")
+        assert not called.wait(0.6)
+    finally:
+        watcher.stop(2)
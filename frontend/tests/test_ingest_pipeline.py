@@ -0,0 +1,99 @@
+import sys
+import types
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import ingest_pipeline
+import ingest_worker
+from ingest_pipeline import ingest_files
+
+
+class FakeRAG:
+    def __init__(self):
+        self.chunks = []
+
+    def embed(self, texts, batch_size=None):
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+    def add_chunks(self, chunks, embeddings, save=True):
+        start = len(self.chunks)
+        self.chunks += chunks
+        return list(range(start, len(self.chunks)))
+
+    def remove_chunks(self, ids, save=True):
+        pass
+
+    def save(self):
+        pass
+
+
+def write_docs(folder, count):
+    paths = []
+    for i in range(count):
+        path = folder / f"lesson{i}.txt"
+        path.write_text(f"Lesson {i}. Plants need water and light to grow.\n" * 20)
+        paths.append(str(path))
+    return paths
+
+
+def test_workers_do_not_import_the_apps_main(tmp_path, monkeypatch):
+    # Stands in for py_app: importing it (as spawn does with __main__) leaves a marker
+    marker = tmp_path / "imported"
+    heavy_main = tmp_path / "heavy_main.py"
+    heavy_main.write_text(f"open({str(marker)!r}, 'w').close()\n")
+    main = types.ModuleType("__main__")
+    main.__file__ = str(heavy_main)
+    main.__spec__ = None
+    monkeypatch.setitem(sys.modules, "__main__", main)
+
+    rag = FakeRAG()
+    chunk_ids, report = ingest_files(rag, write_docs(tmp_path, 3), workers=2)
+    assert sorted(chunk_ids) == ["lesson0.txt", "lesson1.txt", "lesson2.txt"]
+    assert report.failed == {}
+    assert not marker.exists()
+    assert sys.modules["__main__"] is main
+
+
+def test_in_process_extraction(tmp_path):
+    rag = FakeRAG()
+    chunk_ids, report = ingest_files(rag, write_docs(tmp_path, 2), workers=0)
+    assert sorted(chunk_ids) == ["lesson0.txt", "lesson1.txt"]
+    assert len(rag.chunks) == report.chunks > 0
+
+
+def test_file_refused_by_a_broken_pool_goes_to_the_next_one(tmp_path, monkeypatch):
+    pools = []
+
+    class FlakyPool:
+        """Runs files in this process; the first pool's worker "dies" and it refuses its second file."""
+        def __init__(self, workers, mp_context, initializer, initargs):
+            initializer(*initargs)
+            self.broken = not pools
+            self.submitted = 0
+            pools.append(self)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+        def submit(self, fn, path):
+            self.submitted += 1
+            future = Future()
+            if not self.broken:
+                future.set_result(fn(path))
+            elif self.submitted == 1:
+                future.set_exception(BrokenProcessPool("worker died"))
+            else:
+                raise BrokenProcessPool("worker died")
+            return future
+
+    monkeypatch.setattr(ingest_pipeline, "ProcessPoolExecutor", FlakyPool)
+    monkeypatch.setattr(ingest_worker, "_pages", None)
+    chunk_ids, report = ingest_files(FakeRAG(), write_docs(tmp_path, 3), workers=1)
+    assert list(report.failed) == ["lesson0.txt"]
+    assert sorted(chunk_ids) == ["lesson1.txt", "lesson2.txt"]
+    assert len(pools) == 2
@@ -0,0 +1,34 @@
+from latency_tracer import LatencyTracer
+
+
+def test_marks_from_a_turn_that_is_no_longer_current_are_dropped():
+    tracer = LatencyTracer()
+    tracer.start_turn()
+    tracer.mark("wakeword")
+    tracer.bind(1)
+    tracer.mark("rag_start", 1)
+    # The child asks again before turn 1 finished playing
+    tracer.start_turn()
+    tracer.mark("wakeword")
+    tracer.mark("rag_done", 1)
+    tracer.mark("playback_end", 1)
+    tracer.end_turn(1)
+    tracer.bind(2)
+    tracer.mark("rag_start", 2)
+    tracer.mark("rag_done", 2)
+    tracer.end_turn(2)
+    first, second = tracer.records()
+    assert set(first["events_ms"]) == {"wakeword", "rag_start"}
+    assert set(second["events_ms"]) == {"wakeword", "rag_start", "rag_done"}
+    assert not second["complete"]
+
+
+def test_capture_marks_go_to_the_open_record():
+    tracer = LatencyTracer()
+    tracer.mark("stt_done")
+    tracer.bind(7)
+    tracer.mark("playback_start", 7)
+    tracer.mark("playback_end", 7)
+    tracer.end_turn(7)
+    record, = tracer.records()
+    assert record["complete"] and "playback" in record["stages_ms"]
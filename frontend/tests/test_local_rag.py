@@ -0,0 +1,43 @@
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from doc_index import DocIndex, StaleSnapshotError
+from local_rag import LocalRAG
+
+DIM = 8
+
+
+def make_rag(folder):
+    """A LocalRAG without the sentence-transformers model (only its index handling is used)."""
+    rag = LocalRAG.__new__(LocalRAG)
+    rag.index_dir = folder
+    rag.load_options = {"embedding_model": "test-model", "dim": DIM}
+    rag.lock = threading.Lock()
+    rag.update_lock = threading.Lock()
+    rag.staged = None
+    rag.index = DocIndex.load(folder, **rag.load_options) or DocIndex(DIM, embedding_model="test-model")
+    return rag
+
+
+def add(rag, count, source):
+    vectors = np.eye(DIM, dtype=np.float32)[:count]
+    return rag.add_chunks([{"source": source, "page": 1, "text": source}] * count, vectors)
+
+
+def test_update_after_another_process_saved_reloads_instead_of_overwriting(tmp_path):
+    folder = str(tmp_path)
+    first = make_rag(folder)
+    add(first, 2, "first.txt")
+    mine, other = make_rag(folder), make_rag(folder)
+    add(other, 1, "other.txt")
+    with pytest.raises(StaleSnapshotError):
+        add(mine, 1, "mine.txt")
+    # Now serving the other process's snapshot; redoing the change lands on top of it
+    assert len(mine.index) == 3
+    add(mine, 1, "mine.txt")
+    sources = sorted(chunk["source"] for _, chunk in make_rag(folder).index.chunks.items())
+    assert sources == ["first.txt", "first.txt", "mine.txt", "other.txt"]
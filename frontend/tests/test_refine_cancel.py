@@ -0,0 +1,35 @@
+import threading
+
+import refine_cache
+from refine_cache import RefineCache
+
+
+class FakeChatTTS:
+    """Cancels the turn while refining, as cancel_tts() would, and records the calls."""
+    def __init__(self, cancel):
+        self.cancel = cancel
+        self.calls = []
+
+    def infer(self, texts, refine_text_only=False, **kwargs):
+        self.calls.append("refine" if refine_text_only else "code")
+        if refine_text_only:
+            self.cancel.set()
+            return ["cut sho" for _ in texts]
+        return [None for _ in texts]
+
+
+def test_cancel_during_refine_is_not_memoized():
+    cancel = threading.Event()
+    chattts, cache = FakeChatTTS(cancel), RefineCache(path=None)
+    assert list(refine_cache.infer(chattts, cache, ["cut short sentence"], cancel=cancel)) == []
+    assert cache.get("cut short sentence") is None
+    assert chattts.calls == ["refine"]
+
+
+def test_refined_text_is_memoized_and_reused():
+    chattts, cache = FakeChatTTS(threading.Event()), RefineCache(path=None)
+    # No cancel event passed: the fake's cancel doesn't concern this turn
+    refine_cache.infer(chattts, cache, ["a sentence"])
+    refine_cache.infer(chattts, cache, ["a sentence"])
+    assert cache.get("a sentence") == "cut sho"
+    assert chattts.calls == ["refine", "code", "code"]
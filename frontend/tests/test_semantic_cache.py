@@ -0,0 +1,106 @@
+import re
+import time
+
+import numpy as np
+
+from query_encoder import QueryEncoder
+from semantic_cache import SemanticCache, normalize_question, math_terms
+
+WORDS = ["what", "whats", "is", "the", "capital", "of", "france", "plus", "times", "two", "three", "four"]
+
+
+def bag_of_words(texts):
+    """Normalized word counts over WORDS: questions with the same words embed identically."""
+    vectors = np.zeros((len(texts), len(WORDS)), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in re.findall(r"[a-z]+", text.lower()):
+            if word in WORDS:
+                vectors[row, WORDS.index(word)] += 1
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+
+def ignore_numbers(texts):
+    """An embedding that can't tell numbers or operators apart, like a real one nearly can't."""
+    return bag_of_words([" ".join(word for word in re.findall(r"[a-z]+", text.lower())
+                                  if word not in ("two", "three", "plus", "times"))
+                         for text in texts])
+
+
+def test_normalization():
+    assert normalize_question("What's 2+2?") == normalize_question("whats  two plus two")
+    assert math_terms(normalize_question("What is 12 * 3?")) == ("twelve", "times", "three")
+
+
+def test_exact_repeat_hits_without_embeddings():
+    cache = SemanticCache()
+    cache.store("What's 2+2?", "Four!", seconds=1.5)
+    assert cache.lookup("whats two plus two") == "Four!"
+    assert cache.lookup("What is the capital of France?") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["saved_s"]) == (1, 1, 1.5)
+
+
+def test_similar_question_hits():
+    cache = SemanticCache(embed=bag_of_words)
+    cache.store("What is the capital of France?", "Paris.")
+    assert cache.lookup("the capital of France is what") == "Paris."
+
+
+def test_different_numbers_or_operators_miss():
+    cache = SemanticCache(embed=ignore_numbers)
+    cache.store("What is 2 + 2?", "Four.")
+    assert cache.lookup("What is 2 + 3?") is None
+    assert cache.lookup("What is 2 * 2?") is None
+    assert cache.lookup("What is 2 plus 2") == "Four."
+    assert cache.stats()["guarded"] == 2
+
+
+def test_expired_entries_miss():
+    cache = SemanticCache(ttl_seconds=60)
+    cache.store("What is the capital of France?", "Paris.")
+    cache.entries[normalize_question("What is the capital of France?")]["created"] = time.time() - 61
+    assert cache.lookup("What is the capital of France?") is None
+
+
+def test_corpus_change_clears_answers():
+    version = ["a:1"]
+    cache = SemanticCache(corpus_version=lambda: version[0])
+    cache.store("What is the capital of France?", "Paris.")
+    version[0] = "a:2"
+    assert cache.lookup("What is the capital of France?") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_goes_first():
+    cache = SemanticCache(max_entries=2)
+    cache.store("count to one", "1")
+    cache.store("count to two", "1, 2")
+    assert cache.lookup("count to one") == "1"
+    cache.store("count to three", "1, 2, 3")
+    assert cache.lookup("count to two") is None
+    assert cache.lookup("count to one") == "1"
+
+
+def test_trivial_utterances_are_not_cached():
+    cache = SemanticCache(embed=bag_of_words)
+    cache.store("Hi!", "Hello, friend!")
+    assert cache.lookup("No!") is None
+    assert cache.lookup("Hi!") is None
+    cache.store("Why?", "Because plants need light.")
+    assert cache.lookup("why") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_retrieval_reuses_the_lookup_embedding():
+    """The cache embeds the question as asked, so retrieving for a miss is a query-encoder cache hit."""
+    encoded = []
+
+    def encode_batch(texts):
+        encoded.extend(texts)
+        return bag_of_words(texts)
+
+    encoder = QueryEncoder(encode_batch, max_wait_ms=0)
+    cache = SemanticCache(embed=lambda texts: np.stack([encoder.encode(text) for text in texts]))
+    assert cache.lookup("What is the capital of France?") is None
+    encoder.encode("What is the capital of France?") # what LocalRAG.retrieve does next
+    assert len(encoded) == 1
@@ -0,0 +1,50 @@
+import threading
+
+from streaming import split_sentences, iter_sentences, prefetch, MIN_SENTENCE_CHARS
+
+
+def test_split_sentences():
+    text = "Plants need water to grow. They also need light! Do you know why?"
+    assert split_sentences(text) == ["Plants need water to grow.", "They also need light!", "Do you know why?"]
+
+
+def test_short_fragments_merge_forward():
+    assert split_sentences("Yes! Two plus two is four.") == ["Yes! Two plus two is four."]
+    assert all(len(sentence) >= MIN_SENTENCE_CHARS for sentence in split_sentences("Ok. Sure. Let's count to ten."))
+
+
+def test_closing_quote_stays_with_its_sentence():
+    assert split_sentences('The cat said "meow." Then it slept all day.') == \
+        ['The cat said "meow."', "Then it slept all day."]
+
+
+def test_no_boundary_and_empty_text():
+    assert split_sentences("three point five") == ["three point five"]
+    assert split_sentences("") == []
+
+
+def test_tokens_give_the_same_sentences_as_the_whole_text():
+    text = "Plants need water to grow. They also need light! Do you know why?"
+    tokens = [text[i:i + 3] for i in range(0, len(text), 3)]
+    assert list(iter_sentences(tokens)) == split_sentences(text)
+
+
+def test_sentence_is_yielded_before_the_stream_ends():
+    more = threading.Event()
+
+    def tokens():
+        yield "The first sentence is done. "
+        yield "The second"
+        more.wait(5)
+        yield " one is not."
+
+    sentences = iter_sentences(tokens())
+    assert next(sentences) == "The first sentence is done."
+    more.set()
+    assert list(sentences) == ["The second one is not."]
+
+
+def test_prefetch_stops_when_cancelled():
+    cancel = threading.Event()
+    cancel.set()
+    assert list(prefetch(iter(range(100)), maxsize=2, cancel=cancel)) == []
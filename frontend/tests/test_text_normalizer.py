@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+from benchmarks.bench_text_normalizer import GOLDEN_PATH
+from text_normalizer import normalize_for_tts, number_to_words, FALLBACK_TEXT
+
+with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+    GOLDEN_CASES = json.load(f)
+
+
+@pytest.mark.parametrize("case", GOLDEN_CASES, ids=[case["input"] for case in GOLDEN_CASES])
+def test_golden_case(case):
+    assert normalize_for_tts(case["input"]) == case["expected"]
+
+
+def test_number_to_words():
+    assert number_to_words(0) == "zero"
+    assert number_to_words(105) == "one hundred five"
+    assert number_to_words(2024000) == "two million twenty four thousand"
+
+
+def test_nothing_speakable_falls_back():
+    assert normalize_for_tts("?!...") == FALLBACK_TEXT
@@ -0,0 +1,125 @@
+import sys
+import types
+import queue
+import threading
+
+import numpy as np
+
+import tts_process
+from tts_process import TTSProcessClient
+
+
+class FakeLogic:
+    """ChatbotLogic's side of the worker protocol, without ChatTTS."""
+    class Cache:
+        def stats(self):
+            return {"hits": 3, "misses": 1}
+
+    tts_cache = Cache()
+
+    def synthesize(self, text, cancel=None):
+        return np.ones(len(text), dtype=np.float32)
+
+    def cancel_tts(self):
+        pass
+
+
+class FakeProcess:
+    pid = 0
+    exitcode = None
+
+    def is_alive(self):
+        return True
+
+
+def make_client(monkeypatch):
+    """A client whose "worker" is tts_process._serve on a thread instead of a process."""
+    def spawn(self):
+        self.requests, self.responses = queue.Queue(), queue.Queue()
+        self.process = FakeProcess()
+        self.responses.put((0, "ready", 0.0))
+        threading.Thread(target=tts_process._serve, args=(FakeLogic(), self.requests, self.responses,
+                                                          threading.Event()), daemon=True).start()
+    monkeypatch.setattr(TTSProcessClient, "_spawn", spawn)
+    client = TTSProcessClient()
+    assert client.start(timeout=5)
+    return client
+
+
+def test_cache_stats_round_trip_returns(monkeypatch):
+    client = make_client(monkeypatch)
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(client.cache_stats()), daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive(), "cache_stats() hung"
+    assert result == {"hits": 3, "misses": 1}
+    assert client.pending == {}
+
+
+def test_synthesize_after_stats(monkeypatch):
+    client = make_client(monkeypatch)
+    client.cache_stats()
+    wav = client.synthesize("hello")
+    assert wav is not None and len(wav) == 5
+
+
+def test_start_returns_once_worker_is_given_up_on(monkeypatch):
+    def spawn(self):
+        self.requests, self.responses = queue.Queue(), queue.Queue()
+        self.process = FakeProcess()
+        self.failed = True # what _on_worker_died does after too many crashes
+    monkeypatch.setattr(TTSProcessClient, "_spawn", spawn)
+    client = TTSProcessClient()
+    thread = threading.Thread(target=lambda: client.start(timeout=60), daemon=True)
+    thread.start()
+    thread.join(2)
+    assert not thread.is_alive(), "start() kept waiting for a failed worker"
+
+
+def test_worker_does_not_import_the_apps_main(tmp_path, monkeypatch):
+    # Stands in for py_app: importing it (as spawn does with __main__) leaves a marker
+    marker = tmp_path / "imported"
+    heavy_main = tmp_path / "heavy_main.py"
+    heavy_main.write_text(f"open({str(marker)!r}, 'w').close()\n")
+    main = types.ModuleType("__main__")
+    main.__file__ = str(heavy_main)
+    main.__spec__ = None
+    monkeypatch.setitem(sys.modules, "__main__", main)
+
+    client = TTSProcessClient()
+    client._spawn()
+    client.process.join(60)
+    client.close()
+    assert not client.process.is_alive()
+    assert not marker.exists()
+    assert sys.modules["__main__"] is main
+
+
+def test_owner_is_told_when_the_worker_is_given_up_on(monkeypatch):
+    class CrashingProcess(FakeProcess):
+        exitcode = -9
+        alive = True
+
+        def is_alive(self):
+            return self.alive
+
+    processes = []
+
+    def spawn(self):
+        # Booted once; every restart dies straight away
+        self.requests, self.responses = queue.Queue(), queue.Queue()
+        self.process = CrashingProcess()
+        self.process.alive = not processes
+        if not processes:
+            self.responses.put((0, "ready", 0.0))
+        processes.append(self.process)
+    monkeypatch.setattr(TTSProcessClient, "_spawn", spawn)
+    given_up = threading.Event()
+    client = TTSProcessClient(on_failed=given_up.set)
+    assert client.start(timeout=5)
+    processes[0].alive = False
+    assert given_up.wait(10)
+    assert client.failed
+    assert len(processes) == tts_process.MAX_RESTARTS + 1
+    assert client.synthesize("hello") is None
@@ -0,0 +1,67 @@
+import itertools
+import threading
+
+import numpy as np
+import pytest
+
+from latency_tracer import LatencyTracer
+from voice_pipeline import VoicePipeline, FALLBACK_RESPONSE
+
+
+class FailingLogic:
+    """An LLM that fails part-way through its answer; synthesis records what it was asked to say."""
+    def __init__(self):
+        self.spoken = []
+
+    def stream_response(self, text, cancel=None):
+        yield "First sentence. "
+        raise RuntimeError("LLM backend unreachable")
+
+    def get_response(self, text):
+        raise RuntimeError("LLM backend unreachable")
+
+    def synthesize_stream(self, text, cancel=None):
+        self.spoken.append(text)
+        yield np.zeros(10, dtype=np.float32)
+
+    def synthesize_batch(self, text, cancel=None):
+        self.spoken.append(text)
+        return [np.zeros(10, dtype=np.float32)]
+
+    def cancel_tts(self):
+        pass
+
+
+@pytest.mark.parametrize("stream_tts", [True, False])
+def test_reasoning_error_speaks_fallback_and_finishes_turn(stream_tts):
+    logic = FailingLogic()
+    finished = threading.Event()
+    pipeline = VoicePipeline(logic, LatencyTracer(), emit_state=lambda state: None,
+                             emit_audio=lambda wav, turn_id: None, emit_finished=lambda turn_id: finished.set(),
+                             emit_stop=lambda turn_id: None, stream_tts=stream_tts)
+    pipeline.start()
+    try:
+        pipeline.submit("what is two plus two")
+        assert finished.wait(5), "turn never finished after the LLM failed"
+    finally:
+        pipeline.stop()
+    assert logic.spoken[-1] == FALLBACK_RESPONSE
+
+
+def test_turn_ids_continue_across_sessions():
+    """A new session's turns must not reuse ids the UI has already marked as cancelled."""
+    turn_ids = itertools.count(1)
+    finished = []
+    for _ in range(2):
+        done = threading.Event()
+        pipeline = VoicePipeline(FailingLogic(), LatencyTracer(), emit_state=lambda state: None,
+                                 emit_audio=lambda wav, turn_id: None,
+                                 emit_finished=lambda turn_id: (finished.append(turn_id), done.set()),
+                                 emit_stop=lambda turn_id: None, turn_ids=turn_ids)
+        pipeline.start()
+        try:
+            pipeline.submit("what is two plus two")
+            assert done.wait(5)
+        finally:
+            pipeline.stop()
+    assert finished == [1, 2]
@@ -0,0 +1,177 @@
+import re
+from functools import lru_cache
+
+# Spoken form for TTS: words separated by single spaces, with no punctuation
+# left for ChatTTS to trip over (apostrophes inside words are kept).
+FALLBACK_TEXT = "Let's try again with a different question!"
+
+ONES = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+        "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen"]
+TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+SCALES = [(10 ** 9, "billion"), (10 ** 6, "million"), (1000, "thousand")]
+IRREGULAR_ORDINALS = {"one": "first", "two": "second", "three": "third", "five": "fifth",
+                      "eight": "eighth", "nine": "ninth", "twelve": "twelfth"}
+SYMBOL_WORDS = {
+    "+": "plus", "*": "times", "×": "times", "÷": "divided by", "/": "divided by", "=": "equals",
+    "%": "percent", ">": "greater than", "<": "less than", "≥": "greater than or equal to",
+    "≤": "less than or equal to", "&": "and", "@": "at", "#": "number", "^": "to the power of",
+    "√": "square root of",
+}
+VULGAR_FRACTIONS = {"½": (1, 2), "⅓": (1, 3), "⅔": (2, 3), "¼": (1, 4), "¾": (3, 4), "⅕": (1, 5), "⅛": (1, 8)}
+CURRENCIES = {"$": ("dollar", "dollars", "cent", "cents"), "₹": ("rupee", "rupees", "paisa", "paise")}
+
+# One tokenizer pass: the alternatives are tried left to right at each position,
+# so the more specific number shapes come before plain integers.
+TOKEN = re.compile(r"""
+    (?P<time>\b(?P<hour>[01]?\d|2[0-3]):(?P<minute>[0-5]\d)(?:\s*(?P<ampm>[AaPp])\.?\s?[Mm]\b\.?)?)
+  | (?P<money>(?P<currency>[$₹])\s?(?P<units>\d{1,3}(?:,\d{3})+|\d+)(?:\.(?P<cents>\d{1,2})\b)?)
+  | (?P<fraction>\b(?P<numerator>\d+)\s*/\s*(?P<denominator>\d+)\b)
+  | (?P<vulgar>[½⅓⅔¼¾⅕⅛])
+  | (?P<decimal>\b(?P<whole>\d+)\.(?P<digits>\d+)\b)
+  | (?P<ordinal>\b(?P<ordinal_number>\d+)(?:st|nd|rd|th)\b)
+  | (?P<minus>[-−–](?=\s*[-−–]?\s*\d))
+  | (?P<spaced_minus>(?<=\s)[-−](?=\s))
+  | (?P<number>\b\d{1,3}(?:,\d{3})+\b|\d+)
+  | (?P<times>(?<=\d)\s*[xX](?=\s*\d))
+  | (?P<symbol>[+*×÷/=%><≥≤&@#^√])
+  | (?P<other>(?!(?<=[A-Za-z])'(?=[A-Za-z]))[^\w\s]|_)
+""", re.VERBOSE)
+
+
+def _below_thousand(n: int) -> list:
+    words = []
+    if n >= 100:
+        words += [ONES[n // 100], "hundred"]
+        n %= 100
+    if n >= 20:
+        words.append(TENS[n // 10])
+        n %= 10
+        if n:
+            words.append(ONES[n])
+    elif n or not words:
+        words.append(ONES[n])
+    return words
+
+
+@lru_cache(maxsize=4096)
+def number_to_words(n: int) -> str:
+    """Cardinal number in words without hyphens ("twenty one"). Memoized."""
+    if n < 0:
+        return f"negative {number_to_words(-n)}"
+    if n < 1000:
+        return " ".join(_below_thousand(n))
+    words = []
+    for scale, name in SCALES:
+        if n >= scale:
+            words.append(f"{number_to_words(n // scale)} {name}")
+            n %= scale
+    if n:
+        words.append(number_to_words(n))
+    return " ".join(words)
+
+
+@lru_cache(maxsize=1024)
+def ordinal_words(n: int) -> str:
+    """Ordinal number in words ("twenty first")."""
+    head, _, last = number_to_words(n).rpartition(" ")
+    if last in IRREGULAR_ORDINALS:
+        last = IRREGULAR_ORDINALS[last]
+    elif last.endswith("y"):
+        last = last[:-1] + "ieth"
+    else:
+        last += "th"
+    return f"{head} {last}" if head else last
+
+
+def fraction_words(numerator: int, denominator: int) -> str:
+    """Proper fractions the way children say them: "one half", "three fourths"."""
+    if denominator == 2:
+        name = "half" if numerator == 1 else "halves"
+    else:
+        name = ordinal_words(denominator) + ("" if numerator == 1 else "s")
+    return f"{number_to_words(numerator)} {name}"
+
+
+def digits_words(digits: str) -> str:
+    return " ".join(ONES[int(d)] for d in digits)
+
+
+def _parse_int(text: str) -> int:
+    return int(text.replace(",", ""))
+
+
+# Precompute the numbers children hear most; the lru_cache covers the rest
+for _n in range(1001):
+    number_to_words(_n)
+for _n in range(1, 101):
+    ordinal_words(_n)
+
+
+def _replace(match) -> str:
+    kind = match.lastgroup
+    if kind == "number":
+        return f" {number_to_words(_parse_int(match.group()))} "
+    if kind == "other":
+        return " "
+    if kind == "symbol":
+        return f" {SYMBOL_WORDS[match.group()]} "
+    if kind == "minus":
+        # Binary minus after a number, a one-letter variable or a closing bracket
+        # ("3-2", "x - 1", "(4) - 1"); otherwise a negative sign ("is -2")
+        before = match.string[max(0, match.start() - 8):match.start()].rstrip()
+        if before and (before[-1].isdigit() or before[-1] == ")"
+                       or (before[-1].isalpha() and not before[-2:-1].isalpha())):
+            return " minus "
+        return " negative "
+    if kind == "spaced_minus":
+        # A lone minus between words ("a - b", "cats - dogs") is still read out
+        return " minus "
+    if kind == "times":
+        return " times "
+    if kind == "decimal":
+        return f" {number_to_words(int(match.group('whole')))} point {digits_words(match.group('digits'))} "
+    if kind == "ordinal":
+        return f" {ordinal_words(int(match.group('ordinal_number')))} "
+    if kind == "fraction":
+        numerator, denominator = int(match.group("numerator")), int(match.group("denominator"))
+        if 0 < numerator < denominator <= 20:
+            return f" {fraction_words(numerator, denominator)} "
+        if denominator == 0:
+            return f" {number_to_words(numerator)} divided by zero "
+        return f" {number_to_words(numerator)} divided by {number_to_words(denominator)} "
+    if kind == "vulgar":
+        return f" {fraction_words(*VULGAR_FRACTIONS[match.group()])} "
+    if kind == "time":
+        hour, minute = int(match.group("hour")), match.group("minute")
+        if minute == "00":
+            spoken = f"{number_to_words(hour)} o clock"
+        elif minute[0] == "0":
+            spoken = f"{number_to_words(hour)} oh {ONES[int(minute[1])]}"
+        else:
+            spoken = f"{number_to_words(hour)} {number_to_words(int(minute))}"
+        ampm = match.group("ampm")
+        if ampm:
+            spoken += f" {ampm.lower()} m"
+        return f" {spoken} "
+    if kind == "money":
+        one, many, small_one, small_many = CURRENCIES[match.group("currency")]
+        units = _parse_int(match.group("units"))
+        spoken = f"{number_to_words(units)} {one if units == 1 else many}"
+        cents = match.group("cents")
+        if cents and int(cents):
+            small = int(cents.ljust(2, "0"))
+            spoken += f" and {number_to_words(small)} {small_one if small == 1 else small_many}"
+        return f" {spoken} "
+    return match.group()
+
+
+def normalize_for_tts(text: str) -> str:
+    """
+    Turns an answer into plain spoken words for ChatTTS in one tokenizer pass:
+    numbers, decimals, fractions, negatives, ordinals, times, money and math
+    symbols become words, other punctuation becomes a space.
+    """
+    spoken = " ".join(TOKEN.sub(_replace, text).split())
+    if len(spoken) < 3:
+        return FALLBACK_TEXT
+    return spoken
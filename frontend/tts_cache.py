@@ -0,0 +1,132 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = "tts_cache"
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024   # ~11 minutes of float32 audio at 24 kHz
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+
+
+def make_key(text: str, spk_emb, temperature, top_P, top_K) -> str:
+    """Content address of an utterance: the cleaned text plus everything that changes the voice."""
+    material = "\x1f".join(str(part) for part in (text, spk_emb, temperature, top_P, top_K))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Two-tier cache of synthesized waveforms. The memory tier holds numpy
+    arrays, the disk tier holds .npy files under cache_dir; each tier is
+    bounded in bytes and evicts least recently used entries. Disk hits are
+    promoted to memory.
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, memory_bytes=DEFAULT_MEMORY_BYTES, disk_bytes=DEFAULT_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_limit = memory_bytes
+        self.disk_limit = disk_bytes
+        self.memory = OrderedDict() # key -> np.ndarray
+        self.memory_size = 0
+        self.disk = OrderedDict()   # key -> file size in bytes
+        self.disk_size = 0
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._scan_disk()
+
+    def _scan_disk(self):
+        """Rebuilds the disk LRU order from file modification times (touched on every hit)."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npy"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self.disk[key] = size
+            self.disk_size += size
+        self._evict_disk()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, key: str):
+        """Returns the cached waveform for key, or None."""
+        with self.lock:
+            wav = self.memory.get(key)
+            if wav is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return wav
+            if key in self.disk:
+                try:
+                    wav = np.load(self._path(key))
+                    os.utime(self._path(key))
+                    self.disk.move_to_end(key)
+                    self.disk_hits += 1
+                    self._put_memory(key, wav)
+                    return wav
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Dropping unreadable TTS cache entry {key}: {e}")
+                    self._drop_disk(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, wav: np.ndarray):
+        """Stores a waveform in both tiers."""
+        with self.lock:
+            self._put_memory(key, wav)
+            if self.cache_dir and key not in self.disk:
+                try:
+                    tmp_path = f"{self._path(key)}.tmp"
+                    with open(tmp_path, "wb") as f:
+                        np.save(f, wav)
+                    os.replace(tmp_path, self._path(key))
+                    size = os.path.getsize(self._path(key))
+                    self.disk[key] = size
+                    self.disk_size += size
+                    self._evict_disk()
+                except OSError as e:
+                    print(f"⚠️ Could not write TTS cache entry: {e}")
+
+    def _put_memory(self, key, wav):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return
+        if wav.nbytes > self.memory_limit:
+            return
+        self.memory[key] = wav
+        self.memory_size += wav.nbytes
+        while self.memory_size > self.memory_limit:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_size -= evicted.nbytes
+
+    def _evict_disk(self):
+        while self.disk_size > self.disk_limit and self.disk:
+            self._drop_disk(next(iter(self.disk)))
+
+    def _drop_disk(self, key):
+        self.disk_size -= self.disk.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "lookups": lookups,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory_size,
+                "disk_entries": len(self.disk),
+                "disk_bytes": self.disk_size,
+            }
@@ -0,0 +1,269 @@
+import time
+import queue
+import itertools
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+from streaming import is_cancelled
+from spawn_main import as_main
+
+READY_TIMEOUT_SECONDS = 300 # model load + warm-up on a slow CPU
+POLL_SECONDS = 0.05
+# Give up restarting if the worker dies this many times within the window
+MAX_RESTARTS = 3
+RESTART_WINDOW_SECONDS = 600
+
+
+def _send_wav(responses, req_id, wav):
+    """Child side: puts a waveform in a fresh shared-memory block and sends only its name."""
+    if wav is None:
+        responses.put((req_id, "none"))
+        return
+    wav = np.ascontiguousarray(wav, dtype=np.float32)
+    if wav.size == 0:
+        responses.put((req_id, "chunk", None, 0))
+        return
+    shm = shared_memory.SharedMemory(create=True, size=wav.nbytes)
+    np.ndarray(wav.shape, dtype=np.float32, buffer=shm.buf)[:] = wav
+    # The parent unlinks the block after copying it out; stop this process's
+    # resource tracker from "cleaning up" (and warning about) it at exit.
+    resource_tracker.unregister(shm._name, "shared_memory")
+    shm.close()
+    responses.put((req_id, "chunk", shm.name, wav.size))
+
+
+def _receive_wav(name, size) -> np.ndarray:
+    """Parent side: copies a waveform out of shared memory and frees the block."""
+    if size == 0:
+        return np.zeros(0, dtype=np.float32)
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return np.ndarray((size,), dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _worker_main(requests, responses, cancel, warm_up_tts, cpu_perf, compile_tts, tts_threads):
+    """Entry point of the TTS process: loads ChatTTS in-process here and serves requests."""
+    from chatbot_logic import ChatbotLogic
+
+    start_time = time.perf_counter()
+    logic = ChatbotLogic(components=("tts",), warm_up_tts=warm_up_tts, tts_process=False,
+                         cpu_perf=cpu_perf, compile_tts=compile_tts, tts_threads=tts_threads)
+    responses.put((0, "ready", time.perf_counter() - start_time))
+
+    def watch_cancel():
+        # Interrupt ChatTTS mid-inference as soon as the parent asks
+        while True:
+            cancel.wait()
+            logic.cancel_tts()
+            while cancel.is_set():
+                time.sleep(0.01)
+    threading.Thread(target=watch_cancel, daemon=True).start()
+    _serve(logic, requests, responses, cancel)
+
+
+def _serve(logic, requests, responses, cancel):
+    """Worker request loop: answers each request with its replies followed by "done" (or "error")."""
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        req_id, kind, payload = request
+        if cancel.is_set():
+            # Let watch_cancel interrupt the previous inference before this one starts
+            time.sleep(0.02)
+        cancel.clear()
+        try:
+            if kind == "stats":
+                responses.put((req_id, "value", logic.tts_cache.stats()))
+                responses.put((req_id, "done"))
+                continue
+            if kind == "stream":
+                wavs = logic.synthesize_stream(payload, cancel)
+            elif kind == "batch":
+                wavs = logic.synthesize_batch(payload, cancel)
+            else:
+                wavs = [logic.synthesize(payload, cancel)]
+            for wav in wavs:
+                _send_wav(responses, req_id, wav)
+            responses.put((req_id, "done"))
+        except Exception as e:
+            responses.put((req_id, "error", str(e)))
+
+
+class TTSProcessClient:
+    """
+    Runs ChatTTS in a separate process so inference doesn't fight the Qt
+    event loop and RealtimeSTT for the GIL. Requests go over a queue;
+    waveforms come back through multiprocessing.shared_memory (only the
+    block name is pickled). A reader thread routes responses to callers and
+    restarts the worker if it dies. If it has to give up on a worker that was
+    running, on_failed() is called (from the reader thread) so the owner can
+    take over synthesis some other way.
+    """
+    def __init__(self, warm_up_tts=True, cpu_perf=False, compile_tts=False, tts_threads=None, on_failed=None):
+        self.warm_up_tts = warm_up_tts
+        self.cpu_perf = cpu_perf
+        self.compile_tts = compile_tts
+        self.tts_threads = tts_threads
+        self.on_failed = on_failed
+        self.ctx = mp.get_context("spawn") # never fork a process that has Qt and torch threads
+        self.cancel_event = self.ctx.Event()
+        self.ready = threading.Event()
+        self.pending = {} # req_id -> queue.Queue of responses
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.restarts = []
+        self.closing = False
+        self.failed = False
+        self.process = None
+        self.boot_seconds = None
+
+    def start(self, timeout=READY_TIMEOUT_SECONDS) -> bool:
+        """Starts the worker and waits until its model is loaded."""
+        self._spawn()
+        threading.Thread(target=self._read_responses, name="tts-process-reader", daemon=True).start()
+        return self._wait_ready(timeout)
+
+    def _wait_ready(self, timeout) -> bool:
+        """Waits for the worker's model to be loaded; gives up at once if the worker has been given up on."""
+        deadline = time.monotonic() + timeout
+        while not self.failed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self.ready.wait(min(remaining, POLL_SECONDS * 4)):
+                return True
+        return False
+
+    def _spawn(self):
+        self.requests = self.ctx.Queue()
+        self.responses = self.ctx.Queue()
+        self.process = self.ctx.Process(
+            target=_worker_main,
+            args=(self.requests, self.responses, self.cancel_event, self.warm_up_tts,
+                  self.cpu_perf, self.compile_tts, self.tts_threads),
+            name="tts-worker", daemon=True
+        )
+        # Only chatbot_logic's imports (ChatTTS, torch), not the app's Qt and STT ones
+        with as_main():
+            self.process.start()
+        print(f"TTS worker process started (pid {self.process.pid})")
+
+    def _read_responses(self):
+        while not self.closing:
+            try:
+                message = self.responses.get(timeout=POLL_SECONDS * 4)
+            except queue.Empty:
+                if not self.process.is_alive() and not self.closing:
+                    self._on_worker_died()
+                    if self.failed:
+                        return
+                continue
+            except (EOFError, OSError):
+                continue
+            req_id, status = message[0], message[1]
+            if status == "ready":
+                self.boot_seconds = message[2]
+                print(f"⏱ TTS worker ready in {self.boot_seconds:.2f}s")
+                self.ready.set()
+                continue
+            if status == "chunk":
+                # Copy out and free the block right away, even if nobody is waiting any more
+                message = (req_id, status, _receive_wav(message[2], message[3]))
+            with self.lock:
+                inbox = self.pending.get(req_id)
+            if inbox is not None:
+                inbox.put(message[1:])
+
+    def _on_worker_died(self):
+        """Supervision: fail whatever was in flight and restart the worker (bounded)."""
+        self.ready.clear()
+        print(f"⚠️ TTS worker process died (exit code {self.process.exitcode})")
+        with self.lock:
+            for inbox in self.pending.values():
+                inbox.put(("error", "TTS worker crashed"))
+        if self.boot_seconds is None:
+            # It never got as far as loading the model; another try would fail the same way
+            print("❌ TTS worker died while starting, giving up on it.")
+            self.failed = True
+            return
+        now = time.monotonic()
+        self.restarts = [t for t in self.restarts if now - t < RESTART_WINDOW_SECONDS] + [now]
+        if len(self.restarts) > MAX_RESTARTS:
+            print("❌ TTS worker keeps crashing, giving up on it.")
+            self.failed = True
+            if self.on_failed is not None:
+                self.on_failed()
+            return
+        self._spawn()
+
+    def _request(self, kind, payload, cancel=None):
+        """Sends one request and yields its replies (waveform, None, or a value) as they arrive."""
+        if not self._wait_ready(READY_TIMEOUT_SECONDS):
+            print("⚠️ TTS worker is not available.")
+            return
+        req_id = next(self.ids)
+        inbox = queue.Queue()
+        with self.lock:
+            self.pending[req_id] = inbox
+        self.requests.put((req_id, kind, payload))
+        try:
+            while True:
+                try:
+                    reply = inbox.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    if is_cancelled(cancel):
+                        self.cancel()
+                        return
+                    continue
+                status = reply[0]
+                if status in ("chunk", "value"):
+                    yield reply[1]
+                elif status == "none":
+                    yield None
+                elif status == "error":
+                    print(f"⚠️ TTS worker error: {reply[1]}")
+                    return
+                else: # done
+                    return
+        finally:
+            with self.lock:
+                self.pending.pop(req_id, None)
+
+    def synthesize(self, text: str, cancel=None):
+        wavs = [wav for wav in self._request("synthesize", text, cancel) if wav is not None]
+        return wavs[0] if wavs and not is_cancelled(cancel) else None
+
+    def synthesize_stream(self, text: str, cancel=None):
+        """Yields partial audio chunks for one piece of text as the worker produces them."""
+        yield from self._request("stream", text, cancel)
+
+    def synthesize_batch(self, sentences: list, cancel=None) -> list:
+        wavs = list(self._request("batch", list(sentences), cancel))
+        return wavs if len(wavs) == len(sentences) else [None] * len(sentences)
+
+    def cache_stats(self) -> dict:
+        # Reads the one "value" reply only, so it doesn't depend on the "done" after it
+        replies = self._request("stats", None)
+        try:
+            return next(replies, None) or {}
+        finally:
+            replies.close()
+
+    def cancel(self):
+        """Aborts whatever the worker is synthesizing right now."""
+        self.cancel_event.set()
+
+    def close(self):
+        self.closing = True
+        if self.process is not None and self.process.is_alive():
+            self.requests.put(None)
+            self.process.join(2.0)
+            if self.process.is_alive():
+                self.process.terminate()
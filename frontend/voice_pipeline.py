@@ -0,0 +1,311 @@
+import time
+import queue
+import itertools
+import threading
+import traceback
+from collections import deque
+
+from streaming import iter_sentences, is_cancelled
+from latency_tracer import write_atomic
+
+# Bounded queues between stages: a slow stage makes the one before it wait
+# instead of piling up work (and memory) for answers nobody will hear.
+UTTERANCE_QUEUE_SIZE = 2
+SENTENCE_QUEUE_SIZE = 4
+AUDIO_QUEUE_SIZE = 8
+# A new utterance this soon after the previous one, before the robot has said
+# anything, is treated as the rest of the same question ("what is" ... "two plus two")
+COALESCE_SECONDS = 1.5
+# Playback stage stops handing audio to the player when this much is already buffered
+MAX_AUDIO_AHEAD_SECONDS = 15.0
+POLL_SECONDS = 0.05
+# Said instead of an answer when the LLM/RAG call fails, so the turn still ends
+FALLBACK_RESPONSE = "Let's try again with a different question!"
+
+
+class Turn:
+    """One question from the child, followed through every stage by identity."""
+    def __init__(self, turn_id: int, text: str):
+        self.id = turn_id
+        self.text = text
+        self.cancel = threading.Event()
+        self.created = time.perf_counter()
+        self.spoke = False
+        self.done = False # every stage has finished with it
+
+
+class StageMetrics:
+    """Queue depth and utilization (busy time / wall time) of one stage."""
+    def __init__(self, name, inbox=None):
+        self.name = name
+        self.inbox = inbox
+        self.started = time.perf_counter()
+        self.busy_seconds = 0.0
+        self.items = 0
+        self.max_queue_depth = 0
+
+    def observe_queue(self):
+        if self.inbox is not None:
+            self.max_queue_depth = max(self.max_queue_depth, self.inbox.qsize())
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "queue_depth": self.inbox.qsize() if self.inbox is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "items": self.items,
+            "busy_s": round(self.busy_seconds, 3),
+            "utilization": round(self.busy_seconds / elapsed, 4),
+        }
+
+
+class Stage(threading.Thread):
+    """Worker thread that takes items from its inbox and hands each one to `handler`."""
+    def __init__(self, name, inbox, handler, stopping):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.inbox = inbox
+        self.handler = handler
+        self.stopping = stopping
+        self.metrics = StageMetrics(name, inbox)
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                item = self.inbox.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                continue
+            self.metrics.observe_queue()
+            start_time = time.perf_counter()
+            try:
+                self.handler(item)
+            except Exception as e:
+                print(f"⚠️ Error in {self.name}: {e}")
+                traceback.print_exc()
+            finally:
+                self.metrics.busy_seconds += time.perf_counter() - start_time
+                self.metrics.items += 1
+
+
+class VoicePipeline:
+    """
+    STT -> reasoning -> synthesis -> playback as independent stages joined by
+    bounded queues, so the microphone keeps being transcribed while an answer
+    is generated and spoken, and sentence N+1 is synthesized while sentence N
+    plays. Capture runs on the caller's thread (it calls submit() with each
+    transcription); the other three stages own a thread each.
+
+    The pipeline knows nothing about Qt: results go out through the callbacks
+    emit_state(state), emit_audio(wav, turn_id), emit_finished(turn_id) and
+    emit_stop(turn_id), and audio_backlog() reports how many seconds of audio
+    the player still has queued. Turn ids come from `turn_ids`; a caller that
+    runs one pipeline per session passes the same counter to each, so ids
+    keep increasing and never collide with a previous session's.
+    """
+    def __init__(self, chatbot_logic, tracer, emit_state, emit_audio, emit_finished, emit_stop,
+                 audio_backlog=lambda: 0.0, stream_tts=True, turn_ids=None):
+        self.chatbot_logic = chatbot_logic
+        self.tracer = tracer
+        self.emit_state = emit_state
+        self.emit_audio = emit_audio
+        self.emit_finished = emit_finished
+        self.emit_stop = emit_stop
+        self.audio_backlog = audio_backlog
+        self.stream_tts = stream_tts
+
+        self.stopping = threading.Event()
+        self.utterances = queue.Queue(UTTERANCE_QUEUE_SIZE)
+        self.sentences = queue.Queue(SENTENCE_QUEUE_SIZE)
+        self.audio = queue.Queue(AUDIO_QUEUE_SIZE)
+        self.capture_metrics = StageMetrics("capture", self.utterances)
+        self.stages = [
+            Stage("reasoning", self.utterances, self._reason, self.stopping),
+            Stage("synthesis", self.sentences, self._synthesize, self.stopping),
+            Stage("playback", self.audio, self._play, self.stopping),
+        ]
+        self.lock = threading.Lock()
+        self.turn_ids = turn_ids if turn_ids is not None else itertools.count(1)
+        self.current_turn = None
+        self.coalesced = 0
+        self.time_to_first_audio = deque(maxlen=100)
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        self.cancel_current()
+        self.stopping.set()
+        for stage in self.stages:
+            stage.join(1.0)
+
+    # ----------------- CAPTURE -----------------
+    def submit(self, text: str):
+        """Capture stage: hands a finished transcription to the reasoning stage."""
+        start_time = time.perf_counter()
+        text = text.strip()
+        if len(text) < 3:
+            self.tracer.end_turn()
+            self.emit_state("idle")
+            return
+        print(f"Transcribed Text: {text}")
+        with self.lock:
+            previous = self.current_turn
+            if previous is not None and not previous.spoke and start_time - previous.created < COALESCE_SECONDS:
+                text = f"{previous.text} {text}"
+                self.coalesced += 1
+                print(f"Coalesced with the previous utterance: {text}")
+            turn = Turn(next(self.turn_ids), text)
+            self.current_turn = turn
+        self.tracer.bind(turn.id)
+        self._cancel(previous)
+        self._put(self.utterances, turn, turn)
+        self.capture_metrics.observe_queue()
+        self.capture_metrics.items += 1
+        self.capture_metrics.busy_seconds += time.perf_counter() - start_time
+
+    def cancel_current(self):
+        """Barge-in: abandons the current turn in every stage and stops playback."""
+        self._cancel(self.current_turn)
+
+    def _cancel(self, turn):
+        if turn is None:
+            return
+        # Stop playback even for a finished turn; the player may still be speaking it
+        self.emit_stop(turn.id)
+        if turn.done or turn.cancel.is_set():
+            return
+        print(f"✋ Barge-in: cancelling turn {turn.id}")
+        turn.cancel.set()
+        self.chatbot_logic.cancel_tts()
+
+    def _put(self, target, item, turn):
+        """Blocking put (backpressure) that gives up if the turn is cancelled or we are stopping."""
+        while not is_cancelled(turn.cancel) and not self.stopping.is_set():
+            try:
+                target.put(item, timeout=POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # ----------------- REASONING -----------------
+    def _reason(self, turn):
+        # Only the newest queued utterance matters; older ones were cancelled or merged into it
+        while True:
+            try:
+                turn = self.utterances.get_nowait()
+            except queue.Empty:
+                break
+        if is_cancelled(turn.cancel):
+            return
+        self.emit_state("thinking")
+        self.tracer.mark("rag_start", turn.id)
+        try:
+            if self.stream_tts:
+                # LLM tokens are cut into sentences and queued for TTS while the LLM is still generating
+                chunks = self._log_response(self.chatbot_logic.stream_response(turn.text, turn.cancel), turn)
+                pieces = iter_sentences(chunks)
+            else:
+                response_text = self.chatbot_logic.get_response(turn.text)
+                self.tracer.mark("rag_done", turn.id)
+                print(f"RAG Response: {response_text}")
+                pieces = [response_text]
+            for piece in pieces:
+                if not self._put(self.sentences, (turn, piece), turn):
+                    return
+        except Exception as e:
+            # Without the end marker playback would never finish the turn and the UI would stay on "thinking"
+            print(f"⚠️ Reasoning failed for turn {turn.id}: {e}")
+            traceback.print_exc()
+            if not self._put(self.sentences, (turn, FALLBACK_RESPONSE), turn):
+                return
+        self._put(self.sentences, (turn, None), turn) # end of answer
+
+    def _log_response(self, chunks, turn):
+        """Passes LLM chunks through and prints the full response once it is complete."""
+        response = []
+        for chunk in chunks:
+            response.append(chunk)
+            yield chunk
+        if is_cancelled(turn.cancel):
+            # stream_response stopped early; this isn't how long the answer took
+            return
+        self.tracer.mark("rag_done", turn.id)
+        print(f"RAG Response: {''.join(response)}")
+
+    # ----------------- SYNTHESIS -----------------
+    def _synthesize(self, item):
+        turn, text = item
+        if is_cancelled(turn.cancel):
+            return
+        if text is None:
+            self._put(self.audio, (turn, None), turn)
+            return
+        self.tracer.mark("tts_start", turn.id)
+        if self.stream_tts:
+            wavs = self.chatbot_logic.synthesize_stream(text, turn.cancel)
+        else:
+            # Whole answer at once: sentences are synthesized in length-grouped batches
+            wavs = [wav for wav in self.chatbot_logic.synthesize_batch(text, turn.cancel) if wav is not None]
+        for wav in wavs:
+            if not self._put(self.audio, (turn, wav), turn):
+                return
+
+    # ----------------- PLAYBACK -----------------
+    def _play(self, item):
+        turn, wav = item
+        if is_cancelled(turn.cancel):
+            return
+        if wav is None:
+            if turn.spoke:
+                self.tracer.mark("tts_done", turn.id)
+            else:
+                self.emit_state("idle")
+            turn.done = True
+            self.emit_finished(turn.id)
+            return
+        if not turn.spoke:
+            turn.spoke = True
+            self.tracer.mark("tts_first_audio", turn.id)
+            self._report_time_to_first_audio(time.perf_counter() - turn.created)
+            self.emit_state("speaking")
+        while self.audio_backlog() > MAX_AUDIO_AHEAD_SECONDS and not is_cancelled(turn.cancel):
+            time.sleep(POLL_SECONDS)
+        if not is_cancelled(turn.cancel):
+            self.emit_audio(wav, turn.id)
+
+    def _report_time_to_first_audio(self, seconds):
+        """Records how long the child waited between the question and the first audio."""
+        self.time_to_first_audio.append(seconds)
+        average = sum(self.time_to_first_audio) / len(self.time_to_first_audio)
+        print(f"⏱ Time to first audio: {seconds:.2f}s (avg {average:.2f}s over {len(self.time_to_first_audio)} turns)")
+
+    # ----------------- METRICS -----------------
+    def metrics(self) -> dict:
+        """Per-stage queue depth, items handled and utilization, plus the coalesced-utterance count."""
+        stages = {"capture": self.capture_metrics.snapshot()}
+        for stage in self.stages:
+            stages[stage.metrics.name] = stage.metrics.snapshot()
+        return {"stages": stages, "coalesced_utterances": self.coalesced}
+
+    def export_prometheus(self, path, prefix="hta_pipeline"):
+        """Writes the stage metrics as Prometheus gauges/counters."""
+        metrics = self.metrics()
+        lines = [
+            f"# HELP {prefix}_queue_depth Items waiting in the stage's input queue.",
+            f"# TYPE {prefix}_queue_depth gauge",
+        ]
+        for name, stats in metrics["stages"].items():
+            lines.append(f'{prefix}_queue_depth{{stage="{name}"}} {stats["queue_depth"]}')
+        lines += [f"# HELP {prefix}_utilization Fraction of wall time the stage spent working.",
+                  f"# TYPE {prefix}_utilization gauge"]
+        for name, stats in metrics["stages"].items():
+            lines.append(f'{prefix}_utilization{{stage="{name}"}} {stats["utilization"]}')
+        lines += [f"# HELP {prefix}_items_total Items handled by the stage.",
+                  f"# TYPE {prefix}_items_total counter"]
+        for name, stats in metrics["stages"].items():
+            lines.append(f'{prefix}_items_total{{stage="{name}"}} {stats["items"]}')
+        lines += [f"# HELP {prefix}_coalesced_total Back-to-back utterances merged into one question.",
+                  f"# TYPE {prefix}_coalesced_total counter",
+                  f"{prefix}_coalesced_total {metrics['coalesced_utterances']}"]
+        write_atomic(path, "\n".join(lines) + "\n")